@@ -0,0 +1,730 @@
+#!/usr/bin/env python
+"""
+Vectorized (NumPy) decoding of MPC1992 80 column observation lines.
+
+`parse_datalines_batch()` is the array counterpart of `utils.parse_dataline()`:
+the whole body is loaded into one fixed-width ``S80`` array, the columns are
+sliced out as views of that buffer and the date, RA, Dec and magnitude are
+converted with vectorized arithmetic. Rows that fail validation are flagged in
+a boolean mask instead of raising `RuntimeError`.
+
+The array counterparts of the `sexVals` converters (`sex_date_to_iso()`,
+`sex_ra_to_dec_ra()`, `sex_decl_to_dec_decl()` and their inverses) use the same
+floating point operations and formatting as the scalar functions, so they give
+identical strings, with invalid values flagged in a mask (only ASCII digits are
+accepted).
+"""
+
+from __future__ import absolute_import, division, print_function
+from __future__ import unicode_literals
+
+import math
+
+import numpy as np
+
+from astrometrica2ades import sexVals
+from astrometrica2ades import packUtil
+
+batch_dtype = np.dtype([('totalid', 'S12'),
+                        ('permID', 'U16'),
+                        ('provID', 'U16'),
+                        ('trkSub', 'U8'),
+                        ('disc', 'S1'),
+                        ('notes', 'S1'),
+                        ('code', 'S1'),
+                        ('mode', 'U3'),
+                        ('obsTime', 'S23'),
+                        ('precTime', 'i4'),
+                        ('ra', 'f8'),
+                        ('dec', 'f8'),
+                        ('precRA', 'f8'),
+                        ('precDec', 'f8'),
+                        ('mag', 'f8'),
+                        ('band', 'S1'),
+                        ('astCat', 'S1'),
+                        ('stn', 'S3'),
+                        ])
+
+def _char_table(chars):
+    """Return a 256 element boolean lookup table that is True for <chars>"""
+    table = np.zeros(256, dtype=bool)
+    table[np.frombuffer(chars.encode('ascii'), dtype=np.uint8)] = True
+    return table
+
+_ID_CHARS = _char_table('ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz0123456789 ')
+_DISC_CHARS = _char_table(' *+')
+_CODE_CHARS = _char_table('A PeCTMcEOHNn')
+_NOTE_CHARS = _char_table(packUtil.validNotes)
+_DIGITS = _char_table('0123456789')
+_ANY_CHARS = ~_char_table('\n')
+_SPACE = ord(' ')
+_DOT = ord('.')
+
+def load_datalines(lines):
+    """
+    Load a sequence of 80 column lines into a fixed-width ``S80`` array.
+
+    Parameters
+    ----------
+    lines : sequence of str or bytes
+        The observation lines (without line terminators)
+
+    Returns
+    -------
+    records : `numpy.ndarray` of ``S80``
+        One record per input line. Lines that are not exactly 80 columns long
+        are replaced by blanks.
+    chars : `numpy.ndarray` of ``uint8``, shape (n, 80)
+        A 2D view onto the same buffer as `records`; ``chars[:, a:b]`` is a
+        view of columns a+1 to b.
+    length_ok : `numpy.ndarray` of bool
+        True where the input line was exactly 80 columns long
+    """
+
+    text = []
+    length_ok = np.ones(len(lines), dtype=bool)
+    blank = ' ' * 80
+    for i, line in enumerate(lines):
+        if isinstance(line, bytes):
+            line = line.decode('ascii', 'replace')
+        if len(line) != 80:
+            length_ok[i] = False
+            line = blank
+        text.append(line)
+    # Non-ASCII characters become '?' (one byte each) so the columns stay aligned
+    # and the row fails the character class checks.
+    buf = ''.join(text).encode('ascii', 'replace')
+    records = np.frombuffer(buf, dtype='S80')
+    chars = np.frombuffer(buf, dtype=np.uint8).reshape(len(text), 80)
+
+    return records, chars, length_ok
+
+def _format_fixed(values, digits):
+    """
+    ``'%.<digits>f' % value`` for an array of floats, as bytes.
+
+    The digits are generated with integer arithmetic from the value scaled by
+    10**digits and rounded, which gives the same result as the correctly
+    rounded formatting unless the scaled value is within its rounding error of
+    half way between two integers; those values (and any that are too large or
+    not finite) are formatted one at a time with '%'.
+    """
+    values = np.asarray(values, dtype=np.float64).reshape(-1)
+    n = len(values)
+    scaled = np.abs(values) * 10.0 ** digits
+    with np.errstate(invalid='ignore'):
+        fast = np.isfinite(scaled) & (scaled < 2.0 ** 52)
+        scaled = np.where(fast, scaled, 0.0)
+        fast &= np.abs(scaled - np.floor(scaled) - 0.5) > scaled * 2.0 ** -52
+    rounded = np.rint(scaled).astype(np.int64)
+    whole, frac = np.divmod(rounded, 10 ** digits)
+    whole_digits = np.ones(n, dtype=np.int64)
+    for k in range(1, 16):
+        whole_digits += whole >= 10 ** k
+    negative = np.signbit(values)
+
+    # Right aligned in <width> columns, then shifted to the left
+    point = 1 if digits > 0 else 0
+    width = 1 + (int(whole_digits.max()) if n else 1) + point + digits
+    chars = np.zeros((n, width), dtype=np.uint8)
+    for j in range(digits):
+        chars[:, width - 1 - j] = 48 + (frac // 10 ** j) % 10
+    end = width - 1 - digits - point
+    if point:
+        chars[:, end + 1] = _DOT
+    for j in range(width - 1 - digits - point):
+        rows = whole_digits > j
+        chars[rows, end - j] = 48 + (whole[rows] // 10 ** j) % 10
+    chars[np.arange(n)[negative], (end - whole_digits)[negative]] = ord('-')
+    lead = width - (whole_digits + negative + point + digits)
+    columns = np.arange(width) + lead[:, np.newaxis]
+    chars = np.where(columns < width, np.take_along_axis(chars, np.minimum(columns, width - 1), axis=1), 0)
+    formatted = np.ascontiguousarray(chars).view('S%d' % width).reshape(n)
+
+    if fast.all():
+        return formatted
+    slow = np.char.mod('%%.%df' % digits, values[~fast]).astype('S')
+    out = np.zeros(n, dtype='S%d' % max(width, slow.dtype.itemsize))
+    out[fast] = formatted[fast]
+    out[~fast] = slow
+    return out
+
+def _digits_value(chars):
+    """Integer value of a block of ASCII digit columns (no validation)"""
+    value = np.zeros(chars.shape[0], dtype=np.int64)
+    for col in range(chars.shape[1]):
+        value = value * 10 + (chars[:, col].astype(np.int64) - 48)
+    return value
+
+def _leading_digits(chars):
+    """
+    Return (count, value, ok): the number of leading digits in each row of
+    <chars>, their integer value and whether all following columns are blank.
+    """
+    is_digit = _DIGITS[chars]
+    leading = np.cumprod(is_digit, axis=1).astype(bool)
+    count = leading.sum(axis=1)
+    ok = np.all(leading | (chars == _SPACE), axis=1)
+    value = np.zeros(chars.shape[0], dtype=np.int64)
+    for col in range(chars.shape[1]):
+        value = np.where(leading[:, col], value * 10 + (chars[:, col].astype(np.int64) - 48), value)
+    return count, value, ok
+
+def decode_sexagesimal(chars):
+    """
+    Vectorized equivalent of `sexVals.checkSexagesimal` for a block of
+    fixed-width columns.
+
+    Parameters
+    ----------
+    chars : `numpy.ndarray` of ``uint8``, shape (n, w)
+        The sexagesimal field, e.g. ``HH MM SS.ss`` (w >= 5)
+
+    Returns
+    -------
+    major, minutes, seconds, prec : `numpy.ndarray` of float
+        Hours (or degrees), minutes, seconds and the sexagesimal precision,
+        as returned by `sexVals.checkSexagesimal`
+    ok : `numpy.ndarray` of bool
+        True where the field matched one of the accepted layouts
+    """
+
+    n, width = chars.shape
+    digit = _DIGITS[chars]
+    space = chars == _SPACE
+    major = _digits_value(chars[:, 0:2]).astype(np.float64)
+    minutes = _digits_value(chars[:, 3:5]).astype(np.float64)
+    seconds = np.zeros(n, dtype=np.float64)
+    prec = np.zeros(n, dtype=np.float64)
+    ok = np.zeros(n, dtype=bool)
+    head = digit[:, 0] & digit[:, 1] & space[:, 2] & digit[:, 3] & digit[:, 4]
+
+    def all_blank(start):
+        if start >= width:
+            return np.ones(n, dtype=bool)
+        return np.all(space[:, start:], axis=1)
+
+    if width >= 9:
+        # HH MM SS.ss... ; the seconds value is decoded from the integer of all
+        # digits over a power of ten, which is the correctly rounded float just
+        # as float('SS.ss') is.
+        count, frac, frac_ok = _leading_digits(chars[:, 9:])
+        normal = head & space[:, 5] & digit[:, 6] & digit[:, 7] & (chars[:, 8] == _DOT) & frac_ok
+        sec_int = _digits_value(chars[:, 6:8])
+        scale = 10.0 ** count
+        seconds = np.where(normal, (sec_int * scale + frac) / scale, seconds)
+        prec = np.where(normal, 10.0 ** (-count), prec)
+        ok |= normal
+    if width >= 8:
+        # HH MM SS
+        int_seconds = ~ok & head & space[:, 5] & digit[:, 6] & digit[:, 7] & all_blank(8)
+        seconds = np.where(int_seconds, _digits_value(chars[:, 6:8]), seconds)
+        prec = np.where(int_seconds, 1.0, prec)
+        ok |= int_seconds
+    if width >= 7:
+        # HH MM.mm and HH MM.m
+        minutes_dot = ~ok & head & (chars[:, 5] == _DOT) & digit[:, 6]
+        if width >= 8:
+            hundredths = minutes_dot & digit[:, 7] & all_blank(8)
+            tenths = minutes_dot & space[:, 7] & all_blank(8)
+            minutes = np.where(hundredths, (_digits_value(chars[:, 3:5]) * 100 + _digits_value(chars[:, 6:8])) / 100.0, minutes)
+            prec = np.where(hundredths, 0.6, prec)
+        else:
+            hundredths = np.zeros(n, dtype=bool)
+            tenths = minutes_dot
+        minutes = np.where(tenths, (_digits_value(chars[:, 3:5]) * 10 + _digits_value(chars[:, 6:7])) / 10.0, minutes)
+        prec = np.where(tenths, 6.0, prec)
+        ok |= hundredths | tenths
+    # HH MM
+    int_minutes = ~ok & head & all_blank(5)
+    prec = np.where(int_minutes, 60.0, prec)
+    ok |= int_minutes
+
+    return major, minutes, seconds, prec, ok
+
+def decode_dates(chars):
+    """
+    Vectorized equivalent of `sexVals.sexDateToISO` for the date field
+    (``YYYY MM DD.dddddd``, at least 17 columns).
+
+    Returns
+    -------
+    isodate : `numpy.ndarray` of ``S23``
+        ISO format times (e.g. ``2018-02-16T04:45:22.06Z``)
+    prec : `numpy.ndarray` of int
+        Precision for precTime
+    ok : `numpy.ndarray` of bool
+        True where the date is valid
+    """
+
+    n = chars.shape[0]
+    digit = _DIGITS[chars]
+    year = _digits_value(chars[:, 0:4])
+    month = _digits_value(chars[:, 5:7])
+    day = _digits_value(chars[:, 8:10])
+    count, frac, frac_ok = _leading_digits(chars[:, 11:])
+
+    ok = (np.all(digit[:, 0:4], axis=1) & (year >= 1600)
+          & (chars[:, 4] == _SPACE) & digit[:, 5] & digit[:, 6] & (month >= 1) & (month <= 12)
+          & (chars[:, 7] == _SPACE) & digit[:, 8] & digit[:, 9] & (day >= 1) & (day <= 31)
+          & (chars[:, 10] == _DOT) & (count >= 1) & (count <= 15) & frac_ok)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    ok &= ~((month == 2) & ((day >= 30) | ((day >= 29) & ~leap)))
+
+    prec = (10.0 ** (6 - count)).astype(np.int64)
+    # Same floating point operations, in the same order, as sexDateToISO()
+    fracdd = (frac / 10.0 ** count) * 86400.0 + 0.001
+    hh = np.trunc(fracdd / 3600.0)
+    fracdd = fracdd - hh * 3600.0
+    mm = np.trunc(fracdd / 60.0)
+    fracdd = fracdd - mm * 60.0
+
+    isodate = np.zeros((n, 23), dtype=np.uint8)
+    isodate[:, 0:4] = chars[:, 0:4]
+    isodate[:, 4] = ord('-')
+    isodate[:, 5:7] = chars[:, 5:7]
+    isodate[:, 7] = ord('-')
+    isodate[:, 8:10] = chars[:, 8:10]
+    isodate[:, 10] = ord('T')
+    hh = np.clip(hh, 0, 99).astype(np.int64)
+    mm = np.clip(mm, 0, 99).astype(np.int64)
+    isodate[:, 11] = 48 + hh // 10
+    isodate[:, 12] = 48 + hh % 10
+    isodate[:, 13] = ord(':')
+    isodate[:, 14] = 48 + mm // 10
+    isodate[:, 15] = 48 + mm % 10
+    isodate[:, 16] = ord(':')
+    # Seconds are formatted exactly as sexDateToISO does ('{:.2f}' for
+    # prec 1, otherwise '{:.1f}', of ss+100 with the leading '1' dropped)
+    for digits, width, rows in ((2, 5, prec == 1), (1, 4, prec != 1)):
+        if not rows.any():
+            continue
+        secs = _format_fixed(fracdd[rows] + 100.0, digits).astype('S6')
+        secs = secs.view(np.uint8).reshape(-1, 6)[:, 1:1 + width]
+        isodate[rows, 17:17 + width] = secs
+        isodate[rows, 17 + width] = ord('Z')
+
+    return isodate.view('S23').reshape(n), prec, ok
+
+def _field_chars(fields, width):
+    """
+    Return the 2D ``uint8`` array of a sequence of str or bytes <fields>,
+    blank padded to <width> columns (or the longest field if longer).
+    Non-ASCII characters become '?' so the columns stay aligned.
+    """
+    fields = np.asarray(fields)
+    if fields.dtype.kind not in 'SU':
+        fields = fields.astype('U')
+    if fields.dtype.kind == 'U':
+        try:
+            fields = fields.astype('S')
+        except UnicodeEncodeError:
+            fields = np.char.encode(fields, 'ascii', 'replace')
+    fields = fields.reshape(-1)
+    width = max(width, fields.dtype.itemsize)
+    fields = np.char.ljust(fields, width, b' ').astype('S%d' % width)
+    return np.frombuffer(fields.tobytes(), dtype=np.uint8).reshape(len(fields), width)
+
+def _drop_first(strings):
+    """``s[1:]`` of each of an array of strings, as bytes"""
+    strings = np.asarray(strings).astype('S')
+    width = strings.dtype.itemsize
+    chars = strings.view(np.uint8).reshape(-1, width)
+    dropped = np.zeros_like(chars)
+    dropped[:, :-1] = chars[:, 1:]
+    return dropped.view('S%d' % width).reshape(-1)
+
+def _assemble(n, parts):
+    """Gather the (rows, strings) <parts> into one bytes array of length <n> (blank elsewhere)"""
+    width = max([1] + [strings.dtype.itemsize for rows, strings in parts])
+    out = np.zeros(n, dtype='S%d' % width)
+    for rows, strings in parts:
+        out[rows] = strings
+    return out
+
+def _decimal_values(decimals):
+    """
+    Return the float values of an array of decimal strings (or numbers) and
+    whether each could be read
+    """
+    decimals = np.asarray(decimals).reshape(-1)
+    if decimals.dtype.kind not in 'SU':
+        values = decimals.astype(np.float64)
+        return values, np.isfinite(values)
+    values = np.zeros(len(decimals))
+    ok = np.ones(len(decimals), dtype=bool)
+    try:
+        values[:] = decimals.astype(np.float64)
+    except ValueError:
+        for i, decimal in enumerate(decimals):
+            try:
+                values[i] = float(decimal)
+            except ValueError:
+                ok[i] = False
+    return values, ok & np.isfinite(values)
+
+def _format_decimal(value, prec, ok, scale):
+    """
+    Format the decimal degree <value>s as `sexVals.sexRaToDecRa` (<scale> is
+    `sexVals.secToDegrees`) or `sexVals.sexDeclToDecDecl`
+    (`sexVals.arcsecToDegrees`) do for the precision <prec>
+    """
+    parts = []
+    for p in np.unique(prec[ok]):
+        rows = ok & (prec == p)
+        digits = -int(math.floor(math.log10(p*scale)))
+        if digits < 1:
+            digits = 1
+        parts.append((rows, _format_fixed(value[rows], digits)))
+    return _assemble(len(value), parts)
+
+def _ra_values(chars):
+    """
+    Decimal degree values, precisions and validity of a block of RA field
+    columns, and whether they pass the approximate round trip check
+    """
+    hours, minutes, seconds, prec, ok = decode_sexagesimal(chars)
+    value = (hours * 3600.0 + minutes * 60.0 + seconds) * sexVals.secToDegrees
+    return value, prec, ok, _round_trips(chars, minutes, seconds, prec)
+
+def _dec_values(chars):
+    """
+    Decimal degree values, precisions and validity of a block of Dec field
+    columns (with the sign), and whether they pass the approximate round
+    trip check
+    """
+    sign = chars[:, 0]
+    degrees, minutes, seconds, prec, ok = decode_sexagesimal(chars[:, 1:])
+    signval = np.where(sign == ord('-'), -1.0, 1.0)
+    value = signval * (degrees + minutes / 60.0 + seconds / 3600.0)
+    ok &= (sign == ord('+')) | (sign == ord('-'))
+    return value, prec, ok, _round_trips(chars[:, 1:], minutes, seconds, prec)
+
+def _sexagesimal_strings(rev, prec, ok, round_minutes):
+    """
+    Format <rev> seconds (of time or arc) as ``DD MM SS.ss`` (or the layout
+    for <prec>) exactly as `sexVals.decRaToSexRa` (or, with <round_minutes>,
+    `sexVals.degDeclToSexDecl`) do, without the sign or padding
+    """
+    n = len(rev)
+    # Values too large to be sexagesimal would overflow the integer conversions
+    ok &= (np.abs(rev) < 1e15) & (prec > 0)
+    rev = np.where(ok, rev, 0.0)
+    revDeg = np.trunc(rev / 3600.0)
+    rev = rev - revDeg * 3600.0
+    major = _drop_first(_format_fixed(100 + revDeg, 0))
+
+    parts = []
+    for p in np.unique(prec[ok]):
+        rows = ok & (prec == p)
+        minutes_digits = {0.6: 2, 6: 1, 60: 0}.get(p)
+        if minutes_digits is not None:
+            rest = _drop_first(_format_fixed(100.0 + rev[rows] / 60.0, minutes_digits))
+        else:
+            pdig = -int(math.log10(p))
+            if pdig < 0:
+                ok &= ~rows
+                continue
+            if round_minutes:
+                revMin = np.trunc((rev[rows] + 0.5 * p) / 60.0)
+            else:
+                revMin = np.trunc(rev[rows] / 60.0)
+            seconds = rev[rows] - revMin * 60.0
+            rest = np.char.add(np.char.add(_drop_first(_format_fixed(100 + revMin, 0)), b' '),
+                               _drop_first(_format_fixed(100.0 + seconds, pdig)))
+        parts.append((rows, np.char.add(np.char.add(major[rows], b' '), rest)))
+    return _assemble(n, parts), ok
+
+def _round_trips(chars, minutes, seconds, prec):
+    """
+    Approximation of the scalar reverse-conversion checks in `sexVals.checkRa`
+    and `sexVals.checkDec`: minutes and seconds must be below 60 and a
+    ``SS.`` seconds field with no decimals (which can't be reproduced) fails.
+    """
+    no_decimals = (chars[:, 8] == _DOT) & (prec == 1.0)
+    return (minutes < 60) & (seconds < 60) & ~no_decimals
+
+def sex_date_to_iso(dates):
+    """
+    Vectorized `sexVals.sexDateToISO`.
+
+    Parameters
+    ----------
+    dates : sequence of str or bytes
+        Dates in MPC format (``YYYY MM DD.dddddd``)
+
+    Returns
+    -------
+    isodate : `numpy.ndarray` of ``S23``
+        ISO format times
+    prec : `numpy.ndarray` of int
+        Precision for precTime
+    ok : `numpy.ndarray` of bool
+        True where the date is valid (where `sexVals.sexDateToISO` wouldn't
+        raise `RuntimeError`)
+    """
+
+    return decode_dates(_field_chars(dates, 17))
+
+def iso_to_sex_date(isodate, prec):
+    """
+    Vectorized `sexVals.isoToSexDate`.
+
+    Parameters
+    ----------
+    isodate : sequence of str or bytes
+        ISO format times, as returned by `sex_date_to_iso`
+    prec : array_like of int
+        Precision of each time
+
+    Returns
+    -------
+    sexdate : `numpy.ndarray` of bytes
+        Dates in MPC format, padded to 17 columns
+    ok : `numpy.ndarray` of bool
+        True where the time could be converted
+    """
+
+    chars = _field_chars(isodate, 23)
+    n = chars.shape[0]
+    prec = np.broadcast_to(np.asarray(prec), (n,))
+    length = np.maximum(np.sum(chars != _SPACE, axis=1), 1)
+    digit = _DIGITS[chars]
+    ok = (length >= 19) & (chars[np.arange(n), length - 1] == ord('Z'))
+    ok &= digit[:, 11] & digit[:, 12] & digit[:, 14] & digit[:, 15]
+    # The seconds are the columns from 18 up to the 'Z'
+    seconds = chars[:, 17:].copy()
+    in_seconds = np.arange(seconds.shape[1]) < (length - 18)[:, np.newaxis]
+    ok &= np.all(~in_seconds | digit[:, 17:] | (seconds == _DOT), axis=1) & np.any(in_seconds & digit[:, 17:], axis=1)
+    seconds[~in_seconds | ~ok[:, np.newaxis]] = 0
+    seconds[~ok, 0] = ord('0')
+    ss = seconds.view('S%d' % seconds.shape[1]).reshape(n).astype(np.float64)
+    # Same floating point operations, in the same order, as isoToSexDate()
+    xx = _digits_value(chars[:, 11:13]) * 3600.0 + _digits_value(chars[:, 14:16]) * 60.0 + ss
+
+    parts = []
+    for digits, rows in ((6, prec <= 1), (5, prec == 10), (4, prec == 100), (3, prec == 1000),
+                         (2, prec == 10000), (1, prec >= 100000)):
+        rows = rows & ok
+        if rows.any():
+            parts.append((rows, _drop_first(_format_fixed(xx[rows] / 86400.0, digits))))
+    ok &= np.any([rows for rows, yy in parts] + [np.zeros(n, dtype=bool)], axis=0)
+    yy = _assemble(n, parts)
+
+    field = lambda a, b: chars[:, a:b].copy().view('S%d' % (b - a)).reshape(n)
+    sexdate = np.char.add(np.char.add(np.char.add(np.char.add(np.char.add(field(0, 4), b' '), field(5, 7)), b' '),
+                          field(8, 10)), yy)
+    return np.char.ljust(sexdate, 17, b' '), ok
+
+def sex_ra_to_dec_ra(ras):
+    """
+    Vectorized `sexVals.sexRaToDecRa`.
+
+    Parameters
+    ----------
+    ras : sequence of str or bytes
+        Sexagesimal RAs (``HH MM SS.sss`` or one of the other layouts
+        accepted by `sexVals.checkSexagesimal`)
+
+    Returns
+    -------
+    decRa : `numpy.ndarray` of bytes
+        Decimal degrees, formatted to the number of digits for the precision
+    prec : `numpy.ndarray` of float
+        Precision values
+    ok : `numpy.ndarray` of bool
+        True where the RA is valid
+    """
+
+    value, prec, ok, approx_ok = _ra_values(_field_chars(ras, 12))
+    return _format_decimal(value, prec, ok, sexVals.secToDegrees), prec, ok
+
+def sex_decl_to_dec_decl(decs):
+    """
+    Vectorized `sexVals.sexDeclToDecDecl`.
+
+    Parameters
+    ----------
+    decs : sequence of str or bytes
+        Sexagesimal declinations (``+DD MM SS.ss`` or one of the other
+        layouts accepted by `sexVals.checkSexagesimal`, after the sign)
+
+    Returns
+    -------
+    decDecl : `numpy.ndarray` of bytes
+        Decimal degrees, formatted to the number of digits for the precision
+    prec : `numpy.ndarray` of float
+        Precision values
+    ok : `numpy.ndarray` of bool
+        True where the declination is valid
+    """
+
+    value, prec, ok, approx_ok = _dec_values(_field_chars(decs, 12))
+    return _format_decimal(value, prec, ok, sexVals.arcsecToDegrees), prec, ok
+
+def dec_ra_to_sex_ra(decRa, prec):
+    """
+    Vectorized `sexVals.decRaToSexRa`.
+
+    Parameters
+    ----------
+    decRa : sequence of str or bytes, or array_like of float
+        Decimal degree RAs
+    prec : array_like of float
+        Precision values
+
+    Returns
+    -------
+    sexRa : `numpy.ndarray` of bytes
+        Sexagesimal RAs, padded to 12 columns
+    ok : `numpy.ndarray` of bool
+        True where the RA could be converted
+    """
+
+    value, ok = _decimal_values(decRa)
+    prec = np.broadcast_to(np.asarray(prec, dtype=np.float64), value.shape)
+    sexRa, ok = _sexagesimal_strings(value / sexVals.secToDegrees, prec, ok, False)
+    return np.char.ljust(sexRa, 12, b' '), ok
+
+def deg_decl_to_sex_decl(decDecl, prec):
+    """
+    Vectorized `sexVals.degDeclToSexDecl`.
+
+    Parameters
+    ----------
+    decDecl : sequence of str or bytes, or array_like of float
+        Decimal degree declinations
+    prec : array_like of float
+        Precision values
+
+    Returns
+    -------
+    sexDecl : `numpy.ndarray` of bytes
+        Sexagesimal declinations, padded to 12 columns
+    ok : `numpy.ndarray` of bool
+        True where the declination could be converted
+    """
+
+    value, ok = _decimal_values(decDecl)
+    prec = np.broadcast_to(np.asarray(prec, dtype=np.float64), value.shape)
+    # '-' for negative values and -0.0 (i.e. '-0.000')
+    sign = np.where(np.signbit(value), b'-', b'+')
+    sexDecl, ok = _sexagesimal_strings(np.abs(value) / sexVals.arcsecToDegrees, prec, ok, True)
+    return np.char.ljust(np.char.add(sign, sexDecl), 12, b' '), ok
+
+def parse_datalines_batch(lines, round_trip=False):
+    """
+    Decode a body of MPC1992 80 column optical lines into a structured array.
+
+    Parameters
+    ----------
+    lines : sequence of str or bytes
+        80 column observation lines (line terminators removed)
+    round_trip : bool, optional
+        Check that the date, RA and Dec convert back to the original columns
+        exactly, instead of the (much faster) range checks
+
+    Returns
+    -------
+    data : `numpy.ndarray`
+        A structured array (dtype `batch_dtype`) with one record per input
+        line. ``ra`` and ``dec`` are decimal degrees, ``mag`` is NaN if blank.
+        The contents of rows that failed validation are undefined.
+    valid : `numpy.ndarray` of bool
+        True for rows that decoded and validated successfully; False where
+        `utils.parse_dataline` would have raised an error for that line.
+
+    Notes
+    -----
+    Layout, date, RA/Dec, note and designation checks follow
+    `utils.parse_dataline`. Unless <round_trip> is set the scalar RA/Dec/date
+    round-trip checks are approximated by range checks (minutes and seconds
+    below 60 and ``HH:MM:SS`` not rounding up to 60 seconds).
+    """
+
+    n = len(lines)
+    data = np.zeros(n, dtype=batch_dtype)
+    if n == 0:
+        return data, np.zeros(0, dtype=bool)
+    records, chars, valid = load_datalines(lines)
+
+    # Layout checks, equivalent to DatalineParser.layout_regex
+    valid &= np.all(_ID_CHARS[chars[:, 0:12]], axis=1)
+    valid &= _DISC_CHARS[chars[:, 12]]
+    valid &= _CODE_CHARS[chars[:, 14]]
+    valid &= np.all(_ANY_CHARS[chars[:, 56:80]], axis=1)
+    valid &= _NOTE_CHARS[chars[:, 13]]
+
+    # Date
+    data['obsTime'], data['precTime'], date_ok = decode_dates(chars[:, 15:32])
+    valid &= date_ok
+
+    # RA
+    data['ra'], data['precRA'], ra_ok, ra_reverse_ok = _ra_values(chars[:, 32:44])
+    valid &= ra_ok
+
+    # Dec; column 45 must be + or -
+    data['dec'], data['precDec'], dec_ok, dec_reverse_ok = _dec_values(chars[:, 44:56])
+    valid &= dec_ok
+
+    if round_trip:
+        # Each of the date, RA and Dec must convert back to the original columns
+        field = lambda a, b: chars[:, a:b].copy().view('S%d' % (b - a)).reshape(n)
+        sexdate, reverse_ok = iso_to_sex_date(data['obsTime'], data['precTime'])
+        valid &= reverse_ok & (sexdate == field(15, 32))
+        decRa = _format_decimal(data['ra'], data['precRA'], valid, sexVals.secToDegrees)
+        sexRa, ra_reverse_ok = dec_ra_to_sex_ra(np.where(valid, decRa, b'0'), data['precRA'])
+        ra_reverse_ok &= sexRa == field(32, 44)
+        decDecl = _format_decimal(data['dec'], data['precDec'], valid, sexVals.arcsecToDegrees)
+        sexDecl, dec_reverse_ok = deg_decl_to_sex_decl(np.where(valid, decDecl, b'0'), data['precDec'])
+        dec_reverse_ok &= sexDecl == field(44, 56)
+    valid &= ra_reverse_ok & dec_reverse_ok
+
+    # Magnitude; blank (or unreadable) magnitudes are NaN
+    mags = np.char.strip(chars[:, 65:70].copy().view('S5').reshape(n))
+    mag = np.full(n, np.nan)
+    filled = mags != b''
+    try:
+        mag[filled] = mags[filled].astype(np.float64)
+    except ValueError:
+        for i in np.flatnonzero(filled):
+            try:
+                mag[i] = float(mags[i])
+            except ValueError:
+                pass
+    data['mag'] = mag
+
+    # Simple fixed columns
+    data['totalid'] = chars[:, 0:12].copy().view('S12').reshape(n)
+    data['disc'] = chars[:, 12].copy().view('S1')
+    data['notes'] = chars[:, 13].copy().view('S1')
+    data['code'] = chars[:, 14].copy().view('S1')
+    data['band'] = chars[:, 70].copy().view('S1')
+    data['astCat'] = chars[:, 71].copy().view('S1')
+    data['stn'] = chars[:, 77:80].copy().view('S3').reshape(n)
+    for code in np.unique(data['code']):
+        rows = data['code'] == code
+        mode = packUtil.codeDict.get(code.decode('ascii'))
+        if mode is None:
+            valid &= ~rows
+        else:
+            data['mode'][rows] = mode
+
+    # Designations: each distinct packed ID is unpacked only once
+    ids, inverse = np.unique(data['totalid'], return_inverse=True)
+    id_ok = np.zeros(len(ids), dtype=bool)
+    unpacked = np.zeros(len(ids), dtype=[('permID', 'U16'), ('provID', 'U16'), ('trkSub', 'U8')])
+    for i, packed in enumerate(ids):
+        packed = packed.decode('ascii')
+        try:
+            permID, provID, trkSub = packUtil.unpackPackedID(packed)
+        except RuntimeError:
+            continue
+        unpacked[i] = (permID or '', provID or '', trkSub or '')
+        id_ok[i] = True
+    inverse = inverse.reshape(n)
+    for field in ('permID', 'provID', 'trkSub'):
+        data[field] = unpacked[field][inverse]
+    valid &= id_ok[inverse]
+
+    return data, valid
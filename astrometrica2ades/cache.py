@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+"""
+On-disk cache of converted ADES PSV files, keyed by a hash of everything
+that determines the output, so unchanged MPCReport/Astrometrica.log pairs
+don't need to be reconverted, and an in-process/on-disk cache of parsed
+Astrometrica.log files, so a log shared by several reports is only parsed once.
+"""
+from __future__ import print_function
+
+import os
+import json
+import pickle
+import shutil
+import hashlib
+import tempfile
+import pkg_resources
+from collections import OrderedDict
+
+from astrometrica2ades import utils
+
+# Block size used when hashing input files
+_hash_block_size = 1024 * 1024
+
+
+def _update_hash(hash_obj, path):
+    """Add the contents of the file <path> to <hash_obj>"""
+
+    with open(path, 'rb') as fh:
+        while True:
+            block = fh.read(_hash_block_size)
+            if not block:
+                break
+            hash_obj.update(block)
+
+class OutputCache(object):
+    """
+    Cache of converted PSV files in <cache_dir>, limited to <max_size> bytes
+    with the least recently used entries evicted first.
+
+    Each entry is stored as <key>.psv together with a <key>.json file holding
+    the number of objects. The mtime of an entry is updated whenever it is
+    used, so it records how recently it was used for LRU eviction.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory to keep the cached files in (created if needed)
+    max_size : int, optional
+        Maximum total size (in bytes) of the cached files
+    """
+
+    def __init__(self, cache_dir, max_size=1024**3):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, key + '.psv'), os.path.join(self.cache_dir, key + '.json')
+
+    def key(self, mpcreport, astrometrica_log=None, **settings):
+        """
+        Return the cache key for converting <mpcreport> (with
+        <astrometrica_log>, if given) with the output-affecting <settings>, or
+        None if the inputs can't be read.
+
+        The key is a sha256 hash of the report and log contents, config.ini,
+        the converter version and the settings.
+        """
+
+        key_hash = hashlib.sha256()
+        key_hash.update(utils._converter_version.encode('utf-8'))
+        key_hash.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+        config_file = pkg_resources.resource_filename('astrometrica2ades', os.path.join('data', 'config.ini'))
+        try:
+            for path in [config_file, mpcreport, astrometrica_log]:
+                key_hash.update(b'\0')
+                if path is not None:
+                    _update_hash(key_hash, path)
+        except IOError:
+            return None
+        return key_hash.hexdigest()
+
+    def restore(self, key, outFile):
+        """
+        Copy the cached PSV file for <key> (if any) to <outFile>.
+
+        Returns
+        -------
+        num_objects : int or None
+            The number of objects in the restored PSV file, or None if <key>
+            isn't in the cache
+        """
+
+        psv_file, meta_file = self._paths(key)
+        try:
+            with open(meta_file, 'r') as meta_fh:
+                num_objects = json.load(meta_fh)['num_objects']
+            shutil.copyfile(psv_file, outFile)
+        except (IOError, OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        for path in [psv_file, meta_file]:
+            os.utime(path, None)
+        self.hits += 1
+        return num_objects
+
+    def store(self, key, outFile, num_objects):
+        """Add the PSV file <outFile> containing <num_objects> objects to the cache as <key>"""
+
+        psv_file, meta_file = self._paths(key)
+        # Write to temporary files and rename so a partly written entry is never used
+        # (the metadata goes last as restore() reads it first)
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        shutil.copyfile(outFile, tmp_file)
+        os.replace(tmp_file, psv_file)
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as tmp_fh:
+            json.dump({'num_objects' : num_objects}, tmp_fh)
+        os.replace(tmp_file, meta_file)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is within <max_size>"""
+
+        entries = {}
+        for entry in os.scandir(self.cache_dir):
+            key, ext = os.path.splitext(entry.name)
+            if ext not in ('.psv', '.json'):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                # Removed by another process since the directory was listed
+                continue
+            size, mtime = entries.get(key, (0, 0))
+            entries[key] = (size + st.st_size, max(mtime, st.st_mtime))
+
+        total_size = sum(size for size, mtime in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k][1]):
+            if total_size <= self.max_size:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_size -= entries[key][0]
+            self.evictions += 1
+
+    def stats(self):
+        """Return a dictionary of the cache hits, misses and evictions"""
+
+        return {'hits' : self.hits, 'misses' : self.misses, 'evictions' : self.evictions}
+
+class LogCache(object):
+    """
+    Cache of parsed Astrometrica.log files i.e. the (version, images,
+    asteroids) results of `utils.read_astrometrica_logfile()`.
+
+    Results are kept in memory and, if <cache_dir> is given, also pickled to
+    <cache_dir> so they are reused by later runs and other processes. An entry
+    is only used if the size and mtime of the log and the log parser version
+    are unchanged, so it is invalidated (and replaced) when the log grows. The
+    memory and on-disk entries are each limited to <max_size> bytes (of
+    pickled results), with the least recently used entries evicted first.
+
+    The cached results are shared between callers and must not be modified.
+
+    Parameters
+    ----------
+    cache_dir : str, optional
+        Directory to keep the pickled results in (created if needed)
+    max_size : int, optional
+        Maximum total size (in bytes) of the cached results
+    """
+
+    def __init__(self, cache_dir=None, max_size=256*1024**2):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        # Key -> (signature, results, size), least recently used first
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def __getstate__(self):
+        # Don't copy the in-memory entries when passed to worker processes
+        state = self.__dict__.copy()
+        state['_entries'] = OrderedDict()
+        state['_size'] = 0
+        return state
+
+    def _key(self, log, dates):
+        key = os.path.abspath(log)
+        if dates is not None:
+            key += '|' + ','.join(sorted(dates))
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _signature(self, log):
+        """Return the (size, mtime, parser version) signature of <log>, or None if it doesn't exist"""
+
+        try:
+            st = os.stat(log)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns, utils._log_parser_version)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.pkl')
+
+    def read(self, log, dbg=False, dates=None, workers=1):
+        """
+        Return the results of `utils.read_astrometrica_logfile()` for <log>
+        (and <dates>), from the cache if the log is unchanged since they were
+        cached or by reading it with <workers> processes (and caching the
+        results) otherwise.
+        """
+
+        signature = self._signature(log)
+        if signature is None:
+            return utils.read_astrometrica_logfile(log, dbg, dates, workers)
+        key = self._key(log, dates)
+
+        stale = False
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._remove(key)
+            stale = True
+
+        results = None
+        if self.cache_dir is not None:
+            results, size, stale_file = self._load(key, signature)
+            stale = stale or stale_file
+        if stale:
+            self.invalidations += 1
+        if results is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            results = utils.read_astrometrica_logfile(log, dbg, dates, workers)
+            data = pickle.dumps((signature, results), pickle.HIGHEST_PROTOCOL)
+            size = len(data)
+            if self.cache_dir is not None:
+                self._store(key, data)
+        self._add(key, signature, results, size)
+        return results
+
+    def _load(self, key, signature):
+        """
+        Return the results and size of the on-disk entry for <key> (or None
+        and 0 if it's missing or stale) and whether it was stale
+        """
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            cached_signature, results = pickle.loads(data)
+        except (IOError, OSError, EOFError, ValueError, TypeError, AttributeError, ImportError, pickle.UnpicklingError):
+            return None, 0, False
+        if cached_signature != signature:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None, 0, True
+        os.utime(path, None)
+        return results, len(data), False
+
+    def _store(self, key, data):
+        """Write the pickled <data> for <key> to the cache directory"""
+
+        # Write to a temporary file and rename so a partly written entry is never used
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp_fh:
+            tmp_fh.write(data)
+        os.replace(tmp_file, self._path(key))
+        self.evict()
+
+    def _add(self, key, signature, results, size):
+        self._entries[key] = (signature, results, size)
+        self._size += size
+        while self._size > self.max_size and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        self._size -= self._entries.pop(key)[2]
+
+    def evict(self):
+        """Remove the least recently used on-disk entries until they are within <max_size>"""
+
+        if self.cache_dir is None:
+            return
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.pkl'):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    # Removed by another process since the directory was listed
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total_size = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Return a dictionary of the cache hits, misses, invalidations (entries
+        replaced because the log changed) and evictions, and the number and
+        total size of the entries held in memory
+        """
+
+        return {'hits' : self.hits, 'misses' : self.misses, 'invalidations' : self.invalidations,
+                'evictions' : self.evictions, 'entries' : len(self._entries), 'size' : self._size}
@@ -4,29 +4,51 @@ import sys
 import argparse
 
 from astrometrica2ades import utils
+from astrometrica2ades import cache
+from astrometrica2ades import watch
 
 def parse_args(args):
 
     parser = argparse.ArgumentParser(description='Convert Astrometrica output to ADES PSV format',
-                                     usage='%(prog)s [--sitecode] <MPCReport file> [output PSV file]')
-    parser.add_argument('mpcreport', help='Path to MPCReport.txt file')
+                                     usage='%(prog)s [--sitecode] <MPCReport file> [output PSV file]\n'
+                                           '       %(prog)s [--jobs N] --batch <directory or glob> [...]\n'
+                                           '       %(prog)s [--settle SECS] [--interval SECS] --watch <directory> [...]')
+    parser.add_argument('mpcreport', nargs='?', help='Path to MPCReport.txt file')
     parser.add_argument('outFile', nargs='?', help='Output file')
     parser.add_argument('--sitecode', help='Sitecode to process if different from that in MPCReport.txt')
     parser.add_argument('--look', action='store_true', help='Add in LOOK Project collaborators')
+    parser.add_argument('--incremental', action='store_true', help='Only convert observations appended since the last incremental run')
+    parser.add_argument('--log-index', action='store_true', help='Only read the Astrometrica.log sessions with images from the same dates as the report (using a session index)')
+    parser.add_argument('--low-memory', action='store_true', help='Only keep the Astrometrica.log measurements needed for the report')
+    parser.add_argument('--overlap', action='store_true', help='Read the Astrometrica.log in the background while the report is decoded')
+    parser.add_argument('--validation', choices=utils.validation_levels, default='strict', help='How thoroughly observation lines are checked (strict: every value must convert back, normal: range checks only, trusted: no checks)')
+    parser.add_argument('--cache-dir', help='Directory to cache converted PSV files in, to skip unchanged reports')
+    parser.add_argument('--cache-size', type=int, default=1024, help='Maximum total size of the PSV and log caches in MB (split equally)')
+    parser.add_argument('--batch', nargs='+', metavar='DIR', help='Convert every MPCReport*.txt found under these directories (or globs)')
+    parser.add_argument('--watch', nargs='+', metavar='DIR', help='Watch these directories (recursively) and convert MPCReport*.txt files as they are saved')
+    parser.add_argument('--settle', type=float, default=0.5, help='Seconds a report must be unchanged before converting in --watch mode')
+    parser.add_argument('--interval', type=float, default=0.25, help='Seconds between polls in --watch mode')
+    parser.add_argument('-j', '--jobs', dest='workers', type=int, default=1, help='Number of worker processes to parse the log and decode observations with')
 
     options = parser.parse_args(args)
 
+    if options.batch is not None and options.watch is not None:
+        parser.error('--batch cannot be combined with --watch')
+    if options.batch is not None or options.watch is not None:
+        if options.mpcreport is not None:
+            parser.error('%s cannot be combined with an MPCReport file' % ('--batch' if options.batch is not None else '--watch'))
+    elif options.mpcreport is None:
+        parser.error('an MPCReport file, --batch or --watch is required')
+
     mpcreport = ''
     outFile = ''
 
-    if options.outFile is None:
+    if options.batch is not None or options.watch is not None:
+        mpcreport = None
+        outFile = None
+    elif options.outFile is None:
         mpcreport = options.mpcreport
-        outFileName = os.path.basename(mpcreport)
-        if '.txt' in outFileName:
-            outFileName = outFileName.replace('.txt', '.psv')
-        else:
-            outFileName += '.psv'
-        outFile = os.path.join(os.path.dirname(mpcreport), outFileName)
+        outFile = utils.psv_filename(mpcreport)
     else:
         mpcreport = options.mpcreport
         outFile = options.outFile
@@ -36,11 +58,46 @@ def parse_args(args):
     del(options_dict['outFile'])
     return mpcreport, outFile, options_dict
 
+def convert_batch(paths, options):
+
+    mpcreports = utils.find_mpcreports(paths)
+    print("Found %d MPCReport files" % len(mpcreports))
+    summary = utils.convert_batch(mpcreports, **options)
+    for mpcreport, reason in summary['failures']:
+        print("Error processing %s: %s" % (mpcreport, reason))
+    print("Converted %d files (%d observations), %d failures in %.1fs" % \
+        (summary['files'], summary['observations'], len(summary['failures']), summary['time']))
+    if 'cache_hits' in summary:
+        print("Cache: %d hits, %d misses" % (summary['cache_hits'], summary['cache_misses']))
+
+    return summary
+
 def convert():
 
     rms_available = False
 
     mpcreport, outFile, options = parse_args(sys.argv[1:])
+    batch = options.pop('batch')
+    watch_paths = options.pop('watch')
+    settle = options.pop('settle')
+    interval = options.pop('interval')
+    cache_dir = options.pop('cache_dir')
+    cache_size = options.pop('cache_size')
+    if cache_dir is not None:
+        # Split the size limit between the PSV and parsed log caches
+        options['cache'] = cache.OutputCache(cache_dir, cache_size * 1024**2 // 2)
+        options['log_cache'] = cache.LogCache(os.path.join(cache_dir, 'logs'), cache_size * 1024**2 // 2)
+    elif batch is not None or watch_paths is not None:
+        # Reports in the same directory share an Astrometrica.log, so only parse it once
+        options['log_cache'] = cache.LogCache()
+    if watch_paths is not None:
+        watch.watch(watch_paths, settle, interval, **options)
+        return
+    if batch is not None:
+        summary = convert_batch(batch, options)
+        if len(summary['failures']) > 0:
+            sys.exit(1)
+        return
 
     log_string = ''
     astrometrica_log = utils.find_astrometrica_log(mpcreport)
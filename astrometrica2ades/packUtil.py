@@ -11,6 +11,7 @@ from __future__ import unicode_literals
 
 import sys
 import re
+import functools
 
 #
 # codes and translations
@@ -253,6 +254,72 @@ trksubRegexHelp = ( '([A-Za-z][A-Za-z0-9]{0,5}' +         # anything six charact
                     ')' )
 trksubRegex = re.compile('^' + trksubRegexHelp + '$')
 
+#
+# The same language as trksubRegex as a table of rules: anything of up to
+# six letters and digits starting with a letter is a trkSub; for seven
+# characters the rule depends on the first character (any upper case
+# letter without a rule is a trkSub, lower case ones are not)
+#
+_trksubLetters = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz')
+_trksubDigits = frozenset('0123456789')
+_trksubHalfMonths = frozenset('ABCDEFGHJKLMNOPQRSTUVWXYZ')
+_trksubOrders = frozenset('0ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+def _trksubNotProvID(s):
+   # [I-K]\d\d[A-HJ-Z].\d[0A-Z] would be a packed provID
+   return not (s[1] in _trksubDigits and s[2] in _trksubDigits and s[3] in _trksubHalfMonths
+               and s[5] in _trksubDigits and s[6] in _trksubOrders)
+
+def _trksubNotSurvey(s):
+   # (PL|T1|T2|T3)S\d{4} would be a packed survey provID
+   return s[2] != 'S' or any(c in _trksubLetters for c in s[3:])
+
+_trksubSevenRules = { c: lambda s: False for c in 'abcdefghijklmnopqrstuvwxyz' }
+_trksubSevenRules.update({ c: _trksubNotProvID for c in 'IJK' })
+_trksubSevenRules['P'] = lambda s: s[1] != 'L' or _trksubNotSurvey(s)
+_trksubSevenRules['T'] = lambda s: s[1] not in '123' or _trksubNotSurvey(s)
+
+def _isTrksub(s):
+   """ _isTrksub returns whether s is exactly a valid trkSub """
+   n = len(s)
+   # ASCII letters and digits only, starting with a letter
+   if n == 0 or n > 7 or not (s.isascii() and s.isalnum() and s[0].isalpha()):
+      return False
+   if n < 7:
+      return True
+   rule = _trksubSevenRules.get(s[0])
+   return rule is None or rule(s)
+
+def matchTrksub(trkSub):
+   """ matchTrksub checks trkSub as trksubRegex.match would
+
+       Input:
+          trkSub: the trkSub to check (a single trailing newline is ignored)
+       Output:
+          the trkSub (without the newline), or None if it isn't valid
+   """
+   if trkSub[-1:] == '\n':
+      trkSub = trkSub[:-1]
+   n = len(trkSub)
+   if n == 0 or n > 7 or not (trkSub.isascii() and trkSub.isalnum() and trkSub[0].isalpha()):
+      return None
+   if n == 7:
+      rule = _trksubSevenRules.get(trkSub[0])
+      if rule is not None and not rule(trkSub):
+         return None
+   return trkSub
+
+def _matchTrksubTail(packedID, pos):
+   """ _matchTrksubTail returns the trkSub in packedID[pos:] (followed by
+       blanks, as trksubRegexHelp + ' *$' would match) or None """
+   tail = packedID[pos:]
+   if tail[-1:] == '\n':
+      tail = tail[:-1]
+   tail = tail.rstrip(' ')
+   if _isTrksub(tail):
+      return tail
+   return None
+
 
 #
 # Minor Planet groups: 
@@ -350,47 +417,84 @@ _initpackLetters()
 
         
 
-def unpackPackedID(packedID):
-   """ unpackePackedID unpacks an MPC 80-column ID
+#
+# The permID (columns 1-5) and the alternative tails (columns 6-12) of minor
+# planet packed IDs, tried in the same order as in minorplanetPackedIDRegex
+#
+minorplanetPackedPermIDRegex = re.compile(r' {5}|([0-9A-Za-z])(\d{4})')
+minorplanetPackedProvIDTailRegex = re.compile(r'([I-K])(\d{2})([A-HJ-Y])([a-zA-Z0-9])(\d)(?:([A-HJ-Z])|0)$')
+minorplanetPackedSurveyTailRegex = re.compile(r'(PL|T1|T2|T3)S(\d{4})$')
+minorplanetPackedBlankTailRegex = re.compile(' *$')
+
+def _unpackMinorPlanetID(packedID):
+   """ _unpackMinorPlanetID unpacks a minor planet packed ID (or trkSub)
        Input:
           packedID: The 12-character packed ID
        Output:
-          (permID, provID, trkSub)
+          (permID, provID, trkSub) or None if it isn't a minor planet ID
    """
    permID = None
    provID = None
    trkSub = None
+   p = minorplanetPackedPermIDRegex.match(packedID)
+   if not p:
+      return None
    #
-   # groups:  0: <letnum> or None  1: 4 digits or None -- 2: <letnum> 3: yy 4: <halfmonth> : 5: <letnum> 6: digig 7: order
+   # groups:  1: <letnum> 2: yy 3: <halfmonth> : 4: <letnum> 5: digit 6: order
    #
-   m = minorplanetPackedIDRegex.match(packedID)
-   if m: 
-      if m.group(1):  # check for permID presence
-         n = int(m.group(2)) + 10000*unpackLetters[m.group(1)]
-         if (n == 0):
-            raise RuntimeError("Can't unpack because minor planet number for " 
-                                + packedID + " is zero")
-         permID = str(n)
-      
-      if m.group(3): # check for normal provID presence
-         y = unpackLetters[m.group(3)] * 100 + int(m.group(4))
-         y = "{0:0d}".format(y)
-         n = unpackLetters[m.group(6)] * 10 + int(m.group(7))
-         if n==0:
-            ns = ''
-         else:
-            ns = str(n)
-         if m.group(8):  # normal asteroid provid
-             provID =  y + ' ' + m.group(5) + m.group(8) + ns
-         else:           # comet ID -- use A/
-             provID =  'A/' + y + ' ' + m.group(5) + ns
+   # Column 6 rules out most of the alternatives: provIDs start with [I-K]
+   # and surveys with P or T
+   #
+   m = None
+   s = None
+   t = None
+   c = packedID[5:6]
+   if c and c in 'IJK':
+      m = minorplanetPackedProvIDTailRegex.match(packedID, 5)
+   elif c and c in 'PT':
+      s = minorplanetPackedSurveyTailRegex.match(packedID, 5)
+   if not m and not s:
+      t = _matchTrksubTail(packedID, 5)
+      if not t and not minorplanetPackedBlankTailRegex.match(packedID, 5):
+         return None
+
+   if p.group(1):  # check for permID presence
+      n = int(p.group(2)) + 10000*unpackLetters[p.group(1)]
+      if (n == 0):
+         raise RuntimeError("Can't unpack because minor planet number for " 
+                             + packedID + " is zero")
+      permID = str(n)
+
+   if m: # check for normal provID presence
+      y = unpackLetters[m.group(1)] * 100 + int(m.group(2))
+      y = "{0:0d}".format(y)
+      n = unpackLetters[m.group(4)] * 10 + int(m.group(5))
+      if n==0:
+         ns = ''
+      else:
+         ns = str(n)
+      if m.group(6):  # normal asteroid provid
+          provID =  y + ' ' + m.group(3) + m.group(6) + ns
+      else:           # comet ID -- use A/
+          provID =  'A/' + y + ' ' + m.group(3) + ns
 
-      if m.group(9): # check for survey provID presence
-         provID =  m.group(10) + ' ' + m.group(9)[0] + '-' + m.group(9)[1]
+   if s: # check for survey provID presence
+      provID =  s.group(2) + ' ' + s.group(1)[0] + '-' + s.group(1)[1]
 
-      if not permID and m.group(11): # check for trkSub -- can't be provID may not have permID
-         trkSub = m.group(11).strip()
+   if not permID and t: # check for trkSub -- can't be provID may not have permID
+      trkSub = t
 
+   return (permID, provID, trkSub)
+
+def _unpackCometID(packedID):
+   """ _unpackCometID unpacks a comet packed ID
+       Input:
+          packedID: The 12-character packed ID
+       Output:
+          (permID, provID, None) or None if it isn't a comet ID
+   """
+   permID = None
+   provID = None
    #
    # Comet groups:
    #
@@ -410,44 +514,56 @@ def unpackPackedID(packedID):
    #   11: a-z; comet fragment 
    #
    m = cometPackedIDRegex.match(packedID)
-   if m:
-     cometType = m.group(2)
-     if m.group(1):
-        n = int(m.group(1))
-        if (n == 0):
-           raise RuntimeError("Can't unpack because comet number for " 
-                               + packedID + " is zero")
-        if (cometType != 'P' and cometType != 'D' and cometType != 'I'):
-           raise RuntimeError("Can't unpack because comet type for " 
-                               + packedID + " must be P or D")
-        permID = str(n) + cometType
-        #
-        # now check for fragments
-        #
-        if m.group(9):
-          permID = permID + '-' + m.group(9).upper()
-        if m.group(11):
-          frag = (m.group(10) + m.group(11)).strip().upper()
-          permID = permID + '-' + frag
-
-     if m.group(3):
-        y = unpackLetters[m.group(3)] * 100 + int(m.group(4))
-        y = "{0:0d}".format(y)
-        n = unpackLetters[m.group(6)] * 10 + int(m.group(7))
-        if n==0:
-           ns = ''
-        else:
-           ns = str(n)
-        extra = ''
-        if m.group(8): # m.group(8) changes nothing 
-           extra = m.group(8) # adds order
+   if not m:
+      return None
+   cometType = m.group(2)
+   if m.group(1):
+      n = int(m.group(1))
+      if (n == 0):
+         raise RuntimeError("Can't unpack because comet number for " 
+                             + packedID + " is zero")
+      if (cometType != 'P' and cometType != 'D' and cometType != 'I'):
+         raise RuntimeError("Can't unpack because comet type for " 
+                             + packedID + " must be P or D")
+      permID = str(n) + cometType
+      #
+      # now check for fragments
+      #
+      if m.group(9):
+        permID = permID + '-' + m.group(9).upper()
+      if m.group(11):
+        frag = (m.group(10) + m.group(11)).strip().upper()
+        permID = permID + '-' + frag
+
+   if m.group(3):
+      y = unpackLetters[m.group(3)] * 100 + int(m.group(4))
+      y = "{0:0d}".format(y)
+      n = unpackLetters[m.group(6)] * 10 + int(m.group(7))
+      if n==0:
+         ns = ''
+      else:
+         ns = str(n)
+      extra = ''
+      if m.group(8): # m.group(8) changes nothing 
+         extra = m.group(8) # adds order
+
+      frag = ''
+      if m.group(9): # fragment letter
+         frag = '-' + m.group(9).upper()
 
-        frag = ''
-        if m.group(9): # fragment letter
-           frag = '-' + m.group(9).upper()
+      provID =  m.group(2) + '/' + y + ' ' + m.group(5) + extra + ns + frag
 
-        provID =  m.group(2) + '/' + y + ' ' + m.group(5) + extra + ns + frag
+   return (permID, provID, None)
 
+def _unpackSatelliteID(packedID):
+   """ _unpackSatelliteID unpacks a natural satellite packed ID
+       Input:
+          packedID: The 12-character packed ID
+       Output:
+          (permID, provID, None) or None if it isn't a satellite ID
+   """
+   permID = None
+   provID = None
    #
    # Satellite groups:
    #
@@ -462,33 +578,52 @@ def unpackPackedID(packedID):
    #    7: <digit>
    #
    m = satellitePackedIDRegex.match(packedID)
-   if m:
-     if m.group(1):
-        n = int(m.group(2))
-        if (n == 0):
-           raise RuntimeError("Can't unpack because satellite number for " 
-                               + packedID + " is zero")
-        permID =  planetNameDict[m.group(1)] + " " +  str(n)
-     if m.group(3):
-        y = unpackLetters[m.group(3)] * 100 + int(m.group(4))
-        y = "{0:0d}".format(y)
-        n = unpackLetters[m.group(6)] * 10 + int(m.group(7))
-        if n==0:
-           ns = ''
-        else:
-           ns = str(n)
-        provID =  'S/' + y + ' ' + m.group(5) + ' ' + ns
+   if not m:
+      return None
+   if m.group(1):
+      n = int(m.group(2))
+      if (n == 0):
+         raise RuntimeError("Can't unpack because satellite number for " 
+                             + packedID + " is zero")
+      permID =  planetNameDict[m.group(1)] + " " +  str(n)
+   if m.group(3):
+      y = unpackLetters[m.group(3)] * 100 + int(m.group(4))
+      y = "{0:0d}".format(y)
+      n = unpackLetters[m.group(6)] * 10 + int(m.group(7))
+      if n==0:
+         ns = ''
+      else:
+         ns = str(n)
+      provID =  'S/' + y + ' ' + m.group(5) + ' ' + ns
+
+   return (permID, provID, None)
 
-   if not permID and not provID and not trkSub: # oops -- nothing here
+#
+# Column 5 of a packed ID is the object type for comets ([APCDXI]) and
+# natural satellites (S); it is a digit or blank for minor planets (and
+# trkSubs), so each ID can only match one of the decoders
+#
+_unpackDispatch = { c: _unpackCometID for c in 'APCDXI' }
+_unpackDispatch['S'] = _unpackSatelliteID
+
+def _unpackPackedID(packedID):
+   """ _unpackPackedID unpacks an MPC 80-column ID (uncached)
+       Input:
+          packedID: The 12-character packed ID
+       Output:
+          (permID, provID, trkSub)
+   """
+   ids = _unpackDispatch.get(packedID[4:5], _unpackMinorPlanetID)(packedID)
+   if ids is None or not any(ids): # oops -- nothing here
       raise RuntimeError("Can't unpack " + repr(packedID) + " because this does not match a valid packed ID")
 
-   return (permID, provID, trkSub)
+   return ids
 
 
-def packTupleID(triplet):
+def _packTupleID(triplet):
    """
-   packTupleID packs an (permID, provID, trkSub) into
-   MPC 80-column format or raises an exception about why not
+   _packTupleID packs an (permID, provID, trkSub) into
+   MPC 80-column format or raises an exception about why not (uncached)
 
    Input:
       (permID, provID, trkSub)  or  [permID, provID, trkSub]
@@ -695,15 +830,9 @@ def packTupleID(triplet):
    packedTrkSub = None # may be None if permID is None
    if trkSub is not None: # otherwise try to decode it
       #
-      # check trksub regex
+      # check trksub (as trksubRegex would)
       #
-      m = trksubRegex.match(trkSub)
-      if m:
-         tmp = m.group(1)
-         #print ("m.groups is ", m.groups())
-         if len(tmp) > 7:
-            raise RuntimeError("Can't pack " + trkSub + " because it it is too long")
-         packedTrkSub = m.group(1)
+      packedTrkSub = matchTrksub(trkSub)
 
       if not packedTrkSub:  # none falls through
           raise RuntimeError("invalid trkSub " + trkSub)
@@ -747,3 +876,133 @@ def packTupleID(triplet):
       return packed
 
    raise RuntimeError("Can't pack " + repr(triplet) )
+
+
+#
+# LRU caches of the packing and unpacking results, as reports repeat the
+# same few designations on many lines. functools.lru_cache is thread-safe.
+# Exceptions are not cached.
+#
+packCacheSize = 1024
+
+def setPackCacheSize(maxsize):
+   """ setPackCacheSize sets the number of entries kept in each of the
+       unpackPackedID and packTupleID caches, emptying them
+
+       Input:
+          maxsize: maximum number of entries (0 disables caching,
+                   None means unbounded)
+   """
+   global packCacheSize, _cachedUnpackPackedID, _cachedPackTupleID
+   packCacheSize = maxsize
+   _cachedUnpackPackedID = functools.lru_cache(maxsize)(_unpackPackedID)
+   _cachedPackTupleID = functools.lru_cache(maxsize)(_packTupleID)
+
+setPackCacheSize(packCacheSize)
+
+def clearPackCache():
+   """ clearPackCache empties the unpackPackedID and packTupleID caches and
+       resets their statistics """
+   _cachedUnpackPackedID.cache_clear()
+   _cachedPackTupleID.cache_clear()
+
+def packCacheInfo():
+   """ packCacheInfo returns the statistics of the caches
+
+       Output:
+          {'unpackPackedID': {'hits', 'misses', 'maxsize', 'currsize'},
+           'packTupleID': {...}}
+   """
+   return {'unpackPackedID': _cachedUnpackPackedID.cache_info()._asdict(),
+           'packTupleID': _cachedPackTupleID.cache_info()._asdict()}
+
+def unpackPackedID(packedID):
+   """ unpackePackedID unpacks an MPC 80-column ID
+       Input:
+          packedID: The 12-character packed ID
+       Output:
+          (permID, provID, trkSub)
+
+       Results are cached (see setPackCacheSize)
+   """
+   return _cachedUnpackPackedID(packedID)
+
+def packTupleID(triplet):
+   """
+   packTupleID packs an (permID, provID, trkSub) into
+   MPC 80-column format or raises an exception about why not
+
+   Input:
+      (permID, provID, trkSub)  or  [permID, provID, trkSub]
+   Output:
+      packedID: The 12-character packed ID
+
+   Results for tuples are cached (see setPackCacheSize); lists are
+   packed directly.
+   """
+   if isinstance(triplet, tuple):
+      try:
+         hash(triplet)
+      except TypeError:
+         return _packTupleID(triplet)
+      return _cachedPackTupleID(triplet)
+   return _packTupleID(triplet)
+
+#
+# Bulk versions: each distinct input is converted once and the per-item
+# errors are returned rather than raised
+#
+_bulkErrors = (RuntimeError, ValueError, KeyError, IndexError, TypeError)
+
+def _convertMany(convert, items, key):
+   """ _convertMany applies convert to each distinct item (as given by key)
+       returning aligned lists of the results and error messages """
+   done = {}
+   results = []
+   errors = []
+   for item in items:
+      try:
+         k = key(item)
+         hash(k)
+      except TypeError:
+         k = None
+      if k is not None and k in done:
+         result, error = done[k]
+      else:
+         try:
+            result, error = convert(item), None
+         except _bulkErrors as e:
+            result, error = None, str(e).strip() or e.__class__.__name__
+         if k is not None:
+            done[k] = (result, error)
+      results.append(result)
+      errors.append(error)
+   return results, errors
+
+def unpackMany(packedIDs):
+   """ unpackMany unpacks a sequence of MPC 80-column IDs, unpacking each
+       distinct ID only once
+       Input:
+          packedIDs: iterable of 12-character packed IDs
+       Output:
+          (results, errors): lists aligned with packedIDs of the
+          (permID, provID, trkSub) tuples (None where the ID couldn't be
+          unpacked) and the error messages (None where it could)
+
+       The pack caches are not used or filled.
+   """
+   return _convertMany(_unpackPackedID, packedIDs, lambda packedID: packedID)
+
+def packMany(triplets):
+   """ packMany packs a sequence of (permID, provID, trkSub) tuples or
+       lists, packing each distinct one only once
+       Input:
+          triplets: iterable of (permID, provID, trkSub)
+       Output:
+          (results, errors): lists aligned with triplets of the 12-character
+          packed IDs (None where the triplet couldn't be packed) and the
+          error messages (None where it could)
+
+       The pack caches are not used or filled.
+   """
+   return _convertMany(_packTupleID, triplets, tuple)
@@ -16,6 +16,7 @@ import sys
 import re
 import io
 import math
+import functools
 
 #import adesutility
 
@@ -151,13 +152,80 @@ def checkSexagesimal(line):
         #360:    HH.h
         #3600:   HH
    """
+   fast = _fastSexagesimal(line)
+   if fast is not None:
+      return fast
    for (check, action) in _checks:
       m = check.match(line)
       if m:
         return action(m)
    errorSexVal('sexagesimal date must be "HH MM SS.ss" not ', line)
 
-_checkDate = re.compile('^((16|17|18|19|[2-9]\d)\d\d) (0[1-9]|10|11|12) ((0[1-9]|[12]\d|30|31)\.(\d+)) *$')
+#
+# Fast path: recognise the layouts above from the positions of the spaces
+# and dot instead of trying each regex in turn. Anything unusual (non-ASCII
+# digits, a trailing newline, a bad value) is left to the regexes.
+#
+_normalPrecs = [10.0 ** (-k) for k in range(10)]
+
+def _fastSexagesimal(line):
+   """
+   _fastSexagesimal parses a sexagesimal value in one of the layouts
+   accepted by checkSexagesimal without using regular expressions
+
+   Input:
+      line is of the form DD MM SS.sss (or HH MM SS.sss)
+
+   Output:
+      (hh, mm, ss, prec) as returned by checkSexagesimal, or None if line
+      isn't in one of the layouts
+
+   Global effects:
+      updates the _count variable of the layout
+   """
+   global _countNormal
+   global _countIntegerSeconds
+   global _countMinutesHundredths
+   global _countMinutesTenths
+   global _countIntegerMinutes
+   s = line.rstrip(' ')
+   n = len(s)
+   if n < 5 or s[2] != ' ' or not s.isascii():
+      return None
+   # everything but the separators must be digits
+   digits = s.replace(' ', '').replace('.', '', 1)
+   if not digits.isdigit():
+      return None
+   c = s[5:6]
+   if n > 8:
+      if c == ' ' and s[8] == '.' and len(digits) == n - 3: # HH MM SS.sss
+         _countNormal += 1
+         k = n - 9
+         return (int(s[0:2]), int(s[3:5]), float(s[6:]), _normalPrecs[k] if k < 10 else 10.0 ** (-k))
+   elif n == 8:
+      if c == ' ' and len(digits) == 6:              # HH MM SS
+         _countIntegerSeconds += 1
+         return (int(s[0:2]), int(s[3:5]), int(s[6:8]), 1)
+      if c == '.' and len(digits) == 6:              # HH MM.mm
+         _countMinutesHundredths += 1
+         return (int(s[0:2]), float(s[3:8]), 0, 0.6)
+   elif n == 7:
+      if c == '.' and len(digits) == 5:              # HH MM.m
+         _countMinutesTenths += 1
+         return (int(s[0:2]), float(s[3:7]), 0, 6)
+   elif n == 5 and len(digits) == 4:                 # HH MM
+      _countIntegerMinutes += 1
+      return (int(s[0:2]), int(s[3:5]), 0, 60)
+   return None
+
+#
+# A date is checked in two parts: the 'YYYY MM DD' day, which is the same
+# on every line of a night and so is validated once and cached, and the
+# fraction of the day. Together they accept exactly the dates matched by
+# '^((16|17|18|19|[2-9]\d)\d\d) (0[1-9]|10|11|12) ((0[1-9]|[12]\d|30|31)\.(\d+)) *$'
+#
+_checkDay = re.compile(r'((16|17|18|19|[2-9]\d)\d\d) (0[1-9]|10|11|12) (0[1-9]|[12]\d|30|31)')
+_checkDayFraction = re.compile(r'\.(\d+) *$')
 
 _countDate1 = 0
 _countDate10 = 0
@@ -172,6 +240,63 @@ def twoDigit(t):
    ss = "{0:.0f}".format(t+100.0)[1:]
    return ss
 
+def _sexDay(day):
+   """ _sexDay validates the 'YYYY MM DD' day of a date (uncached)
+
+       Inputs:
+           day:  first 10 characters of a sexDate string
+       Return Value:
+           None if day isn't of the form 'YYYY MM DD', otherwise a tuple
+            (isoDay, validDay)
+            isoDay:   'YYYY-MM-DD'
+            validDay: False if the day doesn't exist in February
+   """
+   m = _checkDay.fullmatch(day)
+   if not m:
+      return None
+   yyyy = int(m.group(1))
+   mm = int(m.group(3))
+   dd = int(m.group(4))
+   validDay = True
+   if mm == 2:
+      if dd >= 30:
+         validDay = False
+      # Check for leap years
+      elif dd >= 29 and (yyyy % 4 == 0 and (yyyy % 100 != 0 or yyyy % 400 == 0)) is False:
+         validDay = False
+   return (m.group(1) + '-' + m.group(3) + '-' + m.group(4), validDay)
+
+#
+# LRU cache of the validated days, as every line of a night has the same day
+#
+dayCacheSize = 256
+
+def setDayCacheSize(maxsize):
+   """ setDayCacheSize sets the number of days kept in the sexDateToISO
+       day cache, emptying it
+
+       Input:
+          maxsize: maximum number of entries (0 disables caching,
+                   None means unbounded)
+   """
+   global dayCacheSize, _cachedSexDay
+   dayCacheSize = maxsize
+   _cachedSexDay = functools.lru_cache(maxsize)(_sexDay)
+
+setDayCacheSize(dayCacheSize)
+
+def clearDayCache():
+   """ clearDayCache empties the day cache and resets its statistics """
+   _cachedSexDay.cache_clear()
+
+def dayCacheInfo():
+   """ dayCacheInfo returns the statistics of the day cache
+
+       Output:
+          {'hits', 'misses', 'maxsize', 'currsize'}
+   """
+   return _cachedSexDay.cache_info()._asdict()
+
 def sexDateToISO(sexDate):
    """ translates date into iso date
 
@@ -187,7 +312,8 @@ def sexDateToISO(sexDate):
             RuntimeError if not valid
 
        Global effects:
-           updates _countDate variables
+           updates _countDate variables and the day cache (see
+           setDayCacheSize)
    """
    global _countDate1
    global _countDate10
@@ -198,20 +324,13 @@ def sexDateToISO(sexDate):
    global _countDate1000000
    global _countDateBig
    global _countDateSmall
-   m = _checkDate.match(sexDate)
-   if m:
-     #print (m.groups())
-     yyyy = int(m.group(1))
-     mm = int(m.group(3))
-     dd = float(m.group(4))
-     prec = int( 10.0**(6 - len(m.group(6)))) # >1 for legal mpc
-     #print (m.group(1), m.group(3), m.group(4), "prec = ", prec)
-     if mm == 2:
-         if dd >= 30.0:
-            errorSexVal('invalid date for February, should not be ', sexDate)
-         # Check for leap years
-         elif dd >= 29.0 and (yyyy % 4 == 0 and (yyyy % 100 != 0 or yyyy % 400 == 0)) is False:
-            errorSexVal('invalid date for February, should not be ', sexDate)
+   day = _cachedSexDay(sexDate[:10])
+   m = _checkDayFraction.match(sexDate, 10)
+   if day and m:
+     (isoDay, validDay) = day
+     prec = int( 10.0**(6 - len(m.group(1)))) # >1 for legal mpc
+     if not validDay:
+         errorSexVal('invalid date for February, should not be ', sexDate)
      if prec <= 1: _countDate1 += 1
      if prec == 10: _countDate10 += 1
      if prec == 100: _countDate100 += 1
@@ -221,7 +340,7 @@ def sexDateToISO(sexDate):
      if prec == 1000000: _countDate1000000 += 1
      if prec > 1000000: _countDateBig += 1
      if prec < 1: _countDateSmall += 1
-     oldfracdd = m.group(4)[2:]
+     oldfracdd = sexDate[10:m.end(1)]
      fracdd = float(oldfracdd) * 86400.0 + 0.001 # 0.001 avoids round-off to <secs>.999999
      hh = int(fracdd/3600.0);
      fracdd = fracdd - hh*3600.0
@@ -233,7 +352,7 @@ def sexDateToISO(sexDate):
           ss = "59.9"
      else:
          ss = "{0:.1f}".format(fracdd+100.0)[1:]
-     isodate = m.group(1) + '-' + m.group(3)  + '-' + m.group(4)[0:2]  + 'T' + twoDigit(hh) + ':' + twoDigit(mm) + ':' + ss+ 'Z'
+     isodate = isoDay + 'T' + twoDigit(hh) + ':' + twoDigit(mm) + ':' + ss+ 'Z'
 
      if (ss[0:2] == "60") or (ss[0] == "-"):  # should raise error
         print ("Bad Date: " + ss + " for ss in date:",  sexDate)
@@ -282,14 +401,20 @@ def isoToSexDate(isodate, prec):
    return "{0:17s}".format(sexdate)  # get length right
 
 
-def checkDate(rdict):
+def checkDate(rdict, validation='strict'):
    """ checks that rdict['date'] is valid and sets
        rdict['obsTime'] and 
-       rdict['precTime'] if it is"""
+       rdict['precTime'] if it is
+
+       The reverse conversion is only checked if validation is 'strict';
+       for the full 17 column date of an observation line it only fails
+       for dates that sexDateToISO rejects anyway"""
    date = rdict['date']
    (dateiso, prec, fracdd) = sexDateToISO(date)
    rdict['obsTime'] = dateiso
    rdict['precTime'] = prec
+   if validation != 'strict':
+      return
    #
    # test by turning it back -- valid prec is 1 through 100000
    #
@@ -301,6 +426,25 @@ def checkDate(rdict):
 secToDegrees = 360.0/86400.0
 arcsecToDegrees = 1.0/3600.0
 
+def _decimalFormat(prec, scale, formats):
+   """ _decimalFormat returns the format string for a decimal degrees value
+       of precision prec (in units of scale degrees), remembering it in
+       formats """
+   try:
+      return formats[prec]
+   except KeyError:
+      digits = -int(math.floor(math.log10(prec*scale)))
+      if digits < 1:
+        digits = 1
+      formats[prec] = '{0:.' + repr(digits) + 'f}'
+      return formats[prec]
+
+_raFormats = {}
+_decFormats = {}
+for _prec in [60, 6, 0.6, 1] + _normalPrecs:
+   _decimalFormat(_prec, secToDegrees, _raFormats)
+   _decimalFormat(_prec, arcsecToDegrees, _decFormats)
+
 def sexRaToDecRa( sexRa ):
    """ converts sexagesimal Ra to decimal degrees
 
@@ -311,11 +455,13 @@ def sexRaToDecRa( sexRa ):
           decRa: string decimal degrees RA 
           prec: precison value
    """
-   (hours, minutes, seconds, prec) = checkSexagesimal(sexRa)
-   digits = -int(math.floor(math.log10(prec*secToDegrees)))  
-   if digits < 1:
-     digits = 1
-   fmt = '{0:.' + repr(digits) + 'f}'
+   return _decRaFromParts(checkSexagesimal(sexRa))
+
+def _decRaFromParts(parts):
+   """ _decRaFromParts converts the (hours, minutes, seconds, prec) parts
+       returned by checkSexagesimal to (decRa, prec) """
+   (hours, minutes, seconds, prec) = parts
+   fmt = _decimalFormat(prec, secToDegrees, _raFormats)
    value = (hours*3600.0 + minutes*60.0 + seconds)*secToDegrees
    
    raDec = fmt.format(value)
@@ -351,11 +497,30 @@ def decRaToSexRa( decRa, prec ):
 
    return "{0:12s}".format(revstr)  # get length right
    
-def checkRa(rdict):
+def _checkRanges(line, parts):
+   """ _checkRanges checks the minutes and seconds of the parts of line
+       returned by checkSexagesimal are below 60 and that "SS." seconds
+       have decimals, which is what the reverse conversions reject for
+       values that checkSexagesimal accepts"""
+   (hh, mm, ss, prec) = parts
+   if mm >= 60 or ss >= 60 or (prec == 1 and line[8:9] == '.'):
+      errorSexVal(" invalid minutes or seconds: ", line)
+
+def checkRa(rdict, validation='strict'):
    """ checks that rdict['raSexagesimal'] is valid and adds 
        rdict['raDecimalDecgrees'] and 
-       rdict['precRA'] if it is"""
+       rdict['precRA'] if it is
+
+       validation is 'strict' (check the reverse conversion),
+       'normal' (check the minutes and seconds are in range) or
+       'trusted' (no checks beyond parsing)"""
    ra = rdict['raSexagesimal']
+   if validation != 'strict':
+      parts = checkSexagesimal(ra)
+      if validation == 'normal':
+         _checkRanges(ra, parts)
+      (rdict['ra'], rdict['precRA']) = _decRaFromParts(parts)
+      return
    (decRa, prec) = sexRaToDecRa(ra)
    rdict['precRA'] = prec
    rdict['ra'] = decRa
@@ -378,15 +543,17 @@ def sexDeclToDecDecl( sexDec ):
    # column 1 must be + or -
    sign = sexDec[0]
    valueError(sign, sexDec, 1, 1, ('+', '-')) # column 1 must be +/-
+   return _decDeclFromParts(sign, checkSexagesimal(sexDec[1:]))
+
+def _decDeclFromParts(sign, parts):
+   """ _decDeclFromParts converts the sign and (degrees, minutes, seconds,
+       prec) parts returned by checkSexagesimal to (decDecl, prec) """
    if (sign == '-'):
       signval = -1.0
    else:
       signval = 1.0
-   (degrees, minutes, seconds, prec) = checkSexagesimal(sexDec[1:])
-   digits = -int(math.floor(math.log10(prec*arcsecToDegrees)))  
-   if digits < 1:
-     digits = 1
-   fmt = '{0:.' + repr(digits) + 'f}'
+   (degrees, minutes, seconds, prec) = parts
+   fmt = _decimalFormat(prec, arcsecToDegrees, _decFormats)
    value = signval * (degrees + minutes/60.0 + seconds/3600.0)
    decDecl = fmt.format(value)
    #print ("rdict['decSexagesimal'] = ", rdict['decSexagesimal'], sign, degrees, minutes, seconds, prec, value, digits, decDecl)
@@ -425,11 +592,21 @@ def degDeclToSexDecl( sexDecl, prec ):
       revstr = revSign + '{0:.0f}'.format(100+revDeg)[1:] + ' ' + '{0:.0f}'.format(100+revMin)[1:] + ' ' + fmt.format(100.0 + rev)[1:]
    return "{0:12s}".format(revstr)  # get length right
 
-def checkDec(rdict):
+def checkDec(rdict, validation='strict'):
    """ checks that rdict['decSexagesimal'] is valid and adds 
        rdict['dec'] and 
-       rdict['precDec'] if it is"""
+       rdict['precDec'] if it is
+
+       validation is as for checkRa"""
    decSexagesimal = rdict['decSexagesimal']
+   if validation != 'strict':
+      sign = decSexagesimal[0]
+      valueError(sign, decSexagesimal, 1, 1, ('+', '-')) # column 1 must be +/-
+      parts = checkSexagesimal(decSexagesimal[1:])
+      if validation == 'normal':
+         _checkRanges(decSexagesimal[1:], parts)
+      (rdict['dec'], rdict['precDec']) = _decDeclFromParts(sign, parts)
+      return
 
    (decDeg, prec) = sexDeclToDecDecl( decSexagesimal )
    rdict['precDec'] =  prec
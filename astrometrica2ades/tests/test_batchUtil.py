@@ -0,0 +1,199 @@
+import os
+
+import pytest
+import pkg_resources
+import numpy as np
+
+from astrometrica2ades import sexVals
+from astrometrica2ades.utils import parse_dataline
+from astrometrica2ades.batchUtil import *
+
+class Test_ParseDatalinesBatch(object):
+
+    def setup_method(self):
+        test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+
+        self.body = []
+        with open(test_mpcreport, 'r') as test_fh:
+            for line in test_fh:
+                if line[0:3] not in ['COD','CON','OBS','MEA','TEL','ACK','AC2','COM','NET'] \
+                    and '----- end -----' not in line:
+                    self.body.append(line.rstrip())
+
+    def test_matches_scalar(self):
+
+        data, valid = parse_datalines_batch(self.body)
+
+        assert len(self.body) == len(data)
+        assert valid.all()
+        for line, row in zip(self.body, data):
+            expected = parse_dataline(line)
+            assert expected['obsTime'] == row['obsTime'].decode('ascii')
+            assert expected['precTime'] == row['precTime']
+            assert expected['ra'] == "%.5f" % row['ra']
+            assert expected['dec'] == "%.5f" % row['dec']
+            assert expected['precRA'] == row['precRA']
+            assert expected['precDec'] == row['precDec']
+            assert (expected['permID'] or '') == row['permID']
+            assert (expected['provID'] or '') == row['provID']
+            assert (expected['trkSub'] or '') == row['trkSub']
+            assert expected['mode'] == row['mode']
+            assert expected['stn'] == row['stn'].decode('ascii')
+            assert float(expected['mag']) == pytest.approx(row['mag'])
+
+    def test_first_row(self):
+
+        data, valid = parse_datalines_batch(self.body[0:1])
+
+        assert valid[0]
+        assert b'     K17BC1T' == data['totalid'][0]
+        assert u'2017 BT121' == data['provID'][0]
+        assert b'2018-02-16T04:45:22.06Z' == data['obsTime'][0]
+        assert 171.72571 == pytest.approx(data['ra'][0], abs=5e-6)
+        assert -4.41242 == pytest.approx(data['dec'][0], abs=5e-6)
+        assert 20.2 == pytest.approx(data['mag'][0])
+        assert b'W85' == data['stn'][0]
+
+    def test_bad_rows_masked(self):
+
+        good = self.body[0]
+        lines = [good,
+                 good + 'foo',                          # too long
+                 good[:15] + '2O18' + good[19:],        # bad year
+                 good[:20] + '13' + good[22:],          # bad month
+                 good[:15] + '2018 02 30' + good[25:],  # bad February day
+                 good[:35] + '61' + good[37:],          # bad RA minutes
+                 good[:44] + ' ' + good[45:],           # Dec must have a sign
+                 good[:13] + 'Z' + good[14:],           # invalid note
+                 '     K13J22N  S2018 02 28.02505 16 47 10.53 +01 01 26.6          19   RLEE024C51',
+                 good,
+                ]
+
+        data, valid = parse_datalines_batch(lines)
+
+        assert [True, False, False, False, False, False, False, False, False, True] == valid.tolist()
+        for line, ok in zip(lines, valid):
+            if not ok:
+                with pytest.raises(RuntimeError):
+                    parse_dataline(line)
+
+    def test_bad_rows_masked_round_trip(self):
+
+        good = self.body[0]
+        lines = [good,
+                 good[:32] + '12 34 56.   ' + good[44:],   # no decimals
+                 good[:35] + '61' + good[37:],             # bad RA minutes
+                 good[:44] + '+12 34 60.0 ' + good[56:],   # bad Dec seconds
+                 good,
+                ]
+
+        data, valid = parse_datalines_batch(lines, round_trip=True)
+
+        assert [True, False, False, False, True] == valid.tolist()
+        assert (parse_datalines_batch(self.body, round_trip=True)[1]).all()
+
+    def test_blank_mag(self):
+
+        line = self.body[0][:65] + '     ' + self.body[0][70:]
+
+        data, valid = parse_datalines_batch([line])
+
+        assert valid[0]
+        assert np.isnan(data['mag'][0])
+
+    def test_empty(self):
+
+        data, valid = parse_datalines_batch([])
+
+        assert 0 == len(data)
+        assert 0 == len(valid)
+
+class Test_DecodeSexagesimal(object):
+
+    def test_layouts(self):
+        fields = [b'12 13 14.5  ', b'12 13 14    ', b'12 13.12    ', b'12 13.1     ', b'12 13       ', b'12          ']
+        chars = np.frombuffer(b''.join(fields), dtype=np.uint8).reshape(len(fields), 12)
+
+        major, minutes, seconds, prec, ok = decode_sexagesimal(chars)
+
+        assert [True, True, True, True, True, False] == ok.tolist()
+        assert [0.1, 1, 0.6, 6, 60] == prec[:5].tolist()
+        assert [13, 13, 13.12, 13.1, 13] == minutes[:5].tolist()
+        assert [14.5, 14, 0, 0, 0] == seconds[:5].tolist()
+
+def scalar(func, *args):
+    try:
+        return func(*args)
+    except RuntimeError:
+        return None
+
+class Test_Converters(object):
+
+    def setup_method(self):
+        self.ras = ['12 34 56.78 ', '00 00 00.000', '23 59 59.999', '12 34 56    ', '12 34.56    ', '12 34.5     ',
+                    '12 34       ', '12 34 56.   ', '12 34 56.7890', '99 59 59.99 ', '12 3x 56.78 ', '12 34 56.7 8',
+                    '', '12']
+        self.decs = ['+' + ra[:11] for ra in self.ras] + ['-' + ra[:11] for ra in self.ras] + \
+            ['-00 00 00.0 ', '-00 00 00.00', '*12 00 00.0 ', ' 12 00 00.0 ']
+        self.dates = ['2018 02 16.19817 ', '2018 02 16.198171', '2018 02 16.1', '2018 02 16.1981712', '2020 02 29.5     ',
+                      '2019 02 29.5     ', '1599 01 01.0     ', '2018 13 01.0     ', '2018 02 16       ', '2018 02 16.99999 ']
+
+    def test_sex_ra_to_dec_ra(self):
+
+        decRa, prec, ok = sex_ra_to_dec_ra(self.ras)
+
+        for ra, d, p, o in zip(self.ras, decRa, prec, ok):
+            expected = scalar(sexVals.sexRaToDecRa, ra)
+            assert expected == ((d.decode('ascii'), p) if o else None), ra
+
+    def test_sex_decl_to_dec_decl(self):
+
+        decDecl, prec, ok = sex_decl_to_dec_decl(self.decs)
+
+        for dec, d, p, o in zip(self.decs, decDecl, prec, ok):
+            expected = scalar(sexVals.sexDeclToDecDecl, dec) if dec[0:1] in '+-' else None
+            assert expected == ((d.decode('ascii'), p) if o else None), dec
+
+    def test_sex_date_to_iso(self):
+
+        isodate, prec, ok = sex_date_to_iso(self.dates)
+
+        for date, iso, p, o in zip(self.dates, isodate, prec, ok):
+            expected = scalar(sexVals.sexDateToISO, date)
+            assert (expected[0:2] if expected else None) == ((iso.decode('ascii'), p) if o else None), date
+
+    def test_inverses(self):
+
+        decRa, prec, ok = sex_ra_to_dec_ra(self.ras)
+        sexRa, reverse_ok = dec_ra_to_sex_ra(decRa[ok], prec[ok])
+        assert reverse_ok.all()
+        assert [sexVals.decRaToSexRa(d.decode('ascii'), p) for d, p in zip(decRa[ok], prec[ok])] == \
+            [s.decode('ascii') for s in sexRa]
+
+        decDecl, prec, ok = sex_decl_to_dec_decl(self.decs)
+        sexDecl, reverse_ok = deg_decl_to_sex_decl(decDecl[ok], prec[ok])
+        assert reverse_ok.all()
+        assert [sexVals.degDeclToSexDecl(d.decode('ascii'), p) for d, p in zip(decDecl[ok], prec[ok])] == \
+            [s.decode('ascii') for s in sexDecl]
+        assert b'-00 00 00.0 ' in sexDecl.tolist()
+
+        isodate, prec, ok = sex_date_to_iso(self.dates)
+        sexdate, reverse_ok = iso_to_sex_date(isodate[ok], prec[ok])
+        assert reverse_ok.all()
+        assert [sexVals.isoToSexDate(d.decode('ascii'), p) for d, p in zip(isodate[ok], prec[ok])] == \
+            [s.decode('ascii') for s in sexdate]
+
+    def test_numbers(self):
+
+        sexRa, ok = dec_ra_to_sex_ra([188.73658, np.nan], [0.01, 0.01])
+        assert [True, False] == ok.tolist()
+        assert b'12 34 56.78 ' == sexRa[0]
+
+        sexDecl, ok = deg_decl_to_sex_decl([-0.0, -12.5], 0.1)
+        assert [b'-00 00 00.0 ', b'-12 30 00.0 '] == sexDecl.tolist()
+
+    def test_bad_decimals(self):
+
+        sexRa, ok = dec_ra_to_sex_ra(['188.73658', 'x', ''], [0.01, 0.01, 0.01])
+
+        assert [True, False, False] == ok.tolist()
@@ -0,0 +1,223 @@
+import os
+
+import pytest
+import pkg_resources
+
+from astrometrica2ades import cache as cache_module
+from astrometrica2ades.cache import OutputCache, LogCache
+from astrometrica2ades.utils import convert_mpcreport_to_psv, convert_batch, read_astrometrica_logfile, psv_filename, _batch_groups
+
+class Test_OutputCache:
+
+    def read_file(self, filename):
+        with open(filename, 'r') as fh:
+            return fh.read()
+
+    def copy_file(self, src, dest):
+        with open(src, 'rb') as in_fh, open(dest, 'wb') as out_fh:
+            out_fh.write(in_fh.read())
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, tmpdir):
+        self.tmpdir = tmpdir.strpath
+
+        self.test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+        self.test_log = pkg_resources.resource_filename(__package__, os.path.join('data', 'Astrometrica.log'))
+        self.test_psv = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.psv'))
+
+        self.cache = OutputCache(os.path.join(self.tmpdir, 'cache'))
+        self.outfile = os.path.join(self.tmpdir, 'out.psv')
+
+    def test_miss_then_hit(self):
+        num_objects = convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, display=False, cache=self.cache)
+        os.remove(self.outfile)
+        cached_objects = convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, display=False, cache=self.cache)
+
+        assert cached_objects == num_objects
+        assert self.read_file(self.outfile) == self.read_file(self.test_psv)
+        assert self.cache.stats() == {'hits' : 1, 'misses' : 1, 'evictions' : 0}
+
+    def test_key_changes(self):
+        key = self.cache.key(self.test_mpcreport)
+
+        assert key == self.cache.key(self.test_mpcreport)
+        assert key != self.cache.key(self.test_mpcreport, self.test_log)
+        assert key != self.cache.key(self.test_mpcreport, look=True)
+        assert self.cache.key('foobarbiff') is None
+
+    def test_changed_report_misses(self):
+        mpcreport = os.path.join(self.tmpdir, 'MPCReport.txt')
+        self.copy_file(self.test_mpcreport, mpcreport)
+        convert_mpcreport_to_psv(mpcreport, self.outfile, display=False, cache=self.cache)
+        with open(mpcreport, 'r') as fh:
+            lines = fh.readlines()
+        with open(mpcreport, 'w') as fh:
+            fh.writelines(lines[:-2])
+
+        convert_mpcreport_to_psv(mpcreport, self.outfile, display=False, cache=self.cache)
+
+        assert self.cache.hits == 0
+        assert self.cache.misses == 2
+
+    def test_lru_eviction(self):
+        psv_size = os.path.getsize(self.test_psv)
+        cache = OutputCache(os.path.join(self.tmpdir, 'small_cache'), max_size=2*psv_size + 100)
+        for key in ['a', 'b']:
+            cache.store(key, self.test_psv, 1)
+        # Use 'a' so that 'b' is the least recently used
+        os.utime(os.path.join(cache.cache_dir, 'b.psv'), (1, 1))
+        os.utime(os.path.join(cache.cache_dir, 'b.json'), (1, 1))
+        assert cache.restore('a', self.outfile) == 1
+
+        cache.store('c', self.test_psv, 1)
+
+        assert cache.evictions == 1
+        assert cache.restore('b', self.outfile) is None
+        assert cache.restore('c', self.outfile) == 1
+
+    def test_evict_entry_removed_while_listing(self, monkeypatch):
+        self.cache.store('a', self.test_psv, 1)
+        listing = list(os.scandir(self.cache.cache_dir))
+        os.remove(os.path.join(self.cache.cache_dir, 'a.psv'))
+        monkeypatch.setattr(cache_module.os, 'scandir', lambda path: iter(listing))
+
+        self.cache.evict()
+
+        assert self.cache.evictions == 0
+
+    def test_batch_summary(self):
+        night_dir = os.path.join(self.tmpdir, 'night')
+        os.makedirs(night_dir)
+        mpcreport = os.path.join(night_dir, 'MPCReport.txt')
+        self.copy_file(self.test_mpcreport, mpcreport)
+
+        first = convert_batch([mpcreport], cache=self.cache)
+        second = convert_batch([mpcreport], cache=self.cache)
+
+        assert (first['cache_hits'], first['cache_misses']) == (0, 1)
+        assert (second['cache_hits'], second['cache_misses']) == (1, 0)
+        assert second['observations'] == first['observations']
+
+class Test_LogCache:
+
+    def read_file(self, filename):
+        with open(filename, 'r') as fh:
+            return fh.read()
+
+    def copy_file(self, src, dest):
+        with open(src, 'rb') as in_fh, open(dest, 'wb') as out_fh:
+            out_fh.write(in_fh.read())
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, tmpdir):
+        self.tmpdir = tmpdir.strpath
+
+        self.test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+        self.test_psv_rms = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport_rms.psv'))
+        self.log = os.path.join(self.tmpdir, 'Astrometrica.log')
+        self.copy_file(pkg_resources.resource_filename(__package__, os.path.join('data', 'Astrometrica.log')), self.log)
+
+        self.cache_dir = os.path.join(self.tmpdir, 'logs')
+        self.outfile = os.path.join(self.tmpdir, 'out.psv')
+
+    def test_memory_hit(self):
+        cache = LogCache()
+
+        results = cache.read(self.log)
+        cached_results = cache.read(self.log)
+
+        assert results == read_astrometrica_logfile(self.log)
+        assert cached_results is results
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_disk_hit(self):
+        results = LogCache(self.cache_dir).read(self.log)
+        cache = LogCache(self.cache_dir)
+
+        assert cache.read(self.log) == results
+        assert (cache.hits, cache.misses) == (1, 0)
+
+    def test_dates_cached_separately(self):
+        cache = LogCache()
+
+        cache.read(self.log)
+        cache.read(self.log, dates=['2018-03-06'])
+
+        assert cache.misses == 2
+
+    def append_line(self, filename):
+        with open(filename, 'a') as fh:
+            fh.write("\n")
+
+    def test_invalidated_when_log_grows(self):
+        cache = LogCache()
+        cache.read(self.log)
+        self.append_line(self.log)
+
+        results = cache.read(self.log)
+
+        assert results == read_astrometrica_logfile(self.log)
+        assert cache.stats() == {'hits' : 0, 'misses' : 2, 'invalidations' : 1, 'evictions' : 0,
+                                 'entries' : 1, 'size' : cache.stats()['size']}
+
+    def test_disk_invalidated_when_log_grows(self):
+        LogCache(self.cache_dir).read(self.log)
+        self.append_line(self.log)
+        cache = LogCache(self.cache_dir)
+
+        cache.read(self.log)
+        cache.read(self.log)
+
+        assert (cache.hits, cache.misses, cache.invalidations) == (1, 1, 1)
+
+    def test_size_eviction(self):
+        other_log = os.path.join(self.tmpdir, 'Other.log')
+        self.copy_file(self.log, other_log)
+        cache = LogCache(self.cache_dir)
+        cache.read(self.log)
+        cache.max_size = cache.stats()['size'] + 100
+
+        cache.read(other_log)
+        cache.read(self.log)
+
+        assert cache.evictions >= 2
+        assert cache.stats()['entries'] == 1
+        assert len([name for name in os.listdir(self.cache_dir) if name.endswith('.pkl')]) == 1
+
+    def test_evict_entry_removed_while_listing(self, monkeypatch):
+        cache = LogCache(self.cache_dir)
+        cache.read(self.log)
+        listing = list(os.scandir(self.cache_dir))
+        for entry in listing:
+            os.remove(entry.path)
+        monkeypatch.setattr(cache_module.os, 'scandir', lambda path: iter(listing))
+        cache.max_size = 0
+
+        cache.evict()
+
+        assert os.listdir(self.cache_dir) == []
+
+    def test_convert_with_log_cache(self):
+        cache = LogCache()
+        convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, True, self.log, display=False, log_cache=cache)
+        os.remove(self.outfile)
+        convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, True, self.log, display=False, log_cache=cache)
+
+        assert cache.hits == 1
+        assert self.read_file(self.outfile) == self.read_file(self.test_psv_rms)
+
+    def test_batch_groups_by_log(self):
+        mpcreports = [os.path.join(self.tmpdir, name) for name in ['MPCReport.txt', 'MPCReport_2.txt']]
+        other_dir = os.path.join(self.tmpdir, 'nolog')
+        os.makedirs(other_dir)
+        mpcreports.append(os.path.join(other_dir, 'MPCReport.txt'))
+        for mpcreport in mpcreports:
+            self.copy_file(self.test_mpcreport, mpcreport)
+
+        assert _batch_groups(mpcreports, {'log_cache' : LogCache()}) == [mpcreports[0:2], mpcreports[2:]]
+        assert _batch_groups(mpcreports, {}) == [[mpcreport] for mpcreport in mpcreports]
+
+        summary = convert_batch(mpcreports, workers=2, log_cache=LogCache())
+
+        assert summary['files'] == 3
+        assert self.read_file(psv_filename(mpcreports[1])) == self.read_file(self.test_psv_rms)
@@ -14,7 +14,7 @@ class TestParseArgs(object):
     def test_parser_no_output_specified(self):
         expected_input = 'MPCReport.txt'
         expected_output = 'MPCReport.psv'
-        expected_dict = {'look': False, 'sitecode': None}
+        expected_dict = {'look': False, 'sitecode': None, 'workers': 1, 'batch': None, 'incremental': False, 'log_index': False, 'low_memory': False, 'overlap': False, 'cache_dir': None, 'cache_size': 1024, 'validation': 'strict', 'watch': None, 'settle': 0.5, 'interval': 0.25}
 
         input_file, output_file, options_dict = parse_args(['MPCReport.txt'])
 
@@ -25,7 +25,7 @@ class TestParseArgs(object):
     def test_parser_output_specified(self):
         expected_input = 'MPCReport.txt'
         expected_output = 'MPCReport_foo.psv'
-        expected_dict = {'look': False, 'sitecode': None}
+        expected_dict = {'look': False, 'sitecode': None, 'workers': 1, 'batch': None, 'incremental': False, 'log_index': False, 'low_memory': False, 'overlap': False, 'cache_dir': None, 'cache_size': 1024, 'validation': 'strict', 'watch': None, 'settle': 0.5, 'interval': 0.25}
 
         input_file, output_file, options_dict = parse_args(['MPCReport.txt', 'MPCReport_foo.psv'])
 
@@ -37,7 +37,7 @@ class TestParseArgs(object):
         path = os.path.join(os.sep, 'tmp', 'foo')
         expected_input = os.path.join(path, 'MPCReport.txt')
         expected_output = os.path.join(path, 'MPCReport.psv')
-        expected_dict = {'look': False, 'sitecode': None}
+        expected_dict = {'look': False, 'sitecode': None, 'workers': 1, 'batch': None, 'incremental': False, 'log_index': False, 'low_memory': False, 'overlap': False, 'cache_dir': None, 'cache_size': 1024, 'validation': 'strict', 'watch': None, 'settle': 0.5, 'interval': 0.25}
 
         input_file, output_file, options_dict = parse_args([os.path.join(path, 'MPCReport.txt')])
 
@@ -50,7 +50,7 @@ class TestParseArgs(object):
         out_path = os.path.join(os.sep, 'tmp', 'bar')
         expected_input = os.path.join(in_path, 'MPCReport.txt')
         expected_output = os.path.join(out_path, 'MPCReport_foo.psv')
-        expected_dict = {'look': False, 'sitecode': None}
+        expected_dict = {'look': False, 'sitecode': None, 'workers': 1, 'batch': None, 'incremental': False, 'log_index': False, 'low_memory': False, 'overlap': False, 'cache_dir': None, 'cache_size': 1024, 'validation': 'strict', 'watch': None, 'settle': 0.5, 'interval': 0.25}
 
         input_file, output_file, options_dict = parse_args([os.path.join(in_path, 'MPCReport.txt'), os.path.join(out_path, 'MPCReport_foo.psv')])
 
@@ -63,7 +63,7 @@ class TestParseArgs(object):
         out_path = os.path.join(os.sep, 'tmp', 'bar')
         expected_input = os.path.join(in_path, 'MPCReport.txt')
         expected_output = os.path.join(out_path, 'MPCReport_foo.psv')
-        expected_dict = {'look': False, 'sitecode': 'W86'}
+        expected_dict = {'look': False, 'sitecode': 'W86', 'workers': 1, 'batch': None, 'incremental': False, 'log_index': False, 'low_memory': False, 'overlap': False, 'cache_dir': None, 'cache_size': 1024, 'validation': 'strict', 'watch': None, 'settle': 0.5, 'interval': 0.25}
 
         input_file, output_file, options_dict = parse_args([os.path.join(in_path, 'MPCReport.txt'), os.path.join(out_path, 'MPCReport_foo.psv'), '--sitecode=W86'])
 
@@ -76,10 +76,45 @@ class TestParseArgs(object):
         out_path = os.path.join(os.sep, 'tmp', 'bar')
         expected_input = os.path.join(in_path, 'MPCReport.txt')
         expected_output = os.path.join(out_path, 'MPCReport_foo.psv')
-        expected_dict = {'look': False, 'sitecode': 'W86'}
+        expected_dict = {'look': False, 'sitecode': 'W86', 'workers': 1, 'batch': None, 'incremental': False, 'log_index': False, 'low_memory': False, 'overlap': False, 'cache_dir': None, 'cache_size': 1024, 'validation': 'strict', 'watch': None, 'settle': 0.5, 'interval': 0.25}
 
         input_file, output_file, options_dict = parse_args([os.path.join(in_path, 'MPCReport.txt'), os.path.join(out_path, 'MPCReport_foo.psv'), '--sitecode', 'W86'])
 
         assert expected_input == input_file
         assert expected_output == output_file
         assert expected_dict == options_dict
+
+    def test_parser_jobs(self):
+        expected_dict = {'look': False, 'sitecode': None, 'workers': 4, 'batch': None, 'incremental': False, 'log_index': False, 'low_memory': False, 'overlap': False, 'cache_dir': None, 'cache_size': 1024, 'validation': 'strict', 'watch': None, 'settle': 0.5, 'interval': 0.25}
+
+        input_file, output_file, options_dict = parse_args(['--jobs', '4', 'MPCReport.txt'])
+
+        assert expected_dict == options_dict
+
+    def test_parser_batch(self):
+        expected_dict = {'look': False, 'sitecode': None, 'workers': 2, 'batch': ['/tmp/foo', '/tmp/bar*'], 'incremental': False, 'log_index': False, 'low_memory': False, 'overlap': False, 'cache_dir': None, 'cache_size': 1024, 'validation': 'strict', 'watch': None, 'settle': 0.5, 'interval': 0.25}
+
+        input_file, output_file, options_dict = parse_args(['-j', '2', '--batch', '/tmp/foo', '/tmp/bar*'])
+
+        assert input_file is None
+        assert output_file is None
+        assert expected_dict == options_dict
+
+    def test_parser_batch_and_file(self):
+
+        with pytest.raises(SystemExit) as e_info:
+            input_file, output_file, options_dict = parse_args(['MPCReport.txt', '--batch', '/tmp/foo'])
+
+    def test_parser_watch(self):
+        expected_dict = {'look': False, 'sitecode': None, 'workers': 1, 'batch': None, 'incremental': False, 'log_index': False, 'low_memory': False, 'overlap': False, 'cache_dir': None, 'cache_size': 1024, 'validation': 'strict', 'watch': ['/tmp/foo'], 'settle': 1.0, 'interval': 0.25}
+
+        input_file, output_file, options_dict = parse_args(['--settle', '1', '--watch', '/tmp/foo'])
+
+        assert input_file is None
+        assert output_file is None
+        assert expected_dict == options_dict
+
+    def test_parser_watch_and_batch(self):
+
+        with pytest.raises(SystemExit) as e_info:
+            input_file, output_file, options_dict = parse_args(['--batch', '/tmp/foo', '--watch', '/tmp/bar'])
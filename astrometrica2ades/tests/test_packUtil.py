@@ -408,3 +408,359 @@ class TestConversions(object):
        self.testConverter("    SG10J010", True, self.testPackedRoundTrip, stream)
        self.testConverter("    SK10JB10", True, self.testPackedRoundTrip, stream)
 
+
+class Test_PackCache(object):
+
+    def setup_method(self):
+        clearPackCache()
+
+    def teardown_method(self):
+        setPackCacheSize(1024)
+
+    def test_unpack_hits(self):
+        first = unpackPackedID('     K18D01E')
+        second = unpackPackedID('     K18D01E')
+
+        assert first == second == (None, '2018 DE1', None)
+        assert packCacheInfo()['unpackPackedID']['hits'] == 1
+        assert packCacheInfo()['unpackPackedID']['misses'] == 1
+
+    def test_pack_tuple_cached_list_not(self):
+        packed = packTupleID((None, '2018 DE1', None))
+
+        assert packTupleID([None, '2018 DE1', None]) == packed
+        assert packCacheInfo()['packTupleID']['currsize'] == 1
+        assert packTupleID((None, '2018 DE1', None)) == packed
+        assert packCacheInfo()['packTupleID']['hits'] == 1
+
+    def test_errors_not_cached(self):
+        for attempt in range(2):
+            with pytest.raises(RuntimeError):
+                unpackPackedID('     !!!!!!!')
+
+        assert packCacheInfo()['unpackPackedID']['currsize'] == 0
+
+    def test_bounded(self):
+        setPackCacheSize(2)
+        for packed in ['00001       ', '00002       ', '00003       ']:
+            unpackPackedID(packed)
+
+        assert packCacheInfo()['unpackPackedID']['currsize'] == 2
+        assert packCacheInfo()['unpackPackedID']['maxsize'] == 2
+
+    def test_disabled_matches_cached(self):
+        packed_ids = ['00001       ', '     K18D01E', '0073P       ', 'J013S       ', '     A1b2c3d']
+        cached = [unpackPackedID(packed) for packed in packed_ids]
+        setPackCacheSize(0)
+
+        assert [unpackPackedID(packed) for packed in packed_ids] == cached
+        assert packCacheInfo()['unpackPackedID']['currsize'] == 0
+
+    def test_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        setPackCacheSize(4)
+        packed_ids = ['%05d       ' % n for n in range(1, 20)] * 50
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(unpackPackedID, packed_ids))
+
+        assert results == [(str(int(packed)), None, None) for packed in packed_ids]
+
+
+def legacy_unpackPackedID(packedID):
+   """ unpackPackedID as it was before dispatching on column 5, for the equivalence tests
+       Input:
+          packedID: The 12-character packed ID
+       Output:
+          (permID, provID, trkSub)
+   """
+   permID = None
+   provID = None
+   trkSub = None
+   #
+   # groups:  0: <letnum> or None  1: 4 digits or None -- 2: <letnum> 3: yy 4: <halfmonth> : 5: <letnum> 6: digig 7: order
+   #
+   m = minorplanetPackedIDRegex.match(packedID)
+   if m: 
+      if m.group(1):  # check for permID presence
+         n = int(m.group(2)) + 10000*unpackLetters[m.group(1)]
+         if (n == 0):
+            raise RuntimeError("Can't unpack because minor planet number for " 
+                                + packedID + " is zero")
+         permID = str(n)
+      
+      if m.group(3): # check for normal provID presence
+         y = unpackLetters[m.group(3)] * 100 + int(m.group(4))
+         y = "{0:0d}".format(y)
+         n = unpackLetters[m.group(6)] * 10 + int(m.group(7))
+         if n==0:
+            ns = ''
+         else:
+            ns = str(n)
+         if m.group(8):  # normal asteroid provid
+             provID =  y + ' ' + m.group(5) + m.group(8) + ns
+         else:           # comet ID -- use A/
+             provID =  'A/' + y + ' ' + m.group(5) + ns
+
+      if m.group(9): # check for survey provID presence
+         provID =  m.group(10) + ' ' + m.group(9)[0] + '-' + m.group(9)[1]
+
+      if not permID and m.group(11): # check for trkSub -- can't be provID may not have permID
+         trkSub = m.group(11).strip()
+
+   #
+   # Comet groups:
+   #
+   #  PermID:  
+   #    1: 4 digits  -- None if no PermID
+   #    2: PCDX  -- used by provID too.  Only PD for PermID.  Is A allowed????
+   #  ProvID:  None if not present
+   #    3: <letnum>
+   #    4: <yy>
+   #    5: <halfmonth>
+   #    6: <letnum>
+   #    7: <digit>
+   #    8: A-Z; comet coded as asteroid
+   #    9: a-z; comet fragment 
+   # fragment marker for permID only (blanks in cols 6-10)
+   #   10: a-z; comet fragment first letter or blank
+   #   11: a-z; comet fragment 
+   #
+   m = cometPackedIDRegex.match(packedID)
+   if m:
+     cometType = m.group(2)
+     if m.group(1):
+        n = int(m.group(1))
+        if (n == 0):
+           raise RuntimeError("Can't unpack because comet number for " 
+                               + packedID + " is zero")
+        if (cometType != 'P' and cometType != 'D' and cometType != 'I'):
+           raise RuntimeError("Can't unpack because comet type for " 
+                               + packedID + " must be P or D")
+        permID = str(n) + cometType
+        #
+        # now check for fragments
+        #
+        if m.group(9):
+          permID = permID + '-' + m.group(9).upper()
+        if m.group(11):
+          frag = (m.group(10) + m.group(11)).strip().upper()
+          permID = permID + '-' + frag
+
+     if m.group(3):
+        y = unpackLetters[m.group(3)] * 100 + int(m.group(4))
+        y = "{0:0d}".format(y)
+        n = unpackLetters[m.group(6)] * 10 + int(m.group(7))
+        if n==0:
+           ns = ''
+        else:
+           ns = str(n)
+        extra = ''
+        if m.group(8): # m.group(8) changes nothing 
+           extra = m.group(8) # adds order
+
+        frag = ''
+        if m.group(9): # fragment letter
+           frag = '-' + m.group(9).upper()
+
+        provID =  m.group(2) + '/' + y + ' ' + m.group(5) + extra + ns + frag
+
+   #
+   # Satellite groups:
+   #
+   #  PermID:  None if not present
+   #    1: [JSUN]
+   #    2: 3 digits
+   #  ProvID:  None if not present
+   #    3: <letnum>
+   #    4: <yy>
+   #    5: JSUN
+   #    6: <letnum>
+   #    7: <digit>
+   #
+   m = satellitePackedIDRegex.match(packedID)
+   if m:
+     if m.group(1):
+        n = int(m.group(2))
+        if (n == 0):
+           raise RuntimeError("Can't unpack because satellite number for " 
+                               + packedID + " is zero")
+        permID =  planetNameDict[m.group(1)] + " " +  str(n)
+     if m.group(3):
+        y = unpackLetters[m.group(3)] * 100 + int(m.group(4))
+        y = "{0:0d}".format(y)
+        n = unpackLetters[m.group(6)] * 10 + int(m.group(7))
+        if n==0:
+           ns = ''
+        else:
+           ns = str(n)
+        provID =  'S/' + y + ' ' + m.group(5) + ' ' + ns
+
+   if not permID and not provID and not trkSub: # oops -- nothing here
+      raise RuntimeError("Can't unpack " + repr(packedID) + " because this does not match a valid packed ID")
+
+   return (permID, provID, trkSub)
+
+
+
+class Test_UnpackDispatch(object):
+
+    def outcome(self, unpack, packedID):
+        try:
+            return unpack(packedID)
+        except RuntimeError as e:
+            return 'RuntimeError: ' + str(e)
+
+    def suite_corpus(self):
+        """The packed IDs and the packed forms of the unpacked IDs used in the conversion tests above"""
+        import inspect
+        import re
+        source = inspect.getsource(TestConversions)
+        corpus = set(s for q, s in re.findall(r'testConverter\((["\'])(.{12})\1', source))
+        for triplet in re.findall(r'testConverter\((\([^()]*\)), ', source):
+            try:
+                corpus.add(packTupleID(eval(triplet)))
+            except RuntimeError:
+                pass
+        return corpus
+
+    def generated_corpus(self, count=20000):
+        import random
+        rng = random.Random(19)
+        alnum = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+        letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+        corpus = set()
+        for i in range(count):
+            kind = rng.randrange(8)
+            perm = rng.choice(['     ', rng.choice(alnum) + '%04d' % rng.randrange(10000)])
+            if kind == 0:   # minor planet provisional
+                tail = rng.choice('IJKL') + '%02d' % rng.randrange(100) + rng.choice(letters) + rng.choice(alnum) + \
+                    rng.choice('0123456789') + rng.choice('0ABIZa')
+            elif kind == 1: # survey
+                tail = rng.choice(['PL', 'T1', 'T2', 'T3', 'T4']) + rng.choice('SX') + '%04d' % rng.randrange(10000)
+            elif kind == 2: # trkSub
+                tail = ''.join(rng.choice(alnum) for c in range(rng.randrange(1, 8)))
+                tail = tail + ' ' * (7 - len(tail))
+            elif kind == 3: # comet
+                perm = rng.choice(['    ', '%04d' % rng.randrange(10000)]) + rng.choice('APCDXIS')
+                tail = rng.choice(['       ', '     ' + rng.choice('a ') + rng.choice('ab'),
+                    rng.choice(alnum) + '%02d' % rng.randrange(100) + rng.choice(letters) + rng.choice(alnum) +
+                    rng.choice('0123456789') + rng.choice('0Aa')])
+            elif kind == 4: # satellite
+                perm = rng.choice(['    ', rng.choice('JSUNX') + '%03d' % rng.randrange(1000)]) + 'S'
+                tail = rng.choice(['       ', rng.choice(alnum) + '%02d' % rng.randrange(100) + rng.choice('JSUNX') +
+                    rng.choice(alnum) + rng.choice('0123456789') + rng.choice('01')])
+            else:           # anything
+                perm = ''.join(rng.choice(alnum + ' ') for c in range(5))
+                tail = ''.join(rng.choice(alnum + ' -/') for c in range(7))
+            packedID = perm + tail
+            if rng.random() < 0.05:
+                packedID = packedID[:rng.randrange(13)]
+            elif rng.random() < 0.05:
+                packedID = packedID + '\n'
+            corpus.add(packedID)
+        return corpus
+
+    def test_matches_legacy(self):
+        corpus = self.suite_corpus() | self.generated_corpus()
+        corpus |= set(['', '    ', '     ', '            ', '     K18D01E\n', '0000A       ', '00433\n', '00433 \n', '     \n'])
+
+        for packedID in sorted(corpus):
+            assert self.outcome(unpackPackedID, packedID) == self.outcome(legacy_unpackPackedID, packedID), repr(packedID)
+
+    def test_suite_corpus(self):
+        corpus = self.suite_corpus()
+
+        assert len(corpus) > 50
+        assert any(packedID[4] in 'PCDXAI' for packedID in corpus)
+        assert any(packedID[4] == 'S' for packedID in corpus)
+
+class Test_Trksub(object):
+
+    def regex_match(self, s):
+        m = trksubRegex.match(s)
+        if m:
+            return m.group(1)
+        return None
+
+    def random_strings(self, count=200000):
+        import random
+        rng = random.Random(20)
+        # Weighted towards the characters the rules depend on
+        alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789' + 'IJKPTLS0123' * 4 + ' -\n'
+        prefixes = ['', '', 'PL', 'T1', 'T2', 'T3', 'PLS', 'T1S', 'I', 'J', 'K', 'K1', 'K18', 'K18D']
+        for i in range(count):
+            prefix = rng.choice(prefixes)
+            length = rng.randrange(0, 9)
+            s = prefix + ''.join(rng.choice(alphabet) for c in range(max(0, length - len(prefix))))
+            yield s
+
+    def test_matches_regex(self):
+        for s in self.random_strings():
+            assert matchTrksub(s) == self.regex_match(s), repr(s)
+
+    def test_provid_like(self):
+        for s in ['K18D01E', 'K18D01A', 'K18D010', 'J99A9Z0', 'I00B0a0', 'K18Da1E', 'K18I01E', 'K1aD01E']:
+            assert matchTrksub(s) == self.regex_match(s), repr(s)
+
+    def test_survey_like(self):
+        for s in ['PLS2040', 'PLS204a', 'T1S3138', 'T3SA000', 'T4S3138', 'PLX2040', 'PlS2040']:
+            assert matchTrksub(s) == self.regex_match(s), repr(s)
+
+    def test_pack_unpack(self):
+        assert packTupleID((None, None, 'A1b2c3d')) == '     A1b2c3d'
+        assert unpackPackedID('     A1b2c3d') == (None, None, 'A1b2c3d')
+        with pytest.raises(RuntimeError):
+            packTupleID((None, None, 'PLS2040'))
+
+class Test_Many(object):
+
+    def test_unpack_many(self):
+        packedIDs = ['     K18D01E', '00001       ', 'xxxxxxxxxxxx', '     K18D01E', 'J001S       ']
+
+        results, errors = unpackMany(packedIDs)
+
+        assert len(results) == len(errors) == len(packedIDs)
+        for packedID, result, error in zip(packedIDs, results, errors):
+            if error is None:
+                assert result == unpackPackedID(packedID)
+            else:
+                assert result is None
+                with pytest.raises(RuntimeError):
+                    unpackPackedID(packedID)
+        assert errors[2].startswith("Can't unpack 'xxxxxxxxxxxx'")
+
+    def test_unpack_many_dedup(self):
+        clearPackCache()
+        results, errors = unpackMany(['00001       '] * 100)
+
+        assert results == [('1', None, None)] * 100
+        assert errors == [None] * 100
+        assert results[0] is results[99]
+        assert packCacheInfo()['unpackPackedID']['currsize'] == 0
+
+    def test_unpack_many_bad_types(self):
+        results, errors = unpackMany([None, ['00001       '], '00001       '])
+
+        assert results[0:2] == [None, None]
+        assert errors[0] is not None and errors[1] is not None
+        assert results[2] == ('1', None, None) and errors[2] is None
+
+    def test_pack_many(self):
+        triplets = [('1', None, None), ['1', None, None], (None, '2018 DE1', None), (None, None, 'PLS2040'), None]
+
+        results, errors = packMany(triplets)
+
+        assert results == ['00001       ', '00001       ', '     K18D01E', None, None]
+        assert errors[0:3] == [None, None, None]
+        assert errors[3] == 'invalid trkSub PLS2040'
+        assert errors[4] is not None
+
+    def test_round_trip(self):
+        packedIDs = ['     K18D01E', '00001       ', 'J001S       ', '0003P       ', '     A1b2c3d']
+
+        results, errors = unpackMany(packedIDs)
+        packed, errors = packMany(results)
+
+        assert packed == packedIDs
+        assert errors == [None] * len(packedIDs)
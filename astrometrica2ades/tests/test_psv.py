@@ -1,8 +1,11 @@
 import os
+import json
+import concurrent.futures
 
 import pytest
 import pkg_resources
 
+from astrometrica2ades import utils
 from astrometrica2ades.utils import *
 
 class Test_ParseHeader(object):
@@ -226,6 +229,33 @@ class Test_ParseBody(object):
             data = parse_dataline(data_line)
         assert expected_message == str(e_info.value)
 
+    def test_line_too_short(self):
+
+        data_line = self.body[0][:79]
+        expected_message = 'Invalid MPC80COL line (no match for line) in line:\n' + data_line
+
+        with pytest.raises(RuntimeError) as e_info:
+            data = parse_dataline(data_line)
+        assert expected_message == str(e_info.value)
+
+    def test_line_bad_date_column(self):
+
+        data_line = self.body[0][:15] + '2O18' + self.body[0][19:]
+        expected_message = 'Invalid MPC80COL line (no match for line) in line:\n' + data_line
+
+        with pytest.raises(RuntimeError) as e_info:
+            data = parse_dataline(data_line)
+        assert expected_message == str(e_info.value)
+
+    def test_parser_matches(self):
+
+        parser = DatalineParser()
+
+        assert parser.matches(self.body[0]) is True
+        assert parser.matches(self.body[0] + '\n') is True
+        assert parser.matches(self.body[0][:-1] + '\n') is False
+        assert parser.matches(self.body[0][:12] + '#' + self.body[0][13:]) is False
+
     def test_unnumbered(self):
         expected_data = {u'astCat': ' ',
                          u'band': 'G',
@@ -260,6 +290,123 @@ class Test_ParseBody(object):
 
         assert expected_data == data
 
+class Test_ValidationLevels(object):
+
+    def setup_method(self):
+        self.line = '     K17BC1T KC2018 02 16.19817211 26 54.17 -04 24 44.7          20.2 G      W85'
+
+    def test_levels_decode_the_same(self):
+        expected = parse_dataline(self.line)
+
+        for level in validation_levels:
+            assert parse_dataline(self.line, level) == expected
+
+    def test_unknown_level(self):
+
+        with pytest.raises(ValueError):
+            DatalineParser('lax')
+        with pytest.raises(ValueError):
+            parse_dataline(self.line, 'lax')
+
+    def test_bad_ra_minutes(self):
+
+        data_line = self.line[:35] + '61' + self.line[37:]
+
+        for level in ['strict', 'normal']:
+            with pytest.raises(RuntimeError):
+                parse_dataline(data_line, level)
+        data = parse_dataline(data_line, 'trusted')
+        assert data['raSexagesimal'] == '11 61 54.17 '
+
+    def test_bad_dec_seconds(self):
+
+        data_line = self.line[:51] + '64.7' + self.line[55:]
+
+        for level in ['strict', 'normal']:
+            with pytest.raises(RuntimeError):
+                parse_dataline(data_line, level)
+        data = parse_dataline(data_line, 'trusted')
+        assert data['decSexagesimal'] == '-04 24 64.7 '
+
+    def test_bad_date_all_levels(self):
+
+        data_line = self.line[:20] + '13' + self.line[22:]
+
+        for level in validation_levels:
+            with pytest.raises(RuntimeError):
+                parse_dataline(data_line, level)
+
+    def test_date_checked_once(self, monkeypatch):
+        calls = []
+        sexDateToISO = utils.sexVals.sexDateToISO
+        def counting_sexDateToISO(date):
+            calls.append(date)
+            return sexDateToISO(date)
+        monkeypatch.setattr(utils.sexVals, 'sexDateToISO', counting_sexDateToISO)
+
+        parse_dataline(self.line)
+
+        assert calls == ['2018 02 16.198172']
+
+    def test_id_repacked_only_when_strict(self, monkeypatch):
+        calls = []
+        packTupleID = utils.packUtil.packTupleID
+        def counting_packTupleID(triplet):
+            calls.append(triplet)
+            return packTupleID(triplet)
+        monkeypatch.setattr(utils.packUtil, 'packTupleID', counting_packTupleID)
+
+        for level in validation_levels:
+            parse_dataline(self.line, level)
+
+        assert calls == [(None, '2017 BT121', None)]
+
+class Test_Observation(object):
+
+    def setup_method(self):
+        self.line = '     K18D01E KC2018 03 01.16162913 06 26.33 -23 24 51.0          20.78G      W87'
+
+    def test_to_dict_matches_parse_dataline(self):
+
+        obs = DatalineParser().parse_observation(self.line)
+
+        assert parse_dataline(self.line) == obs.to_dict()
+
+    def test_empty_line(self):
+
+        obs = DatalineParser().parse_observation('')
+
+        assert obs is None
+
+    def test_item_access(self):
+
+        obs = DatalineParser().parse_observation(self.line)
+
+        assert '     K18D01E' == obs['totalid']
+        assert obs.totalid == obs['totalid']
+        assert 'rmsRA' not in obs
+        assert obs.get('rmsRA') is None
+        with pytest.raises(KeyError):
+            obs['rmsRA']
+        obs['rmsRA'] = '0.12'
+        assert '0.12' == obs.rmsRA
+
+    def test_slots(self):
+
+        obs = Observation()
+
+        assert not hasattr(obs, '__dict__')
+        with pytest.raises(AttributeError):
+            obs.foo = 'bar'
+
+    def test_from_dict(self):
+
+        data = parse_and_modify_data(self.line, display=False)
+
+        obs = Observation.from_dict(data)
+
+        assert data == obs.to_dict()
+
 class Test_ReadAstrometricaLog(object):
 
     def setup_method(self):
@@ -321,6 +468,187 @@ class Test_ReadAstrometricaLog(object):
         assert expected_images == images
         assert expected_asteroids == asteroids
 
+    def test_feed_lines(self):
+        test_log = pkg_resources.resource_filename(__package__, os.path.join('data', 'Astrometrica_moving_obj.log'))
+        with open(test_log, 'r', encoding='cp1252') as log_fh:
+            lines = log_fh.readlines()
+
+        parser = utils._LogParser()
+        for line in lines:
+            parser.feed(line)
+
+        assert parser.results() == read_astrometrica_logfile(test_log)
+
+    def test_position_block_limit(self):
+        test_log = pkg_resources.resource_filename(__package__, os.path.join('data', 'Astrometrica_moving_obj.log'))
+        with open(test_log, 'r', encoding='cp1252') as log_fh:
+            lines = log_fh.readlines()
+        start = [i for i, line in enumerate(lines) if 'Moving Object detected' in line][0]
+        block = lines[start+1:start+51]
+        # Two more measurements (with different times); the second is past the limit of 11
+        extra = [line.replace('06.408', '06.409') for line in block[0:10]]
+
+        parser = utils._LogParser()
+        for line in lines[0:start+1] + block + extra + ['14:42:55 - End\n']:
+            parser.feed(line)
+        version, images, asteroids = parser.results()
+
+        assert len(asteroids) == 11
+        assert asteroids[-1]['obsTime'] == '2018-03-06T09:49:11.60Z'
+
+    def make_log_lines(self, num_images):
+        lines = ['08:39:51 - Start 2018/03/01\n', '           Astrometrica 4.10.0.431\n']
+        for image_num in range(num_images):
+            image = 'image-%05d.fits' % image_num
+            lines += ['08:40:11 - Astrometry of Image %d (%s): \n' % (image_num, image),
+                      '           446 of 448 Reference Stars used: dRA = 0.10", dDe = 0.09"\n',
+                      '           Pixel Size: 0.39" x 0.39", Field of View: 26.6\' x 26.6\' \n',
+                      '08:40:11 - Photometry of Image %d (%s): \n' % (image_num, image),
+                      '           441 of 448 Reference Stars used: dmag = 0.11mag\n',
+                      '08:46:13 - Position added manually from file %s + 3:\n' % image,
+                      '  11 27 19.543           -04 18 19.89           21.64           2054.95  2082.43     651   0.0    4.3  -.---\n',
+                      '                 \xb10.15                  \xb10.10           \xb10.11\n',
+                      '     K18D01E KC2018 03 01.%06d13 06 26.33 -23 24 51.0          20.78G      W87\n' % image_num,
+                      '       rwo line 1\n',
+                      '       rwo line 2\n']
+        return lines
+
+    def test_many_distinct_images(self):
+        # Run time scaling is measured in benchmarks/bench_log_dedup.py
+        parser = utils._LogParser()
+        for line in self.make_log_lines(4000):
+            parser.feed(line)
+        version, images, asteroids = parser.results()
+
+        assert len(images) == 4000
+        assert len(asteroids) == 4000
+        assert images[-1] == ('image-03999.fits', {'nstars': '446', 'dRA': '0.10', 'dDec': '0.09', 'dMag': '0.11'})
+
+    def test_split_ranges(self):
+        test_log = pkg_resources.resource_filename(__package__, os.path.join('data', 'Astrometrica_multisite.log'))
+        with open(test_log, 'rb') as log_fh:
+            pieces = utils._split_log_ranges(log_fh, [(0, None)], 8)
+            data = log_fh.read()
+
+        assert len(pieces) > 1
+        assert pieces[0][0] == 0
+        assert pieces[-1][1] is None
+        for (start, end), (next_start, next_end) in zip(pieces, pieces[1:]):
+            assert end == next_start
+            assert utils._log_split_regex.match(data, next_start)
+
+    def test_parallel_matches_serial(self, monkeypatch):
+        # Split into many small pieces, so some end part way through a block
+        monkeypatch.setattr(utils, '_log_pieces_per_worker', 50)
+        for log in ['Astrometrica.log', 'Astrometrica_moving_obj.log', 'Astrometrica_multisite.log', 'Astrometrica_noasts.log']:
+            test_log = pkg_resources.resource_filename(__package__, os.path.join('data', log))
+
+            assert read_astrometrica_logfile(test_log, workers=2) == read_astrometrica_logfile(test_log)
+
+    def test_parallel_missing_file(self):
+        assert read_astrometrica_logfile('wibble.log', workers=2) == ('', [], [])
+
+    def test_read_for_keys(self):
+        test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+        keys = read_mpcreport_keys(test_mpcreport)
+        version, images, asteroids = read_astrometrica_logfile(self.test_log)
+        rms_available, version, index, seeing = utils._read_log_for_psv(True, self.test_log)
+
+        assert read_astrometrica_log_for_keys(self.test_log, keys) == \
+            (version, [ast for ast in asteroids if (ast['totalid'], ast['obsTime']) in keys], seeing)
+
+    def test_read_for_keys_no_match(self):
+        version, asteroids, seeing = read_astrometrica_log_for_keys(self.test_log, set())
+
+        assert version == 'Astrometrica 4.10.0.431'
+        assert asteroids == []
+        assert seeing > 0
+
+
+class Test_IndexAstrometricaLog(object):
+
+    def read_bytes(self, filename):
+        with open(filename, 'rb') as fh:
+            return fh.read()
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, tmpdir):
+        self.tmpdir = tmpdir.strpath
+
+        self.test_log = pkg_resources.resource_filename(__package__, os.path.join('data', 'Astrometrica.log'))
+        self.test_moving_log = pkg_resources.resource_filename(__package__, os.path.join('data', 'Astrometrica_moving_obj.log'))
+        self.log = os.path.join(self.tmpdir, 'Astrometrica.log')
+        with open(self.log, 'wb') as fh:
+            fh.write(self.read_bytes(self.test_log))
+            fh.write(self.read_bytes(self.test_moving_log))
+
+    def test_index(self):
+        sessions = index_astrometrica_log(self.log)
+
+        assert [session['date'] for session in sessions] == ['2018-02-16', '2018-02-16', '2018-03-06']
+        assert [session['obs_dates'] for session in sessions] == [['2018-02-16'], ['2018-02-16'], ['2018-03-06']]
+        assert sessions[0]['offset'] == 0
+        assert sessions[2]['offset'] == os.path.getsize(self.test_log)
+        assert sessions[2]['version'] == 'Astrometrica 4.10.0.431'
+        assert os.path.exists(self.log + '.idx')
+
+    def test_read_sessions_for_dates(self):
+        assert read_astrometrica_logfile(self.log, dates=['2018-03-06']) == read_astrometrica_logfile(self.test_moving_log)
+        assert read_astrometrica_logfile(self.log, dates=['2018-02-16']) == read_astrometrica_logfile(self.test_log)
+        assert read_astrometrica_logfile(self.log, dates=['2018-01-01']) == ('', [], [])
+
+    def test_read_sessions_parallel(self):
+        dates = ['2018-03-06']
+
+        assert read_astrometrica_logfile(self.log, dates=dates, workers=2) == read_astrometrica_logfile(self.log, dates=dates)
+
+    def test_appended_log(self):
+        with open(self.log, 'wb') as fh:
+            fh.write(self.read_bytes(self.test_log))
+        first_sessions = index_astrometrica_log(self.log)
+        with open(self.log, 'ab') as fh:
+            fh.write(self.read_bytes(self.test_moving_log))
+
+        sessions = index_astrometrica_log(self.log)
+
+        assert sessions[0:2] == first_sessions
+        assert len(sessions) == 3
+        with open(self.log + '.idx', 'r') as fh:
+            assert json.load(fh)['size'] == os.path.getsize(self.log)
+
+    def test_rewritten_log(self):
+        index_astrometrica_log(self.log)
+        with open(self.log, 'wb') as fh:
+            fh.write(self.read_bytes(self.test_moving_log))
+
+        sessions = index_astrometrica_log(self.log)
+
+        assert len(sessions) == 1
+        assert sessions[0]['offset'] == 0
+
+    def test_convert_with_log_index(self):
+        test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+        test_psv_rms = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport_rms.psv'))
+        outfile = os.path.join(self.tmpdir, 'out.psv')
+
+        num_objects = convert_mpcreport_to_psv(test_mpcreport, outfile, True, self.log, display=False, log_index=True)
+
+        assert self.read_bytes(outfile) == self.read_bytes(test_psv_rms)
+
+    def test_convert_with_log_index_after_midnight(self):
+        test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+        test_psv_rms = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport_rms.psv'))
+        outfile = os.path.join(self.tmpdir, 'out.psv')
+        # Exposures started before 0h UT but reported (mid-exposure) on the next date
+        with open(self.log, 'wb') as fh:
+            fh.write(self.read_bytes(self.test_log).replace(b'Time Stamp: 2018 02 16', b'Time Stamp: 2018 02 15'))
+            fh.write(self.read_bytes(self.test_moving_log))
+
+        num_objects = convert_mpcreport_to_psv(test_mpcreport, outfile, True, self.log, display=False, log_index=True)
+
+        assert [session['obs_dates'] for session in index_astrometrica_log(self.log)] == [['2018-02-15'], ['2018-02-15'], ['2018-03-06']]
+        assert self.read_bytes(outfile) == self.read_bytes(test_psv_rms)
+
 class Test_FindAstrometricaLog(object):
 
     def test_existing(self):
@@ -425,6 +753,37 @@ class Test_DataModify(object):
 
         assert expected_data == data
 
+class Test_IndexAsteroids(object):
+
+    def setup_method(self):
+        self.line = '     K18D01E KC2018 03 01.16162913 06 26.33 -23 24 51.0          20.78G      W87'
+        self.asteroids = [{'totalid' : '     K18D01E', 'obsTime' : '2018-03-01T03:52:44.75Z', 'rmsRA' : '0.15', 'rmsDec' : '0.10', 'rmsMag' : '0.11', 'snr' : '4.3', 'fwhm' : '1.2'},
+                          {'totalid' : '     K18D01E', 'obsTime' : '2018-03-01T03:52:44.75Z', 'rmsRA' : '0.25', 'rmsDec' : '0.20', 'rmsMag' : '0.21', 'snr' : '9.3', 'fwhm' : '2.2'},
+                          {'totalid' : '     K18D01E', 'obsTime' : '2018-03-01T04:52:44.75Z', 'rmsRA' : '0.35', 'rmsDec' : '0.30', 'rmsMag' : '0.31', 'snr' : '9.3', 'fwhm' : '3.2'},
+                         ]
+
+    def test_first_match(self):
+        index = index_asteroids(self.asteroids)
+
+        assert len(index) == 2
+        assert index[('     K18D01E', '2018-03-01T03:52:44.75Z')] is self.asteroids[0]
+
+    def test_join_matches_list(self):
+        expected_data = parse_and_modify_data(self.line, asteroids=self.asteroids, rms_available=True, seeing=1.5, display=False)
+
+        data = parse_and_modify_data(self.line, asteroids=index_asteroids(self.asteroids), rms_available=True, seeing=1.5, display=False)
+
+        assert expected_data == data
+        assert data['rmsRA'] == '0.15'
+        assert data['seeing'] == '1.200'
+
+    def test_no_match(self):
+        line = self.line.replace('01.161629', '01.161630')
+
+        data = parse_and_modify_data(line, asteroids=index_asteroids(self.asteroids), rms_available=True, seeing=1.5, display=False)
+
+        assert 'rmsRA' not in data
+
 class Test_Convert_mpcreport_to_psv:
 
     def read_file_lines(self, filename):
@@ -462,6 +821,13 @@ class Test_Convert_mpcreport_to_psv:
         for (in_line, out_line) in zip(self.test_psv_rms_lines, outfile_lines):
             assert out_line == in_line
 
+    def test_convert_validation_levels(self):
+        for level in validation_levels:
+            num_objects = convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, display=False, validation=level)
+
+            outfile_lines = self.read_file_lines(self.outfile)
+            assert outfile_lines == self.test_psv_lines
+
     def test_missing_file(self):
         num_objects = convert_mpcreport_to_psv('foobarbiff', self.outfile)
 
@@ -483,3 +849,369 @@ class Test_Convert_mpcreport_to_psv:
         outfile_lines = self.read_file_lines(self.outfile)
         for (in_line, out_line) in zip(self.test_psv_multisite_lines, outfile_lines):
             assert out_line == in_line
+
+    def test_convert_stream(self):
+        with open(self.test_mpcreport, 'r') as in_fh, open(self.outfile, 'w') as out_fh:
+            num_objects = convert_stream(in_fh, out_fh)
+
+        outfile_lines = self.read_file_lines(self.outfile)
+        assert outfile_lines == self.test_psv_lines
+        assert num_objects == convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, display=False)
+
+    def test_convert_stream_no_body(self):
+        header = ['COD G96', 'NET Gaia-DR2']
+        with open(self.outfile, 'w') as out_fh:
+            num_objects = convert_stream(iter(header), out_fh)
+
+        assert -1 == num_objects
+
+    def test_convert_parallel(self):
+        num_objects = convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, display=False, workers=2)
+
+        outfile_lines = self.read_file_lines(self.outfile)
+        assert outfile_lines == self.test_psv_lines
+
+    def test_convert_parallel_with_rms(self):
+        num_objects = convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, True, self.test_log, display=False, workers=2)
+
+        outfile_lines = self.read_file_lines(self.outfile)
+        for (in_line, out_line) in zip(self.test_psv_rms_lines, outfile_lines):
+            assert out_line == in_line
+
+    def test_convert_low_memory(self):
+        num_objects = convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, True, self.test_log, display=False, low_memory=True)
+
+        outfile_lines = self.read_file_lines(self.outfile)
+        assert outfile_lines == self.test_psv_rms_lines
+
+    def test_convert_low_memory_repeated_measurements(self):
+        with open(self.test_log, 'rb') as fh:
+            log_lines = fh.readlines()
+        block = [line.replace(b'   0.0    4.3', b'   1.1    4.3') for line in log_lines[1839:1845]]
+        assert block[0].startswith(b'08:46:13 - Position') and block != log_lines[1839:1845]
+        log = os.path.join(self.tmpdir, 'Astrometrica.log')
+        with open(log, 'wb') as fh:
+            fh.writelines(log_lines + block * 5)
+        normal_outfile = os.path.join(self.tmpdir, 'normal.psv')
+
+        convert_mpcreport_to_psv(self.test_mpcreport, normal_outfile, True, log, display=False)
+        convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, True, log, display=False, low_memory=True)
+
+        assert self.read_file_lines(self.outfile) == self.read_file_lines(normal_outfile)
+
+    def test_read_mpcreport_keys(self):
+        header, body = read_mpcreport_file(self.test_mpcreport)
+
+        keys = read_mpcreport_keys(self.test_mpcreport)
+
+        assert keys == set((data['totalid'], data['obsTime']) for data in map(parse_dataline, body) if data)
+
+    def test_convert_overlapped(self):
+        num_objects = convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, True, self.test_log, display=False, overlap=True)
+
+        outfile_lines = self.read_file_lines(self.outfile)
+        assert outfile_lines == self.test_psv_rms_lines
+        assert num_objects == convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, True, self.test_log, display=False)
+
+    def test_convert_overlapped_with_log_cache(self):
+        from astrometrica2ades.cache import LogCache
+        log_cache = LogCache()
+        for run in range(2):
+            convert_mpcreport_to_psv(self.test_mpcreport, self.outfile, True, self.test_log, display=False, overlap=True, log_cache=log_cache)
+
+            assert self.read_file_lines(self.outfile) == self.test_psv_rms_lines
+        assert log_cache.hits == 1
+
+    def test_convert_overlapped_bad_line(self):
+        mpcreport = os.path.join(self.tmpdir, 'MPCReport.txt')
+        lines = self.read_file_lines(self.test_mpcreport)
+        obs_lines = [i for i, line in enumerate(lines) if line.startswith('     K17')]
+        lines[obs_lines[2]] = lines[obs_lines[2]].replace('2018 ', '2018/')
+        with open(mpcreport, 'w') as fh:
+            fh.writelines(lines)
+        serial_outfile = os.path.join(self.tmpdir, 'serial.psv')
+
+        with pytest.raises(RuntimeError) as serial_error:
+            convert_mpcreport_to_psv(mpcreport, serial_outfile, True, self.test_log, display=False)
+        with pytest.raises(RuntimeError) as overlapped_error:
+            convert_mpcreport_to_psv(mpcreport, self.outfile, True, self.test_log, display=False, overlap=True)
+
+        assert str(overlapped_error.value) == str(serial_error.value)
+        assert self.read_file_lines(self.outfile) == self.read_file_lines(serial_outfile)
+
+class Test_IterObservations:
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, tmpdir):
+        self.test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+
+    def test_matches_list_reader(self):
+        header, body = read_mpcreport_file(self.test_mpcreport)
+        expected = [parse_dataline(line) for line in body]
+        expected = [obs for obs in expected if obs is not None]
+
+        observations = list(iter_observations(self.test_mpcreport))
+
+        assert len(observations) == len(expected)
+        assert observations[0]['astCat'] == 'Gaia1'
+        for obs, exp in zip(observations, expected):
+            assert obs['obsTime'] == exp['obsTime']
+            assert obs['ra'] == exp['ra']
+
+    def test_is_lazy(self):
+        header, body = read_mpcreport_stream(iter(['COD G96', '', 'line1', 'COM mid', 'line2', '----- end -----']))
+
+        assert header == ['COD G96']
+        assert next(body) == ''
+        assert list(body) == ['line1', 'line2']
+
+    def test_header_only(self):
+        header, body = read_mpcreport_stream(iter(['COD G96', 'NET Gaia-DR2', '----- end -----']))
+
+        assert header == ['COD G96', 'NET Gaia-DR2']
+        assert body is None
+
+class Test_DecodeUntilDone:
+
+    def setup_method(self):
+        test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+        header, self.body = read_mpcreport_file(test_mpcreport)
+
+    def test_stops_when_done(self):
+        future = concurrent.futures.Future()
+        future.set_result(None)
+        body = iter(self.body)
+
+        decoded, error = utils._decode_until_done(body, future, display=False)
+
+        assert len(decoded) == 1
+        assert error is None
+        assert next(body) == self.body[1]
+
+    def test_decodes_all_while_pending(self):
+        future = concurrent.futures.Future()
+
+        decoded, error = utils._decode_until_done(iter(self.body), future, display=False)
+
+        assert [obs.to_dict() for obs in decoded] == [parse_dataline(line) for line in self.body if line]
+
+class Test_IterBodyObservationsParallel:
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+        self.header, self.body = read_mpcreport_file(test_mpcreport)
+
+    def test_order_preserved(self):
+        expected = list(iter_body_observations(self.body, 'Gaia2', display=False))
+
+        observations = list(iter_body_observations_parallel(self.body, 'Gaia2', display=False, workers=2, chunk_size=2))
+
+        assert [obs.to_dict() for obs in observations] == [obs.to_dict() for obs in expected]
+
+    def test_bad_lines_collected(self, capsys):
+        body = list(self.body)
+        body[3] = body[3][0:40]
+        body[-1] = body[-1][0:50]
+        expected = list(iter_body_observations(body[0:3], 'Gaia2', display=False))
+
+        observations = []
+        with pytest.raises(RuntimeError) as e_info:
+            for obs in iter_body_observations_parallel(body, 'Gaia2', display=False, workers=2, chunk_size=2):
+                observations.append(obs)
+
+        assert 'no match for line' in str(e_info.value)
+        assert [obs.to_dict() for obs in observations] == [obs.to_dict() for obs in expected]
+        out = capsys.readouterr().out
+        assert 'Observation line 4:' in out
+        assert 'Observation line %d:' % len(body) in out
+
+class Test_ConvertBatch:
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, tmpdir):
+        self.tmpdir = tmpdir.strpath
+
+        test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+        test_log = pkg_resources.resource_filename(__package__, os.path.join('data', 'Astrometrica.log'))
+        test_psv_rms = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport_rms.psv'))
+        with open(test_psv_rms, 'r') as fh:
+            self.test_psv_rms_lines = fh.readlines()
+
+        self.night_dirs = [os.path.join(self.tmpdir, 'telescope1', night) for night in ['20180216', '20180217']]
+        self.mpcreports = []
+        for night_dir in self.night_dirs:
+            os.makedirs(night_dir)
+            mpcreport = os.path.join(night_dir, 'MPCReport.txt')
+            with open(test_mpcreport, 'r') as in_fh, open(mpcreport, 'w') as out_fh:
+                out_fh.write(in_fh.read())
+            self.mpcreports.append(mpcreport)
+        with open(test_log, 'rb') as in_fh, open(os.path.join(self.night_dirs[0], 'Astrometrica.log'), 'wb') as out_fh:
+            out_fh.write(in_fh.read())
+
+    def test_find_directory(self):
+        mpcreports = find_mpcreports([self.tmpdir])
+
+        assert mpcreports == self.mpcreports
+
+    def test_find_glob(self):
+        mpcreports = find_mpcreports([os.path.join(self.tmpdir, 'telescope1', '*17'), self.mpcreports[1]])
+
+        assert mpcreports == self.mpcreports[1:]
+
+    def test_psv_filename(self):
+        assert psv_filename(os.path.join('foo', 'MPCReport.txt')) == os.path.join('foo', 'MPCReport.psv')
+        assert psv_filename('MPCReport') == 'MPCReport.psv'
+
+    def test_convert_batch(self):
+        bad_report = os.path.join(self.tmpdir, 'MPCReport_bad.txt')
+        with open(bad_report, 'w') as fh:
+            fh.write('COD W85\n')
+
+        summary = convert_batch(find_mpcreports([self.tmpdir]))
+
+        assert summary['files'] == 2
+        assert summary['failures'] == [(bad_report, 'No objects written')]
+        with open(psv_filename(self.mpcreports[0]), 'r') as fh:
+            outfile_lines = fh.readlines()
+        for (in_line, out_line) in zip(self.test_psv_rms_lines, outfile_lines):
+            assert out_line == in_line
+
+    def test_convert_batch_parallel(self):
+        serial = convert_batch(self.mpcreports)
+        parallel = convert_batch(self.mpcreports, workers=2)
+
+        assert parallel['files'] == serial['files'] == 2
+        assert parallel['observations'] == serial['observations']
+
+class Test_ConvertIncremental:
+
+    def read_file_lines(self, filename):
+        with open(filename, 'r') as fh:
+            return fh.readlines()
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, tmpdir):
+        self.tmpdir = tmpdir.strpath
+
+        test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+        self.test_log = pkg_resources.resource_filename(__package__, os.path.join('data', 'Astrometrica.log'))
+        self.report_lines = self.read_file_lines(test_mpcreport)
+        self.num_header = len([line for line in self.report_lines if line[0:3] in ['COD', 'CON', 'OBS', 'MEA', 'TEL', 'ACK', 'AC2', 'COM', 'NET']])
+
+        self.mpcreport = os.path.join(self.tmpdir, 'MPCReport.txt')
+        self.outfile = os.path.join(self.tmpdir, 'MPCReport.psv')
+        self.full_outfile = os.path.join(self.tmpdir, 'MPCReport_full.psv')
+
+    def write_report(self, lines, mode='w'):
+        with open(self.mpcreport, mode) as fh:
+            fh.writelines(lines)
+
+    def test_append(self):
+        split = self.num_header + 3
+        self.write_report(self.report_lines[0:split])
+        first_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+
+        self.write_report(self.report_lines[split:], 'a')
+        num_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+        full_objects = convert_mpcreport_to_psv(self.mpcreport, self.full_outfile, display=False)
+
+        assert first_objects == 3
+        assert num_objects == full_objects
+        assert self.read_file_lines(self.outfile) == self.read_file_lines(self.full_outfile)
+        with open(self.outfile + '.ckpt', 'r') as fh:
+            checkpoint = json.load(fh)
+        assert checkpoint['lines'] == len(self.report_lines) - self.num_header
+
+    def test_append_with_rms(self):
+        split = self.num_header + 2
+        self.write_report(self.report_lines[0:split])
+        convert_mpcreport_to_psv(self.mpcreport, self.outfile, True, self.test_log, display=False, incremental=True)
+
+        self.write_report(self.report_lines[split:], 'a')
+        num_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, True, self.test_log, display=False, incremental=True)
+        full_objects = convert_mpcreport_to_psv(self.mpcreport, self.full_outfile, True, self.test_log, display=False)
+
+        assert num_objects == full_objects
+        assert self.read_file_lines(self.outfile) == self.read_file_lines(self.full_outfile)
+
+    def test_partial_line_left(self):
+        split = self.num_header + 3
+        self.write_report(self.report_lines[0:split] + [self.report_lines[split][0:40]])
+        first_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+
+        self.write_report([self.report_lines[split][40:]] + self.report_lines[split+1:], 'a')
+        num_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+        full_objects = convert_mpcreport_to_psv(self.mpcreport, self.full_outfile, display=False)
+
+        assert first_objects == 3
+        assert num_objects == full_objects
+        assert self.read_file_lines(self.outfile) == self.read_file_lines(self.full_outfile)
+
+    def test_no_new_lines(self, capsys):
+        self.write_report(self.report_lines)
+        first_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+        num_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+
+        assert num_objects == first_objects
+        assert 'No new observations' in capsys.readouterr().out
+
+    def test_changed_content_rebuilds(self, capsys):
+        split = self.num_header + 3
+        self.write_report(self.report_lines[0:split])
+        convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+
+        # Remove the second observation and append the rest
+        self.write_report(self.report_lines[0:self.num_header+1] + self.report_lines[self.num_header+2:])
+        num_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+        full_objects = convert_mpcreport_to_psv(self.mpcreport, self.full_outfile, display=False)
+
+        assert 'rebuilding' in capsys.readouterr().out
+        assert num_objects == full_objects
+        assert self.read_file_lines(self.outfile) == self.read_file_lines(self.full_outfile)
+
+    def test_same_length_edit_rebuilds(self, capsys):
+        # Repeat the observations so the edit is well over 4 KiB before the checkpoint
+        lines = self.report_lines[0:self.num_header] + self.report_lines[self.num_header:] * 5
+        split = len(lines) - 2
+        self.write_report(lines[0:split])
+        convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+
+        # Correct the magnitude of the first observation
+        first = lines[self.num_header]
+        lines[self.num_header] = first[0:65] + '20.5' + first[69:]
+        assert len(lines[self.num_header]) == len(first) and lines[self.num_header] != first
+        self.write_report(lines)
+        num_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+        full_objects = convert_mpcreport_to_psv(self.mpcreport, self.full_outfile, display=False)
+
+        assert 'MPCReport file changed, rebuilding' in capsys.readouterr().out
+        assert num_objects == full_objects
+        assert self.read_file_lines(self.outfile) == self.read_file_lines(self.full_outfile)
+
+    def test_changed_header_rebuilds(self, capsys):
+        self.write_report(self.report_lines)
+        convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+
+        self.write_report(['OBS T. Lister, J. Chatelain\n' if line.startswith('OBS') else line for line in self.report_lines])
+        num_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+
+        assert 'Checkpoint header_hash changed' in capsys.readouterr().out
+
+    def test_changed_ack_resumes(self, capsys):
+        split = self.num_header + 3
+        self.write_report(self.report_lines[0:split])
+        convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+
+        # Astrometrica rewrites the ACK timestamp on every save
+        lines = ['ACK MPCReport file updated 2018.02.16 10:36:05 (resaved)\n' if line.startswith('ACK') else line for line in self.report_lines]
+        self.write_report(lines)
+        capsys.readouterr()
+        num_objects = convert_mpcreport_to_psv(self.mpcreport, self.outfile, display=False, incremental=True)
+        full_objects = convert_mpcreport_to_psv(self.mpcreport, self.full_outfile, display=False)
+
+        out = capsys.readouterr().out
+        assert 'resuming after 3 lines' in out
+        assert 'rebuilding' not in out
+        assert num_objects == full_objects
+        assert self.read_file_lines(self.outfile) == self.read_file_lines(self.full_outfile)
@@ -1,5 +1,7 @@
+import math
 import pytest
 
+from astrometrica2ades import sexVals
 from astrometrica2ades.sexVals import checkSexagesimal, checkDate
 
 class Test_checkSexagesimal(object):
@@ -128,6 +130,73 @@ class Test_checkSexagesimal(object):
 
 #checkSexagesimal("12 13.12 ") #bad - only tenths digid
 
+def legacy_checkSexagesimal(line):
+    for (check, action) in sexVals._checks:
+        m = check.match(line)
+        if m:
+            return action(m)
+    sexVals.errorSexVal('sexagesimal date must be "HH MM SS.ss" not ', line)
+
+def legacy_sexRaToDecRa(sexRa):
+    (hours, minutes, seconds, prec) = legacy_checkSexagesimal(sexRa)
+    digits = max(1, -int(math.floor(math.log10(prec*sexVals.secToDegrees))))
+    value = (hours*3600.0 + minutes*60.0 + seconds)*sexVals.secToDegrees
+    return (('{0:.' + repr(digits) + 'f}').format(value), prec)
+
+def legacy_sexDeclToDecDecl(sexDec):
+    signval = -1.0 if sexDec[0] == '-' else 1.0
+    (degrees, minutes, seconds, prec) = legacy_checkSexagesimal(sexDec[1:])
+    digits = max(1, -int(math.floor(math.log10(prec*sexVals.arcsecToDegrees))))
+    value = signval * (degrees + minutes/60.0 + seconds/3600.0)
+    return (('{0:.' + repr(digits) + 'f}').format(value), prec)
+
+class Test_fastSexagesimal(object):
+
+    def check(self, line):
+        expected = legacy_checkSexagesimal(line)
+        data = checkSexagesimal(line)
+        assert expected == data and [type(x) for x in expected] == [type(x) for x in data], repr(line)
+        ra = sexVals.sexRaToDecRa(line)
+        assert legacy_sexRaToDecRa(line) == ra and type(ra[1]) == type(expected[3]), repr(line)
+        for sign in '+-':
+            dec = sexVals.sexDeclToDecDecl(sign + line)
+            assert legacy_sexDeclToDecDecl(sign + line) == dec, repr(sign + line)
+
+    def test_all_hundredths_of_seconds(self):
+        for hhmm in ['00 00', '07 13', '23 59']:
+            for ss in range(6000):
+                self.check('%s %02d.%02d' % (hhmm, ss // 100, ss % 100))
+
+    def test_all_thousandths_of_seconds(self):
+        for ss in range(60000):
+            self.check('12 34 %02d.%03d' % (ss // 1000, ss % 1000))
+
+    def test_all_minutes_and_seconds(self):
+        for hh in [0, 1, 11, 19, 23, 89]:
+            for mm in range(60):
+                self.check('%02d %02d' % (hh, mm))
+                for ss in range(60):
+                    self.check('%02d %02d %02d' % (hh, mm, ss))
+                    self.check('%02d %02d %02d.%d' % (hh, mm, ss, hh % 10))
+                for m in range(10):
+                    self.check('%02d %02d.%d' % (hh, mm, m))
+                for m in range(100):
+                    self.check('%02d %02d.%02d' % (hh, mm, m))
+
+    def test_other_layouts(self):
+        for line in ['12 34 56.', '12 34 56.7  ', '12 34 56.7890', '12 34 56.789012345678', '12 34 56.7\n',
+                     '12 34  ', '99 99 99.99', '00 00 00.00', '23 59 59.9999999']:
+            self.check(line)
+
+    def test_counts(self):
+        before = (sexVals._countNormal, sexVals._countIntegerSeconds, sexVals._countMinutesHundredths,
+                  sexVals._countMinutesTenths, sexVals._countIntegerMinutes)
+        for line in ['12 34 56.78', '12 34 56', '12 34.56', '12 34.5', '12 34']:
+            sexVals.sexRaToDecRa(line)
+        after = (sexVals._countNormal, sexVals._countIntegerSeconds, sexVals._countMinutesHundredths,
+                 sexVals._countMinutesTenths, sexVals._countIntegerMinutes)
+        assert [a - b for a, b in zip(after, before)] == [1, 1, 1, 1, 1]
+
 class Test_checkDate(object):
 
     def setup_method(self):
@@ -424,3 +493,100 @@ class Test_checkDate(object):
             checkDate(rdict)
         except RuntimeError:
             pytest.fail("Unexpected raise of RuntimeError")
+
+class Test_checkRaDecValidation(object):
+
+    def test_levels_decode_the_same(self):
+
+        for ra, dec in [('11 26 54.17 ', '-04 24 44.7 '), ('00 00 00    ', '-00 00 00   '), ('23 59.99    ', '+89 59.9    ')]:
+            expected = {'raSexagesimal' : ra, 'decSexagesimal' : dec}
+            sexVals.checkRa(expected)
+            sexVals.checkDec(expected)
+            for level in ['normal', 'trusted']:
+                rdict = {'raSexagesimal' : ra, 'decSexagesimal' : dec}
+                sexVals.checkRa(rdict, level)
+                sexVals.checkDec(rdict, level)
+                assert expected == rdict
+
+    def test_out_of_range(self):
+
+        for ra in ['11 60 54.17 ', '11 26 60.0  ', '11 26 54.   ']:
+            for level in ['strict', 'normal']:
+                with pytest.raises(RuntimeError):
+                    sexVals.checkRa({'raSexagesimal' : ra}, level)
+            sexVals.checkRa({'raSexagesimal' : ra}, 'trusted')
+        for dec in ['-04 60 44.7 ', '+04 24 61   ', '-04 24 44.  ']:
+            for level in ['strict', 'normal']:
+                with pytest.raises(RuntimeError):
+                    sexVals.checkDec({'decSexagesimal' : dec}, level)
+            sexVals.checkDec({'decSexagesimal' : dec}, 'trusted')
+
+    def test_bad_sign_all_levels(self):
+
+        for level in ['strict', 'normal', 'trusted']:
+            with pytest.raises(RuntimeError):
+                sexVals.checkDec({'decSexagesimal' : ' 04 24 44.7 '}, level)
+
+class Test_DayCache(object):
+
+    def setup_method(self):
+        sexVals.clearDayCache()
+
+    def teardown_method(self):
+        sexVals.setDayCacheSize(256)
+
+    def test_hits_same_day(self):
+        first = sexVals.sexDateToISO('2018 02 16.198172')
+        second = sexVals.sexDateToISO('2018 02 16.203656')
+
+        assert first == ('2018-02-16T04:45:22.06Z', 1, '.198172')
+        assert second[0] == '2018-02-16T04:53:15.88Z'
+        assert sexVals.dayCacheInfo()['hits'] == 1
+        assert sexVals.dayCacheInfo()['misses'] == 1
+
+    def test_invalid_days_cached_and_raise(self):
+        messages = []
+        for attempt in range(2):
+            for date in ['2019 02 29.5     ', '2018 13 01.5     ']:
+                with pytest.raises(RuntimeError) as e_info:
+                    sexVals.sexDateToISO(date)
+                messages.append(str(e_info.value))
+
+        assert messages[0] == messages[2] == \
+            'Invalid Sexagesimal string (invalid date for February, should not be ) in string \n2019 02 29.5     '
+        assert messages[1] == messages[3] == \
+            'Invalid Sexagesimal string (date  must be "YYYY MM DD.d..." not ) in string \n2018 13 01.5     '
+        assert sexVals.dayCacheInfo()['hits'] == 2
+        assert sexVals.dayCacheInfo()['misses'] == 2
+
+    def test_bad_fraction_valid_day(self):
+        # The day is valid, so the February check must not come first
+        for date in ['2019 02 29.      ', '2019 02 29.5x    ', '2019 02 29']:
+            with pytest.raises(RuntimeError) as e_info:
+                sexVals.sexDateToISO(date)
+            assert 'date  must be' in str(e_info.value)
+
+    def test_leap_years(self):
+        for year, valid in [(2000, True), (1900, False), (2020, True), (2019, False)]:
+            date = '%d 02 29.5' % year
+            if valid:
+                assert sexVals.sexDateToISO(date)[0] == '%d-02-29T12:00:00.0Z' % year
+            else:
+                with pytest.raises(RuntimeError):
+                    sexVals.sexDateToISO(date)
+
+    def test_bounded(self):
+        sexVals.setDayCacheSize(2)
+        for date in ['2018 02 16.5', '2018 02 17.5', '2018 02 18.5']:
+            sexVals.sexDateToISO(date)
+
+        assert sexVals.dayCacheInfo()['currsize'] == 2
+        assert sexVals.dayCacheInfo()['maxsize'] == 2
+
+    def test_disabled_matches_cached(self):
+        dates = ['2018 02 16.198172', '2018 02 16.5', '1999 12 31.99999', '2020 02 29.000001']
+        cached = [sexVals.sexDateToISO(date) for date in dates]
+        sexVals.setDayCacheSize(0)
+
+        assert [sexVals.sexDateToISO(date) for date in dates] == cached
+        assert sexVals.dayCacheInfo()['currsize'] == 0
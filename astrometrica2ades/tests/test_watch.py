@@ -0,0 +1,91 @@
+import os
+import time
+
+import pytest
+import pkg_resources
+
+from astrometrica2ades.watch import ReportWatcher
+from astrometrica2ades.utils import psv_filename
+
+class Test_ReportWatcher:
+
+    def copy_file(self, src, dest):
+        with open(src, 'rb') as in_fh, open(dest, 'wb') as out_fh:
+            out_fh.write(in_fh.read())
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, tmpdir):
+        self.tmpdir = tmpdir.strpath
+
+        self.test_mpcreport = pkg_resources.resource_filename(__package__, os.path.join('data', 'MPCReport.txt'))
+        self.test_log = pkg_resources.resource_filename(__package__, os.path.join('data', 'Astrometrica.log'))
+
+        self.night_dir = os.path.join(self.tmpdir, '20180216')
+        os.makedirs(self.night_dir)
+        self.mpcreport = os.path.join(self.night_dir, 'MPCReport.txt')
+
+        self.watcher = ReportWatcher([self.tmpdir], settle=0.5)
+
+    def test_new_report_converted_after_settle(self):
+        self.watcher.scan()
+        self.copy_file(self.test_mpcreport, self.mpcreport)
+        now = time.time()
+
+        assert self.watcher.tick(now) == []
+        assert self.watcher.tick(now + 1) == [self.mpcreport]
+        assert os.path.exists(psv_filename(self.mpcreport))
+        assert self.watcher.tick(now + 2) == []
+        assert self.watcher.conversions == 1
+
+    def test_partial_write_not_converted(self):
+        self.watcher.scan()
+        with open(self.test_mpcreport, 'r') as fh:
+            lines = fh.readlines()
+        with open(self.mpcreport, 'w') as fh:
+            fh.writelines(lines[0:10])
+        now = time.time()
+
+        assert self.watcher.tick(now + 0.1) == []
+        with open(self.mpcreport, 'a') as fh:
+            fh.writelines(lines[10:])
+        assert self.watcher.tick(now + 0.2) == []
+        assert self.watcher.tick(now + 1) == [self.mpcreport]
+
+    def test_up_to_date_report_not_reconverted(self):
+        self.copy_file(self.test_mpcreport, self.mpcreport)
+        self.copy_file(self.test_mpcreport, psv_filename(self.mpcreport))
+
+        self.watcher.scan()
+
+        assert self.watcher.tick(time.time() + 1) == []
+
+    def test_log_change_reconverts(self):
+        self.copy_file(self.test_mpcreport, self.mpcreport)
+        self.watcher.scan()
+        now = time.time()
+        self.watcher.tick(now + 1)
+
+        self.copy_file(self.test_log, os.path.join(self.night_dir, 'Astrometrica.log'))
+
+        assert self.watcher.tick(now + 2) == [self.mpcreport]
+        with open(psv_filename(self.mpcreport), 'r') as fh:
+            assert 'rmsRA' in fh.read()
+
+    def test_new_directory_found(self):
+        self.watcher.scan()
+        new_dir = os.path.join(self.tmpdir, '20180217', 'sub')
+        os.makedirs(new_dir)
+        mpcreport = os.path.join(new_dir, 'MPCReport.txt')
+        self.copy_file(self.test_mpcreport, mpcreport)
+
+        assert self.watcher.tick(time.time() + 1) == [mpcreport]
+
+    def test_symlink_loop_not_followed(self):
+        os.symlink('.', os.path.join(self.night_dir, 'self'))
+        os.symlink(self.night_dir, os.path.join(self.tmpdir, 'tonight'))
+        self.copy_file(self.test_mpcreport, self.mpcreport)
+
+        self.watcher.scan()
+
+        assert sorted(self.watcher._dirs) == [self.tmpdir, self.night_dir]
+        assert self.watcher.tick(time.time() + 1) == [self.mpcreport]
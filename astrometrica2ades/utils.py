@@ -7,9 +7,21 @@ try:
 except ImportError:
     import ConfigParser as configparser
 import re
+import io
 import os
 import sys
+import mmap
+import glob
+import time
+import json
+import locale
+import fnmatch
+import hashlib
 from math import log10
+from datetime import datetime, timedelta
+from itertools import chain
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pkg_resources
 
 from astrometrica2ades import sexVals
@@ -188,7 +200,237 @@ def error80(msg, line):
     badLineMsg = 'Invalid MPC80COL line ('
     raise RuntimeError(badLineMsg + msg + ') in line:\n' + line)
 
-def parse_dataline(line):
+class Observation(object):
+    """
+    Compact record for one decoded observation line.
+
+    This holds the same values as the dictionary returned by `parse_dataline()`
+    (plus the fields added by `parse_and_modify_data()`) but uses `__slots__`
+    rather than a per-line dict, which greatly reduces memory use when many
+    observations are held at once. Fields can be accessed as attributes or,
+    for compatibility with code written for the dicts, with ``obs['key']``.
+    Fields which have not been set are absent from `to_dict()`.
+    """
+
+    __slots__ = ('subFmt', 'totalid', 'disc', 'notes', 'code', 'date',
+                 'raSexagesimal', 'decSexagesimal', 'bl1', 'mag', 'band',
+                 'packedref', 'stn', 'obsTime', 'precTime', 'ra', 'precRA',
+                 'dec', 'precDec', 'mode', 'prog', 'astCat', 'permID',
+                 'provID', 'trkSub', 'photCat', 'remarks', 'rmsRA', 'rmsDec',
+                 'rmsMag', 'photAp', 'logSNR', 'seeing')
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return hasattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        """
+        Return the set fields as a dictionary, in the form returned by
+        `parse_dataline()` and `parse_and_modify_data()`
+        """
+        data = {}
+        for field in self.__slots__:
+            try:
+                data[field] = getattr(self, field)
+            except AttributeError:
+                pass
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create an `Observation` from a dictionary of decoded values
+        """
+        obs = cls()
+        for key, value in data.items():
+            setattr(obs, key, value)
+        return obs
+
+class DatalineParser(object):
+    """
+    Fixed-column decoder for MPC1992 80 column optical lines.
+
+    The layout is checked by a validator compiled once when the class is
+    created (rather than assembling the regex for every observation line) and
+    the fields are then sliced out at their fixed column offsets. It accepts
+    exactly the same lines as the original optical line regex and raises the
+    same `error80` messages.
+
+    The reverse conversions used to validate the values depend on the
+    <validation> level:
+
+    * 'strict' converts the date, RA and Dec back to sexagesimal and re-packs
+      the ID, checking they reproduce the line
+    * 'normal' only checks the minutes and seconds of the RA and Dec are in
+      range, which rejects the same well-formed lines as 'strict'
+    * 'trusted' only decodes the values, for Astrometrica-generated input
+      which is known to be well formed
+
+    Parameters
+    ----------
+    validation : str, optional
+        Validation level, one of `validation_levels`
+
+    Notes
+    -----
+    A module-level instance for each level (`_dataline_parsers`) is shared by
+    `parse_dataline()`.
+    """
+
+    #
+    # matches optical line; also V and S and X
+    #
+    # columns: first seven are for all types
+    #    1-12: id group               [A-za-z0-9 ]{12}
+    #      13: discovery              [ *+]
+    #      14: notes -- notes can be anything; valid Notes is wrong
+    #      15: codes                  [A PeCTMcEOHNn] -- do not include RrSsVvXx
+    #   16-19: yyyy from obsDate      \d{4}
+    #      20: asteroid satellite     [ a-e]
+    #   21-32: rest of obsDate        [0-9 .]{12} (loosely checked)
+    #
+    # ----------- remainder depends on type.  This is for optical and SV
+    #   33-44: Ra                     [0-9 .]{12} (loosely checked)
+    #   45-56: Dec                    [-+ ][0-9 .]{11} (loosely checked)
+    #   57-65: mpc doc says blank but stuff is here
+    #   66-70: mag
+    #      71: band
+    #   72-77: packedref; 72 by itself is astCode
+    #   78-80: 3-character obs stn code
+    #
+    # The loosely checked columns are validated by one precompiled pattern;
+    # the fields themselves are then sliced out at their fixed offsets.
+    # Note: 'A-z' (not 'A-Z') is deliberate and matches the historical regex.
+    layout_regex = re.compile(r'[A-za-z0-9 ]{12}'     # id 1-12
+                              + r'[ *+]'              # discovery 13
+                              + r'.'                  # notes 14
+                              + r'[A PeCTMcEOHNn]'    # code 15
+                              + r'\d{4}'              # yyyy 16-19
+                              + r'[ a-e]'             # asteroid satellite 20
+                              + r'[0-9 .]{12}'        # rest of obsDate 21-32
+                              + r'[0-9 .]{12}'        # Ra 33-44
+                              + r'[-+ ][0-9 .]{11}'   # Dec 45-56
+                              + r'.{24}'              # 57-80
+                              + r'$')
+
+    def __init__(self, validation='strict'):
+        if validation not in validation_levels:
+            raise ValueError("Unknown validation level " + repr(validation))
+        self.validation = validation
+
+    def matches(self, line):
+        """
+        Return True if <line> has the layout of an optical MPC1992 line
+        """
+
+        return self.layout_regex.match(line) is not None
+
+    def parse(self, line):
+        """
+        Parse a line of MPC1992 80 column format and return a dictionary of
+        decoded values. See `parse_dataline()` for details.
+        """
+
+        obs = self.parse_observation(line)
+        if obs is None:
+            return {}
+        return obs.to_dict()
+
+    def parse_observation(self, line):
+        """
+        Parse a line of MPC1992 80 column format and return an `Observation`
+        (or None for an empty line). See `parse_dataline()` for details.
+        """
+
+        if not line:
+            return None
+        if len(line) > 80:
+            error80(repr(len(line)) + ' columns', line)
+
+        ret = Observation()
+        ret.subFmt = 'M92'  # since were are MPC 80-col format
+        if self.matches(line):  # optical, SVXx
+            ret.totalid = line[0:12]
+            ret.disc = line[12]
+            ret.notes = line[13]
+            ret.code = line[14]
+            ret.date = line[15:32]
+
+            ret.raSexagesimal = line[32:44]
+            ret.decSexagesimal = line[44:56]
+            ret.bl1 = line[56:65]
+            ret.mag = line[65:70]
+            ret.band = line[70]
+            ret.packedref = line[71:77]
+            ret.stn = line[77:80]
+
+            sexVals.checkDate(ret, self.validation)
+            sexVals.checkRa(ret, self.validation)
+            sexVals.checkDec(ret, self.validation)
+        else:
+            error80("no match for line", line)
+
+        #
+        # more value sanity checks
+        #
+        if ret.code not in packUtil.validCodes:
+            error80("invalid column 14 " + ret.code + " in line ", line)
+        else:
+            ret.mode = packUtil.codeDict[ret.code]
+
+        # No mapping of program codes yet (not supposed to be in submissions anyway...?)
+        ret.prog = '  '
+        if ret.notes not in packUtil.validNotes:
+            error80("invalid note "+ ret.notes +" in line ", line)
+
+        # Determine catalog code; 72 - first in packed reference. Blank for submissions
+        ret.astCat = ret.packedref[0]
+
+        #
+        # compute unpacked ID fields.  This may be only a trkSub
+        #
+
+        (permID, provID, trkSub) = packUtil.unpackPackedID(ret.totalid)
+        ret.permID = permID
+        ret.provID = provID
+        ret.trkSub = trkSub
+
+        if self.validation == 'strict':
+            try:
+                packtest = packUtil.packTupleID((permID, provID, trkSub))
+                if packtest != ret.totalid:
+                    print ("ID does not round-trip; " + packtest + " vs. " + ret.totalid)
+            except RuntimeError:
+                print ("fails pack: ", permID, provID, trkSub)
+
+        return ret
+
+# Validation levels of `DatalineParser`, most thorough first
+validation_levels = ('strict', 'normal', 'trusted')
+
+_dataline_parsers = dict((level, DatalineParser(level)) for level in validation_levels)
+_dataline_parser = _dataline_parsers['strict']
+
+def _get_dataline_parser(validation):
+    """Return the shared `DatalineParser` for the <validation> level"""
+
+    try:
+        return _dataline_parsers[validation]
+    except KeyError:
+        raise ValueError("Unknown validation level " + repr(validation))
+
+def parse_dataline(line, validation='strict'):
     """
     Parse a line of MPC1992 80 column format and return a dictionary of decoded values.
 
@@ -196,6 +438,9 @@ def parse_dataline(line):
     ----------
     line: str
         An 80 column line in MPC1992 format
+    validation: str, optional
+        How thoroughly the values are checked; 'strict', 'normal' or
+        'trusted' (see `DatalineParser`)
 
     Returns
     -------
@@ -212,122 +457,332 @@ def parse_dataline(line):
     -----
     This is a cut-down version of the `ADES_Master.mpc80coltoxml.decode80ColumnDataLine`
     that only supports the optical line format (since Astrometrica cannot produce
-    radar, roving observer or satellite format lines)
+    radar, roving observer or satellite format lines). The decoding is done by
+    the shared, precompiled `DatalineParser` instance.
     """
 
-    #
-    # matches optical line; also V and S and X
-    #
-    # groups: first seven are for all types
-    #   1: id group
-    #   2: discovery
-    #   3: notes -- notes can be anything; valid Notes is wrong
-    #   4: codes  and RvSsVvXx
-    #   5: yyyy  from obsDate
-    #   6: blank or a-e for asteroid satellites (embedded in obsDat)
-    #   7: rest of obsDate
-
-    commonRegexHelp1 = ('([A-za-z0-9 ]{12})'    # id group 1-12
-                        + '([ *+])'                # discovery group 13 may be ' ', '*' or '+'
-                        #+ '( AaBbcDdEFfGgGgHhIiJKkMmNOoPpRrSsTtUuVWwYyCQX2345vzjeL16789])' # notes group 14
-                        + '(.)'                 # notes can be anything
-                       )
-    commonRegexHelp2 = (r'(\d{4})'            # yyyy from obsDate 16-19
-                        + '([ a-e])'            # asteroid satellite embedded in date 20
-                        + '([0-9 .]{12})'       # rest of obsDate loosely checked 21-32
-                       )
+    return _get_dataline_parser(validation).parse(line)
 
+# Version of the Astrometrica.log parser output; change it whenever the
+# results of `read_astrometrica_logfile()` change so cached results are not reused
+_log_parser_version = 1
 
-    # ----------- remainder depends on type.  This is for optical and SV
-    #   8: Ra
-    #   9: Dec
-    #  10: doc says blank but stuff is here
-    #  11: mag
-    #  12: band
-    #  13: packedref and astCode as first character
-    #  14: 3-character obs stn code
-    #
-    normalLineRegex = re.compile(('^'
-                                  + commonRegexHelp1
-                                  + '([A PeCTMcEOHNn])' # codes group --  do not include  RrSsVvXx 15
-                                  + commonRegexHelp2
-                                  + '([0-9 .]{12})'       # Ra loosely checked 33-44
-                                  + '([-+ ][0-9 .]{11})'  # Dec loosely checked 45-56
-                                  + '(.{9})'              # mpc doc says blank but not 57-65
-                                  + '(.{5})'              # mag 66-70
-                                  + '(.{1})'              # band 71
-                                  + '(.{6})'              # packedref 72-77. 72 by itself is astCode
-                                  + '(.{3})'              # obs stn 78-80
-                                  + '$')
-                                )
-
-    ret = {}
-    if not line:
-        return ret
-    if len(line) > 80:
-        error80(repr(len(line)) + ' columns', line)
+class _LogParser(object):
+    """
+    Single pass state machine parser for Astrometrica.log files.
+
+    Each line of the log is passed in turn to `feed`, which is always bound to
+    the handler for the current state: `_main` for top level lines, or one of
+    the handlers for the lines following an Astrometry, Photometry or
+    Position/Moving object line. Lines are never re-read; the line following
+    each measurement in a Position block is handed back to `_main` if it
+    starts a new block (or after 11 measurements).
+    """
 
-    ret['subFmt'] = 'M92'  # since were are MPC 80-col format
-    m = normalLineRegex.match(line)  # optical, SVXx
-    if m:
-        #  print (m.groups())
-        ret['totalid'] = m.group(1)
-        ret['disc'] = m.group(2)
-        ret['notes'] = m.group(3)
-        ret['code'] = m.group(4)
-        ret['date'] = m.group(5) + m.group(6) + m.group(7)
-
-        ret['raSexagesimal'] = m.group(8)
-        ret['decSexagesimal'] = m.group(9)
-        ret['bl1'] = m.group(10)
-        ret['mag'] = m.group(11)
-        ret['band'] = m.group(12)
-        ret['packedref'] = m.group(13)
-        ret['stn'] = m.group(14)
-
-        sexVals.checkDate(ret) # check date first
-        sexVals.checkRa(ret)
-        sexVals.checkDec(ret)
-    else:
-        error80("no match for line", line)
+    _prefix_regex = re.compile(r'\d{2}:\d{2}:\d{2} - ')
+    _images_regex = re.compile(r'^\d{2}:\d{2}:\d{2} - Astrometry of Image \d* \(' + r'(.*)\):')
+    _photom_regex = re.compile(r'^\d{2}:\d{2}:\d{2} - Photometry of Image \d* \(' + r'(.*)\):')
+    _version_regex = re.compile(r'^\s*(Astrometrica .*[^\r\n]+)')
+    _astrom_rms_regex = re.compile(r'(\d+)[^=]+=\s*([.0-9]+)\"[^=]+=\s*([.0-9]+)\"')
+    _photom_rms_regex = re.compile(r'(\d+)[^=]+=\s*([.0-9]+)[^=]+')
+    _pos_rms_regex = re.compile(r'([.0-9]+)')
+    _apradius_regex = re.compile(r'^\s*Aperture Radius\s*=\s*(\d)')
+    _mov_end_regex = re.compile(r'\w+\W+')
+    _pix_size_regex = re.compile(r'([.0-9]+)\"')
+
+    # Maximum number of measurements read from a Position/Moving object block
+    _max_positions = 11
+    # Maximum number of lines searched for the Pixel Size after the Astrometry rms line
+    _max_pixsize_lines = 10
+
+    def __init__(self, dbg=False):
+        self.dbg = dbg
+        self.version = ''
+        # Image name -> astrometry/photometry rms values, in order of first appearance
+        self.images = OrderedDict()
+        self.asteroids = []
+        # Contents of the asteroid measurements found so far, to skip duplicates
+        self._asteroid_keys = set()
+        self.avg_pix_size = None
+        self.ap_radius_pix = None
+        self.feed = self._main
+
+    def _main(self, line):
+        if line[2:3] == ':' and self._prefix_regex.match(line):
+            keyword = line[11:]
+            if keyword.startswith('Astrometry of Image '):
+                i = self._images_regex.match(line)
+                if i:
+                    self._image = i.group(1)
+                    self.feed = self._astrom_rms
+            elif keyword.startswith('Photometry of Image '):
+                p = self._photom_regex.match(line)
+                if p:
+                    self._image = p.group(1)
+                    self.feed = self._photom_rms
+            elif keyword.startswith('Position') or keyword.startswith('Moving'):
+                # Match to position added/Moving object detected lines
+                if self.dbg: print(line)
+                self._num_positions = 0
+                self.feed = self._pos_fields
+        elif 'Astrometrica ' in line and self._version_regex.match(line):
+            self.version = self._version_regex.match(line).group(1)
+        elif 'Aperture Radius' in line:
+            ap = self._apradius_regex.search(line)
+            if ap:
+                self.ap_radius_pix = float(ap.group(1))
+
+    def _astrom_rms(self, line):
+        m = self._astrom_rms_regex.search(line)
+        if m:
+            rms = {}
+            rms['nstars'] = m.group(1)
+            rms['dRA'] = m.group(2)
+            rms['dDec'] = m.group(3)
+            self._add_image(self._image, rms)
+        self._pixsize_lines = 0
+        self.feed = self._pixel_size
+
+    def _pixel_size(self, line):
+        self._pixsize_lines += 1
+        if 'Pixel Size' in line or self._pixsize_lines >= self._max_pixsize_lines:
+            pix_size = self._pix_size_regex.findall(line)
+            if self.dbg: print(pix_size)
+            if len(pix_size) == 2:
+                self.avg_pix_size = (float(pix_size[0]) + float(pix_size[1]))/2.0
+            self.feed = self._main
+
+    def _photom_rms(self, line):
+        m = self._photom_rms_regex.search(line)
+        if m:
+            self._set_image_dmag(self._image, m.group(2))
+        self.feed = self._main
+
+    def _pos_fields(self, line):
+        chunks = line.rstrip().split()
+        if self.dbg: print("i=", self._num_positions, " Line=", line)
+        if self.dbg: print("Pos match. line2 #chunks=", len(chunks))
+        asteroid = {}
+        if len(chunks) == 13:
+            # Object not known to Astrometrica (not in MPCORB.DAT etc)
+            ##   0  1   2               3   4   5               6                7        8         9    10    11     12
+            # RAhh mm ss.sss           sdd mm ss.ss           Mag                X        Y       Flux   FWHM  SNR   Fit RMS
+            #  10 05 04.994           +03 48 16.27           20.87           2018.73  2063.05    1951   0.8   12.6  0.151
+            asteroid['fwhm'] = chunks[10]
+            asteroid['snr'] = chunks[11]
+        elif len(chunks) == 16:
+            # Object known to Astrometrica (in MPCORB.DAT etc)
+            ##   0  1   2        3      4   5   6       7       8       9        10      11        12    13    14     15
+            # RAhh mm ss.sss  deltaRA? sdd mm ss.ss deltaDec?  Mag   deltaMag    X        Y       Flux   FWHM  SNR   Fit RMS
+            #   10 05 13.676   +3.44   +03 56 04.33   +0.58   19.77   -0.21   1650.78   898.43    5327   0.0   18.4  -.---
+            asteroid['fwhm'] = chunks[13]
+            asteroid['snr'] = chunks[14]
+        else:
+            print("Unexpected number of fields in line:\n", line)
+        self._asteroid = asteroid
+        self.feed = self._pos_rms
+
+    def _pos_rms(self, line):
+        # Uncertainties line
+        chunks = self._pos_rms_regex.findall(line)
+        if self.dbg: print("Pos match. line3 #chunks=", len(chunks))
+        if len(chunks) == 3:
+            self._asteroid['rmsRA'] = chunks[0]
+            self._asteroid['rmsDec'] = chunks[1]
+            self._asteroid['rmsMag'] = chunks[2]
+        self.feed = self._pos_mpc
+
+    def _pos_mpc(self, line):
+        # MPC format line, parse and add bits we need later to dict
+        if self.dbg: print(line)
+        asteroid = self._asteroid
+        try:
+            data = parse_dataline(line.rstrip())
+            asteroid['totalid'] = data['totalid']
+            asteroid['obsTime'] = data['obsTime']
+            self._add_asteroid(asteroid)
+            if self.dbg: print(asteroid)
+        except RuntimeError:
+            print("Error parsing line: ", line)
+        self._rwo_lines = 0
+        self.feed = self._pos_rwo
+
+    def _pos_rwo(self, line):
+        # Skip the two AstDys .rwo format lines
+        self._rwo_lines += 1
+        if self._rwo_lines == 2:
+            self._num_positions += 1
+            self.feed = self._pos_next
+
+    def _pos_next(self, line):
+        # Either the start of the next measurement or the end of the block
+        new_block = line[2:3] == ':' and self._prefix_regex.match(line) and \
+            (line.startswith(('Position', 'Moving'), 11) or self._mov_end_regex.match(line, 11))
+        if new_block or self._num_positions >= self._max_positions:
+            if self.dbg: print("Found new position line")
+            self.feed = self._main
+            self._main(line)
+        else:
+            self._pos_fields(line)
 
-    #
-    # more value sanity checks
-    #
-    sexVals.checkDate(ret) # check date always
-    if ret['code'] not in packUtil.validCodes:
-        error80("invalid column 14 " + ret['code']+ " in line ", line)
-    else:
-        ret['mode'] = packUtil.codeDict[ret['code']]
+    def _add_image(self, image, rms):
+        # Add details or, if the image is already known, replace its values
+        self.images[image] = rms
 
-    # No mapping of program codes yet (not supposed to be in submissions anyway...?)
-    ret['prog'] = '  '
-    if ret['notes'] not in packUtil.validNotes:
-        error80("invalid note "+ ret['notes'] +" in line ", line)
+    def _set_image_dmag(self, image, dmag):
+        try:
+            self.images[image]['dMag'] = dmag
+        except KeyError:
+            print("Image not found in list to update")
+
+    def _add_asteroid(self, asteroid):
+        asteroid_key = frozenset(asteroid.items())
+        if asteroid_key not in self._asteroid_keys:
+            self._asteroid_keys.add(asteroid_key)
+            self.asteroids.append(asteroid)
+
+    def at_block_boundary(self):
+        """
+        Return whether a timestamped line fed next would be handled as the
+        start of a new block (i.e. the parser is not part way through a block)
+        """
+
+        return self.feed == self._main or self.feed == self._pos_next
+
+    def results(self):
+        """
+        Return the version, images and asteroids found in the lines fed so far,
+        with the aperture radius (in arcsec) added to each asteroid if known.
+        """
+
+        # If we have an aperture radius (in pixels) and a pixel scale (in arcsec), go
+        # ahead and compute an aperture radius (in arcsec) and add this into the dict
+        # for each asteroid
+        if self.ap_radius_pix and self.avg_pix_size:
+            ap_radius_arcsec = self.ap_radius_pix * self.avg_pix_size
+            for ast in self.asteroids:
+                ast['photAp'] = ap_radius_arcsec
+
+        return self.version, list(self.images.items()), self.asteroids
+
+class _LogEventParser(_LogParser):
+    """
+    `_LogParser` for one piece of a log parsed in parallel, which records the
+    image and asteroid updates as a list of events instead of applying them,
+    so they can be replayed in order by `_merge_log_pieces()`.
+    """
 
-    # Determine catalog code; 72 - first in packed reference. Blank for submissions
-    ret['astCat'] = ret['packedref'][0]
+    def __init__(self, dbg=False):
+        super(_LogEventParser, self).__init__(dbg)
+        self.events = []
 
-    #
-    # compute unpacked ID fields.  This may be only a trkSub
-    #
+    def _add_image(self, image, rms):
+        self.events.append(('_add_image', (image, rms)))
+
+    def _set_image_dmag(self, image, dmag):
+        self.events.append(('_set_image_dmag', (image, dmag)))
+
+    def _add_asteroid(self, asteroid):
+        # Duplicates within the piece can be dropped here already
+        asteroid_key = frozenset(asteroid.items())
+        if asteroid_key not in self._asteroid_keys:
+            self._asteroid_keys.add(asteroid_key)
+            self.events.append(('_add_asteroid', (asteroid,)))
+
+# Lines at which a log may be split for parsing in parallel: timestamped lines
+# which start a new block when the parser isn't part way through one
+_log_split_regex = re.compile(br'^\d{2}:\d{2}:\d{2} - \w+\W', re.MULTILINE)
 
-    (permID, provID, trkSub) = packUtil.unpackPackedID(ret['totalid'])
-    ret['permID'] = permID
-    ret['provID'] = provID
-    ret['trkSub'] = trkSub
-    #print(permID, provID, trkSub)
+# Number of pieces per worker the log is split into when parsing in parallel
+_log_pieces_per_worker = 4
+
+def _split_log_ranges(log_fh, ranges, num_pieces):
+    """
+    Split the byte <ranges> of the open binary file <log_fh> at timestamped
+    lines into about <num_pieces> pieces of similar size.
+    """
 
     try:
-        packtest = packUtil.packTupleID((permID, provID, trkSub))
-        if packtest != ret['totalid']:
-            print ("ID does not round-trip; " + packtest + " vs. " + ret['totalid'])
-    except RuntimeError:
-        print ("fails pack: ", permID, provID, trkSub)
+        log_map = mmap.mmap(log_fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty file
+        return ranges
+    with log_map:
+        size = len(log_map)
+        total = sum((size if end is None else end) - start for start, end in ranges)
+        piece_size = max(1, total // num_pieces)
+        pieces = []
+        for start, end in ranges:
+            range_end = size if end is None else end
+            while True:
+                match = _log_split_regex.search(log_map, min(start + piece_size, range_end), range_end)
+                if match is None:
+                    break
+                pieces.append((start, match.start()))
+                start = match.start()
+            pieces.append((start, end))
+    return pieces
 
-    return ret
+def _parse_log_pieces(log, pieces, dbg=False):
+    """
+    Parse the byte ranges <pieces> of <log> in turn with a `_LogEventParser`,
+    returning the events, version, aperture radius and pixel size found and
+    whether the parser ended at a block boundary.
+    """
+
+    parser = _LogEventParser(dbg)
+    with open(log, 'rb') as log_fh:
+        for start, end in pieces:
+            log_fh.seek(start)
+            data = log_fh.read() if end is None else log_fh.read(end - start)
+            for line in io.TextIOWrapper(io.BytesIO(data), encoding='cp1252'):
+                parser.feed(line)
+    return parser.events, parser.version, parser.ap_radius_pix, parser.avg_pix_size, parser.at_block_boundary()
+
+def _read_log_parallel(log, ranges, dbg=False, workers=2):
+    """
+    Parse the byte <ranges> of <log> (as a serial parser fed them in turn
+    would) in a pool of <workers> processes, returning the results from
+    `_LogParser.results()`.
+
+    The ranges are split at timestamped lines and each piece is parsed from
+    the top level state. The events from each piece are then replayed in
+    order into a single `_LogParser`, so the ordering and de-duplication of
+    images and asteroids is the same as for the serial parser. If a piece
+    ends part way through a block (so the next piece should not have started
+    at the top level), the two are re-parsed together.
+    """
 
-def read_astrometrica_logfile(log, dbg=False):
+    with open(log, 'rb') as log_fh:
+        pieces = _split_log_ranges(log_fh, ranges, workers * _log_pieces_per_worker)
+    if len(pieces) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            piece_results = list(executor.map(_parse_log_pieces, [log] * len(pieces), [[piece] for piece in pieces],
+                [dbg] * len(pieces)))
+    else:
+        piece_results = [_parse_log_pieces(log, pieces, dbg)]
+
+    parser = _LogParser(dbg)
+    i = 0
+    while i < len(piece_results):
+        piece_result = piece_results[i]
+        j = i + 1
+        while not piece_result[4] and j < len(pieces):
+            j += 1
+            piece_result = _parse_log_pieces(log, pieces[i:j], dbg)
+        events, version, ap_radius_pix, avg_pix_size, at_boundary = piece_result
+        for method, args in events:
+            getattr(parser, method)(*args)
+        if version:
+            parser.version = version
+        if ap_radius_pix is not None:
+            parser.ap_radius_pix = ap_radius_pix
+        if avg_pix_size is not None:
+            parser.avg_pix_size = avg_pix_size
+        i = j
+    return parser.results()
+
+def read_astrometrica_logfile(log, dbg=False, dates=None, workers=1):
     """
     Read an Astrometrica log file, extracting the version number, the images
     measured (with details about the no. of stars used and the RA, Dec & magnitude
@@ -339,6 +794,13 @@ def read_astrometrica_logfile(log, dbg=False):
         Path/filename of the Astrometrica.log file
     dbg: bool, optional
         Turn on debugging print statements
+    dates: collection of str, optional
+        If given, only the sessions in the log with images taken on these
+        ('YYYY-MM-DD' UT) dates are read, using the session index from
+        `index_astrometrica_log()`
+    workers : int, optional
+        Number of worker processes to parse the log with (default 1 i.e.
+        serial); the results are identical (see `_read_log_parallel()`)
 
     Returns
     -------
@@ -352,163 +814,281 @@ def read_astrometrica_logfile(log, dbg=False):
         SNR and FWHM of asteroid measured by Astrometrica.
     """
 
-    images = []
-    asteroids = []
-    version = ''
+    parser = _LogParser(dbg)
+
+    try:
+        if workers is not None and workers > 1:
+            ranges = [(0, None)]
+            if dates is not None:
+                ranges = _session_ranges(index_astrometrica_log(log), set(dates))
+            return _read_log_parallel(log, ranges, dbg, workers)
+        _feed_log(parser, log, dates)
+    except (IOError, OSError):
+        print("Could not open", log)
+
+    return parser.results()
+
+def _feed_log(parser, log, dates=None):
+    """
+    Feed each line of <log> (or, if <dates> is given, only of its sessions
+    with images from those dates) in turn to <parser>.
+
+    Raises
+    ------
+    IOError/OSError:
+        Raised if the log can't be read
+    """
+
+    if dates is not None:
+        sessions = index_astrometrica_log(log)
+        with open(log, 'rb') as log_fh:
+            for start, end in _session_ranges(sessions, set(dates)):
+                log_fh.seek(start)
+                data = log_fh.read() if end is None else log_fh.read(end - start)
+                session_fh = io.TextIOWrapper(io.BytesIO(data), encoding='cp1252')
+                for line in session_fh:
+                    parser.feed(line)
+        return
 
     try:
         log_fh = open(log, 'r', encoding="cp1252")
     except TypeError:
         log_fh = open(log, 'r')
-    except IOError:
+
+    with log_fh:
+        for line in log_fh:
+            parser.feed(line)
+
+class _LogKeyParser(_LogParser):
+    """
+    `_LogParser` which only keeps the asteroid measurements whose (totalid,
+    obsTime) are in <keys>, and the sum and count of the non-zero FWHMs of
+    all of them, rather than every image and measurement in the log. As in
+    `_LogParser`, repeated measurements are only counted once; they're
+    recognised by the hash of each measurement rather than by keeping it.
+    """
+
+    def __init__(self, keys, dbg=False):
+        super(_LogKeyParser, self).__init__(dbg)
+        self.keys = keys
+        self.fwhm_sum = 0.0
+        self.fwhm_count = 0
+        self._fwhm_digests = set()
+
+    def _add_image(self, image, rms):
+        pass
+
+    def _set_image_dmag(self, image, dmag):
+        pass
+
+    def _add_asteroid(self, asteroid):
+        fwhm = asteroid.get('fwhm', '0.0')
+        if fwhm != '0.0':
+            digest = hash(frozenset(asteroid.items()))
+            if digest not in self._fwhm_digests:
+                self._fwhm_digests.add(digest)
+                self.fwhm_sum += float(fwhm)
+                self.fwhm_count += 1
+        if (asteroid['totalid'], asteroid['obsTime']) in self.keys:
+            super(_LogKeyParser, self)._add_asteroid(asteroid)
+
+def read_astrometrica_log_for_keys(log, keys, dbg=False, dates=None):
+    """
+    Read an Astrometrica log file as `read_astrometrica_logfile()` does, but
+    only keep the asteroid measurements needed for the observations with the
+    passed (totalid, obsTime) <keys> (e.g. from `read_mpcreport_keys()`), so
+    the memory used is proportional to the report rather than to the log.
+
+    Parameters
+    ----------
+    log : str
+        Path/filename of the Astrometrica.log file
+    keys : set of tuple
+        The (totalid, obsTime) of the observations to keep the measurements of
+    dbg: bool, optional
+        Turn on debugging print statements
+    dates: collection of str, optional
+        If given, only the sessions in the log with images taken on these
+        ('YYYY-MM-DD' UT) dates are read (see `read_astrometrica_logfile()`)
+
+    Returns
+    -------
+    version : str
+        The version string of Astrometrica that was used
+    asteroids: list
+        A list of dicts of the measurements matching <keys> (as for
+        `read_astrometrica_logfile()`)
+    seeing : float
+        The average of the non-zero FWHMs of all of the measurements in the
+        log (with repeated measurements counted once, as in
+        `_read_log_for_psv()`), or -99 if there are none.
+    """
+
+    parser = _LogKeyParser(keys, dbg)
+    try:
+        _feed_log(parser, log, dates)
+    except (IOError, OSError):
         print("Could not open", log)
-        return version, images, asteroids
-
-    images_regex = re.compile(r'^\d{2}:\d{2}:\d{2} - Astrometry of Image \d* \(' + r'(.*)\):')
-    photom_regex = re.compile(r'^\d{2}:\d{2}:\d{2} - Photometry of Image \d* \(' + r'(.*)\):')
-    version_regex = re.compile(r'^\s*(Astrometrica .*[^\r\n]+)')
-    astrom_rms_regex = re.compile(r'(\d+)[^=]+=\s*([.0-9]+)\"[^=]+=\s*([.0-9]+)\"')
-    photom_rms_regex = re.compile(r'(\d+)[^=]+=\s*([.0-9]+)[^=]+')
-    pos_regex = re.compile(r'^\d{2}:\d{2}:\d{2} - (Position|Moving)')
-    pos_rms_regex = re.compile(r'([.0-9]+)')
-    apradius_regex = re.compile(r'^\s*Aperture Radius\s*=\s*(\d)')
-    mov_end_regex = re.compile(r'^\d{2}:\d{2}:\d{2} - \w+\W+')
-
-    avg_pix_size = None
-    ap_radius_pix = None
-
-    while True:
-        line = log_fh.readline()
-        i = images_regex.match(line)
-        v = version_regex.match(line)
-        p = photom_regex.match(line)
-        pos = pos_regex.match(line)
-        ap = apradius_regex.search(line)
-        if v:
-            # Match to version string
-            version = v.group(1)
-        elif ap:
-            ap_radius_pix = float(ap.group(1))
-        elif i:
-            # Match to Astrometry image line
-            line2 = log_fh.readline()
-            if not line2: break
-            m = astrom_rms_regex.search(line2)
-            image = i.group(1)
-            if m:
-                rms = {}
-                rms['nstars'] = m.group(1)
-                rms['dRA'] = m.group(2)
-                rms['dDec'] = m.group(3)
-                image_list = [i[0] for i in images]
-                try:
-                    # Image is already in list, update values
-                    image_index = image_list.index(image)
-                    images[image_index]= (image, rms)
-                except ValueError:
-                    # Image is not in list, add details
-                    images.append((image , rms))
-            line_count = 0
-            line2 = 'DivisionByCucumber'
-            while 'Pixel Size' not in line2 and line_count < 10:
-                line2 = log_fh.readline()
-                if hasattr(line2, 'decode'):
-                    line2 = line2.decode('cp1252')
-                if not line2: break
-                line_count += 1
-            pix_size_regex = re.compile(r'([.0-9]+)\"')
-            pix_size = pix_size_regex.findall(line2)
-            if dbg: print(pix_size)
-            if len(pix_size) == 2:
-                avg_pix_size = (float(pix_size[0]) + float(pix_size[1]))/2.0
-        elif p:
-            # Match to photometry line
-            line2 = log_fh.readline()
-            if not line2: break
-            m = photom_rms_regex.search(line2)
-            image = p.group(1)
-            if m:
-                image_list = [i[0] for i in images]
-                try:
-                    image_index = image_list.index(image)
-                    images[image_index][1]['dMag'] = m.group(2)
-                except ValueError:
-                    print("Image not found in list to update")
-        elif pos:
-            # Match to position added/Moving object detected lines
-            i = 0
-            if dbg: print(line)
-            while i <= 10:
-                line2 = log_fh.readline()
-                if not line2: break
-                chunks = line2.rstrip().split()
-                if dbg: print("i=",i," Line=",line2)
-                if dbg: print("Pos match. line2 #chunks=", len(chunks))
-                asteroid = {}
-                if len(chunks) == 13:
-                    # Object not known to Astrometrica (not in MPCORB.DAT etc)
-                    ##   0  1   2               3   4   5               6                7        8         9    10    11     12
-                    # RAhh mm ss.sss           sdd mm ss.ss           Mag                X        Y       Flux   FWHM  SNR   Fit RMS
-                    #  10 05 04.994           +03 48 16.27           20.87           2018.73  2063.05    1951   0.8   12.6  0.151
-                    asteroid['fwhm'] = chunks[10]
-                    asteroid['snr'] = chunks[11]
-                elif len(chunks) == 16:
-                    # Object known to Astrometrica (in MPCORB.DAT etc)
-                    ##   0  1   2        3      4   5   6       7       8       9        10      11        12    13    14     15
-                    # RAhh mm ss.sss  deltaRA? sdd mm ss.ss deltaDec?  Mag   deltaMag    X        Y       Flux   FWHM  SNR   Fit RMS
-                    #   10 05 13.676   +3.44   +03 56 04.33   +0.58   19.77   -0.21   1650.78   898.43    5327   0.0   18.4  -.---
-                    asteroid['fwhm'] = chunks[13]
-                    asteroid['snr'] = chunks[14]
+    version, images, asteroids = parser.results()
+
+    seeing = -99
+    if parser.fwhm_count > 0:
+        seeing = parser.fwhm_sum/float(parser.fwhm_count)
+    return version, asteroids, seeing
+
+# Version of the format of the Astrometrica.log session index files
+_log_index_version = 1
+
+_session_regex = re.compile(br'^\d{2}:\d{2}:\d{2} - Start (\d{4})/(\d{2})/(\d{2})|' +
+                            br'^[ \t]*(Astrometrica [^\r\n]+)|' +
+                            br'Time Stamp: (\d{4}) (\d{2}) (\d{2})', re.MULTILINE)
+
+def _scan_sessions(log_fh, start, end):
+    """
+    Scan bytes <start> to <end> of the open binary file <log_fh> for the
+    sessions started in it, returning a list of dicts with the byte 'offset'
+    of each session, its start 'date', the Astrometrica 'version' and the
+    sorted UT 'obs_dates' of its images. Any content before the first Start
+    line is returned as a session with a date of None.
+    """
+
+    sessions = []
+    session = None
+    obs_dates = set()
+    if end > start:
+        mm = mmap.mmap(log_fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for m in _session_regex.finditer(mm, start, end):
+                if m.group(1) is not None:
+                    if session is not None:
+                        session['obs_dates'] = sorted(obs_dates)
+                    session = {'offset' : m.start(), 'date' : b'-'.join(m.group(1, 2, 3)).decode(), 'version' : '', 'obs_dates' : []}
+                    obs_dates = set()
+                    sessions.append(session)
+                    continue
+                if session is None:
+                    session = {'offset' : start, 'date' : None, 'version' : '', 'obs_dates' : []}
+                    sessions.append(session)
+                if m.group(4) is not None:
+                    session['version'] = m.group(4).decode('cp1252').rstrip()
                 else:
-                    print("Unexpected number of fields in line:\n", line2)
-                # Read uncertainties line
-                line3 = log_fh.readline()
-                if not line3: break
-                chunks = pos_rms_regex.findall(line3)
-                if dbg: print("Pos match. line3 #chunks=", len(chunks))
-                if len(chunks) == 3:
-                    asteroid['rmsRA'] = chunks[0]
-                    asteroid['rmsDec'] = chunks[1]
-                    asteroid['rmsMag'] = chunks[2]
-                # Read MPC format line, parse and add bits we need later to dict
-                line4 = log_fh.readline()
-                if not line4: break
-                if dbg: print(line4)
-                try:
-                    data = parse_dataline(line4.rstrip())
-                    asteroid['totalid'] = data['totalid']
-                    asteroid['obsTime'] = data['obsTime']
-                    if asteroid not in asteroids:
-                        asteroids.append(asteroid)
-                    if dbg: print(asteroid)
-                except RuntimeError:
-                    print("Error parsing line: ", line4)
-                # Read AstDys .rwo format lines
-                junk = log_fh.readline()
-                junk = log_fh.readline()
-                # Record position in file, look at next line
-                last_pos = log_fh.tell()
-                line = log_fh.readline()
-                if dbg: print("lastline=",line)
-                if pos_regex.match(line) or mov_end_regex.match(line):
-                    if dbg: print("Found new position line, rewinding")
-                    log_fh.seek(last_pos)
-                    break
+                    obs_dates.add(b'-'.join(m.group(5, 6, 7)).decode())
+        finally:
+            mm.close()
+    if session is not None:
+        session['obs_dates'] = sorted(obs_dates)
+    return sessions
+
+def index_astrometrica_log(log):
+    """
+    Return the index of the sessions in the Astrometrica log <log>, creating
+    or updating the sidecar index file (<log>.idx) as needed. If the log has
+    only been appended to since it was last indexed, only the new content
+    (and the last indexed session, which may have grown) is scanned.
 
-                log_fh.seek(last_pos)
-                i += 1
-        if not line: break
-    log_fh.close()
+    Returns
+    -------
+    sessions : list of dict
+        The byte 'offset', start 'date', Astrometrica 'version' and UT image
+        'obs_dates' of each session, in order (see `_scan_sessions()`)
+    """
 
-    # If we have an aperture radius (in pixels) and a pixel scale (in arcsec), go
-    # ahead and compute an aperture radius (in arcsec) and add this into the dict
-    # for each asteroid
-    if ap_radius_pix and avg_pix_size:
-        ap_radius_arcsec = ap_radius_pix * avg_pix_size
-        for ast in asteroids:
-            ast['photAp'] = ap_radius_arcsec
+    index_file = log + '.idx'
+    try:
+        with open(index_file, 'r') as index_fh:
+            index = json.load(index_fh)
+    except (IOError, ValueError):
+        index = None
+
+    with open(log, 'rb') as log_fh:
+        size = os.fstat(log_fh.fileno()).st_size
+        sessions = []
+        scan_start = 0
+        if index is not None and index.get('format') == _log_index_version and index.get('size', size + 1) <= size:
+            tail_start = max(0, index['size'] - _checkpoint_tail_bytes)
+            if _hash_range(log_fh, tail_start, index['size']) == index.get('tail_hash'):
+                if index['size'] == size:
+                    return index['sessions']
+                # Rescan the last session, which may have been added to
+                sessions = index['sessions']
+                if len(sessions) > 0:
+                    scan_start = sessions.pop()['offset']
+
+        sessions += _scan_sessions(log_fh, scan_start, size)
+        tail_start = max(0, size - _checkpoint_tail_bytes)
+        index = {'format' : _log_index_version,
+                 'size' : size,
+                 'tail_hash' : _hash_range(log_fh, tail_start, size),
+                 'sessions' : sessions
+                }
 
-    return version, images, asteroids
+    try:
+        with open(index_file, 'w') as index_fh:
+            json.dump(index, index_fh)
+    except (IOError, OSError):
+        print("Could not write log index", index_file)
+
+    return sessions
+
+def _widen_dates(dates):
+    """
+    Return the set of ('YYYY-MM-DD') <dates> along with the days before and
+    after each of them
+    """
+
+    widened = set()
+    for date in dates:
+        day = datetime.strptime(date, '%Y-%m-%d')
+        for offset in (-1, 0, 1):
+            widened.add((day + timedelta(days=offset)).strftime('%Y-%m-%d'))
+    return widened
+
+def _session_ranges(sessions, dates):
+    """
+    Return the (start, end) byte ranges of the <sessions> which contain
+    images taken on any of <dates> or the days either side (or whose image
+    dates are unknown), with adjacent sessions merged. The end of the last
+    session is None. The session dates are of the exposure starts while the
+    report dates are mid-exposure, so an image started before 0h UT can be
+    reported on the next date.
+    """
+
+    dates = _widen_dates(dates)
+    ranges = []
+    for i, session in enumerate(sessions):
+        if len(session['obs_dates']) == 0 or not dates.isdisjoint(session['obs_dates']):
+            end = sessions[i+1]['offset'] if i + 1 < len(sessions) else None
+            if len(ranges) > 0 and ranges[-1][1] == session['offset']:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((session['offset'], end))
+    return ranges
+
+def index_asteroids(asteroids):
+    """
+    Build an index of the asteroid measurements from `read_astrometrica_logfile()`
+    for matching to observations.
+
+    Parameters
+    ----------
+    asteroids : list
+        A list of dicts of asteroid measurements, each with 'totalid' and 'obsTime'
+
+    Returns
+    -------
+    index : dict
+        Dictionary mapping (totalid, obsTime) to the first measurement in
+        <asteroids> with those values
+    """
+
+    index = {}
+    for ast in asteroids:
+        index.setdefault((ast['totalid'], ast['obsTime']), ast)
+    return index
+
+_header_codes = ('COD', 'CON', 'OBS', 'MEA', 'TEL', 'ACK', 'AC2', 'COM', 'NET')
+# Header lines which are used in the PSV output (by `parse_header()` and `map_NET_to_catalog()`)
+_psv_header_codes = ('COD', 'OBS', 'MEA', 'TEL', 'NET')
 
 def read_mpcreport_file(mpcreport_file):
     '''Open the MPC 1992 format file specified by <mpcreport_file>, returning the
@@ -520,7 +1100,7 @@ def read_mpcreport_file(mpcreport_file):
     try:
         with open(mpcreport_file, 'r') as mpc_fh:
             for line in mpc_fh:
-                if line[0:3] in ['COD', 'CON', 'OBS', 'MEA', 'TEL', 'ACK', 'AC2', 'COM', 'NET']:
+                if line[0:3] in _header_codes:
                     header.append(line.rstrip())
                 elif '----- end -----' not in line:
                     body.append(line.rstrip())
@@ -528,6 +1108,81 @@ def read_mpcreport_file(mpcreport_file):
         print("File ", mpcreport_file, " does not exist")
     return header, body
 
+def read_mpcreport_stream(mpc_fh):
+    """
+    Read the header lines from the start of an open MPC 1992 format file,
+    leaving the observations to be consumed lazily.
+
+    Parameters
+    ----------
+    mpc_fh : file
+        Open file (or any iterable of lines) positioned at the start of the report
+
+    Returns
+    -------
+    header : list of str
+        The header lines up to the first observation line
+    body : generator or None
+        Generator yielding the observation lines (starting with the first
+        one), or None if the report contains no observation lines.
+        Header-style lines occurring after the first observation (e.g. from
+        concatenated reports) are skipped.
+    """
+
+    header = []
+    first_line = None
+    for line in mpc_fh:
+        if line[0:3] in _header_codes:
+            header.append(line.rstrip())
+        elif '----- end -----' not in line:
+            first_line = line.rstrip()
+            break
+    if first_line is None:
+        return header, None
+    return header, _iter_body_lines(first_line, mpc_fh)
+
+def _iter_body_lines(first_line, mpc_fh):
+    """Yield <first_line> then the remaining observation lines of <mpc_fh>"""
+
+    yield first_line
+    for line in mpc_fh:
+        if line[0:3] not in _header_codes and '----- end -----' not in line:
+            yield line.rstrip()
+
+def read_mpcreport_dates(mpcreport):
+    """
+    Return the set of UT dates ('YYYY-MM-DD') of the observations in the
+    MPC 1992 format file <mpcreport>, without fully parsing the lines.
+    """
+
+    dates = set()
+    with open(mpcreport, 'r') as mpc_fh:
+        for line in mpc_fh:
+            date = line[15:25]
+            if line[0:3] not in _header_codes and date[4:5] == ' ' and date[7:8] == ' ' and date.replace(' ', '').isdigit():
+                dates.add(date.replace(' ', '-'))
+    return dates
+
+def read_mpcreport_keys(mpcreport):
+    """
+    Return the set of (totalid, obsTime) keys of the observations in the MPC
+    1992 format file <mpcreport>, used to match them to the measurements in
+    the Astrometrica log, without fully parsing the lines. Lines with an
+    invalid date are skipped.
+    """
+
+    keys = set()
+    with open(mpcreport, 'r') as mpc_fh:
+        for line in mpc_fh:
+            if line[0:3] in _header_codes or len(line) < 32:
+                continue
+            try:
+                obsTime = sexVals.sexDateToISO(line[15:32])[0]
+            except RuntimeError:
+                continue
+            keys.add((line[0:12], obsTime))
+    return keys
+
 def find_astrometrica_log(mpcreport):
     """
     Based on the passed path to the MPCReport.txt file, determine if there is an
@@ -564,6 +1219,169 @@ def find_astrometrica_log(mpcreport):
 
     return log
 
+def psv_filename(mpcreport):
+    """
+    Return the default path/filename of the ADES PSV file for the passed
+    MPCReport.txt file (same directory, with .txt replaced by .psv)
+    """
+
+    outFileName = os.path.basename(mpcreport)
+    if '.txt' in outFileName:
+        outFileName = outFileName.replace('.txt', '.psv')
+    else:
+        outFileName += '.psv'
+    return os.path.join(os.path.dirname(mpcreport), outFileName)
+
+def find_mpcreports(paths, pattern='MPCReport*.txt'):
+    """
+    Find all the MPCReport files under the passed list of <paths>. Each path
+    may be a directory (which is searched recursively for files matching
+    <pattern>), a file or a glob pattern matching either.
+
+    Parameters
+    ----------
+    paths : list of str
+        Directories, files or glob patterns to search
+    pattern : str, optional
+        Filename pattern of the MPCReport files to look for in directories
+
+    Returns
+    -------
+    mpcreports : list of str
+        Paths of the MPCReport files found, in sorted order per path
+    """
+
+    mpcreports = []
+    for path in paths:
+        if any(char in path for char in '*?['):
+            matches = sorted(glob.glob(path))
+        else:
+            matches = [path]
+        for match in matches:
+            if os.path.isdir(match):
+                for dirpath, dirnames, filenames in os.walk(match):
+                    dirnames.sort()
+                    for filename in sorted(fnmatch.filter(filenames, pattern)):
+                        mpcreports.append(os.path.join(dirpath, filename))
+            elif os.path.isfile(match):
+                mpcreports.append(match)
+            else:
+                print("No such file or directory: %s" % match)
+
+    # Remove duplicates from overlapping paths, preserving the order
+    seen = set()
+    unique_reports = []
+    for mpcreport in mpcreports:
+        key = os.path.abspath(mpcreport)
+        if key not in seen:
+            seen.add(key)
+            unique_reports.append(mpcreport)
+    return unique_reports
+
+def _convert_batch_file(mpcreport, options):
+    """
+    Convert a single MPCReport file (with its Astrometrica.log, if present) for
+    `convert_batch()`, returning a (mpcreport, outFile, num_objects, error,
+    cache_hit) tuple.
+    """
+
+    outFile = psv_filename(mpcreport)
+    astrometrica_log = find_astrometrica_log(mpcreport)
+    rms_available = astrometrica_log is not None
+    cache = options.get('cache')
+    hits = cache.hits if cache is not None else 0
+    try:
+        num_objects = convert_mpcreport_to_psv(mpcreport, outFile, rms_available, astrometrica_log, display=False, **options)
+    except Exception as e:
+        return mpcreport, outFile, -1, str(e).strip(), False
+    error = None
+    if num_objects <= 0:
+        error = "No objects written"
+    cache_hit = cache is not None and cache.hits > hits
+    return mpcreport, outFile, num_objects, error, cache_hit
+
+def _convert_batch_group(mpcreports, options):
+    """Convert a group of MPCReport files from `_batch_groups()` in turn with `_convert_batch_file()`"""
+
+    return [_convert_batch_file(mpcreport, options) for mpcreport in mpcreports]
+
+def _batch_groups(mpcreports, options):
+    """
+    Split <mpcreports> into the groups converted by each worker process in
+    `convert_batch()`. If a <log_cache> is passed through <options>, the
+    reports sharing an Astrometrica.log are put in the same group so the log
+    is only parsed once (the in-memory cache entries aren't passed to the
+    worker processes); otherwise each report is in a group of its own.
+    """
+
+    if options.get('log_cache') is None:
+        return [[mpcreport] for mpcreport in mpcreports]
+
+    groups = []
+    log_groups = {}
+    for mpcreport in mpcreports:
+        path = os.path.abspath(os.path.dirname(mpcreport))
+        if not os.path.isfile(os.path.join(path, 'Astrometrica.log')):
+            groups.append([mpcreport])
+        elif path in log_groups:
+            log_groups[path].append(mpcreport)
+        else:
+            log_groups[path] = [mpcreport]
+            groups.append(log_groups[path])
+    return groups
+
+def convert_batch(mpcreports, workers=1, **options):
+    """
+    Convert all of the passed MPCReport files to ADES PSV format in this
+    process (or a pool of <workers> processes), writing each output next to
+    its input and using the Astrometrica.log in the same directory, if any.
+
+    Parameters
+    ----------
+    mpcreports : list of str
+        Paths of the MPCReport files e.g. from `find_mpcreports()`
+    workers : int, optional
+        Number of worker processes to convert files with (1=serial). With a
+        <log_cache> passed through <options>, the reports sharing an
+        Astrometrica.log are converted by the same worker (see
+        `_batch_groups()`)
+
+    Returns
+    -------
+    summary : dict
+        Summary of the run with the number of 'files' and 'observations'
+        converted, the list of ('mpcreport', 'reason') 'failures', the
+        'time' taken in seconds and, if a <cache> was passed through
+        <options>, the number of 'cache_hits' and 'cache_misses'
+    """
+
+    start = time.time()
+    summary = {'files': 0, 'observations': 0, 'failures': [], 'time': 0.0}
+    cache = options.get('cache')
+    if workers is not None and workers > 1 and len(mpcreports) > 1:
+        groups = _batch_groups(mpcreports, options)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            group_results = executor.map(_convert_batch_group, groups, [options] * len(groups))
+            report_results = dict((result[0], result) for results in group_results for result in results)
+        results = [report_results[mpcreport] for mpcreport in mpcreports]
+    else:
+        results = [_convert_batch_file(mpcreport, options) for mpcreport in mpcreports]
+
+    for mpcreport, outFile, num_objects, error, cache_hit in results:
+        if error is None:
+            summary['files'] += 1
+            summary['observations'] += num_objects
+        else:
+            summary['failures'].append((mpcreport, error))
+    if cache is not None:
+        summary['cache_hits'] = sum(1 for result in results if result[4])
+        summary['cache_misses'] = len(results) - summary['cache_hits']
+        # Re-check the size limit as each worker process only evicted from its own view
+        cache.evict()
+    summary['time'] = time.time() - start
+
+    return summary
+
 def map_NET_to_catalog(header):
     '''Handle mapping of a possible NET line in the passed set of <header> lines
     to a astrometric catalog'''
@@ -591,7 +1409,7 @@ def map_NET_to_catalog(header):
 
     return catalog
 
-def parse_and_modify_data(line, ast_catalog=None, asteroids=None, rms_available=False, seeing=None, display=True):
+def parse_and_modify_data(line, ast_catalog=None, asteroids=None, rms_available=False, seeing=None, display=True, validation='strict'):
     """
     Parse a line of MPC1992 format data and return a dictionary of values.
     The parsed data is modified and augmented in the following ways:
@@ -606,67 +1424,239 @@ def parse_and_modify_data(line, ast_catalog=None, asteroids=None, rms_available=
         An 80 column line of data in MPC1992 format to be parsed.
     ast_catalog: str, optional
         Optional astrometric catalog name to populate
-    asteroids: str, optional (required if `rms_available=True`)
-        dictionary of asteroid RMS data (from `read_astrometrica_logfile()`)
+    asteroids: list or dict, optional (required if `rms_available=True`)
+        list of asteroid RMS data (from `read_astrometrica_logfile()`) or an
+        index of it (from `index_asteroids()`), which is much faster to search
     rms_available: bool, optional
         Whether RMS values are available
     seeing: float, optional (required if `rms_available=True`)
         Average value of the seeing to substitute if no per-measurement FWHM is available
     display: bool, optional
         Whether to print the decoded asteroid desigination, date and position
+    validation: str, optional
+        How thoroughly the line is checked; 'strict', 'normal' or 'trusted'
+        (see `DatalineParser`)
 
     Returns
     -------
     data: dict
-        A dictinary of data for the asteroid.
+        A dictinary of data for the asteroid (empty if `line` is empty).
+    """
+
+    obs = parse_and_modify_observation(line, ast_catalog, asteroids, rms_available, seeing, display, validation)
+    if obs is None:
+        return {}
+    return obs.to_dict()
+
+def parse_and_modify_observation(line, ast_catalog=None, asteroids=None, rms_available=False, seeing=None, display=True, validation='strict'):
+    """
+    As `parse_and_modify_data()` but returns an `Observation` (or None for an
+    empty line) rather than a dictionary.
+    """
+
+    obs = _get_dataline_parser(validation).parse_observation(line)
+    if obs is None:
+        if display: print('', '', '', '')
+        return obs
+    if display: print(obs.totalid, obs.date, obs.raSexagesimal, obs.decSexagesimal)
+    return modify_observation(obs, ast_catalog, asteroids, rms_available, seeing)
+
+def modify_observation(obs, ast_catalog=None, asteroids=None, rms_available=False, seeing=None):
+    """
+    Apply the modifications described in `parse_and_modify_data()` to the
+    passed `Observation` <obs> (in place), returning it.
     """
 
-    data = parse_dataline(line)
-    if display: print(data.get('totalid', ''), data.get('date', ''), data.get('raSexagesimal', ''), data.get('decSexagesimal', ''))
     # For Astrometrica, photCat = astCat
-    if data['astCat'] == ' ' and ast_catalog is not None:
-        data['astCat'] = ast_catalog
-    data['photCat'] = data['astCat']
-    data['remarks'] = ''
-    if data['permID'] is None:
-        data['permID'] = ''
-    if data['provID'] is None:
-        data['provID'] = ''
-    if data['trkSub'] is None:
-        data['trkSub'] = ''
-    if data != {}:
-        if rms_available and asteroids is not None:
-            # Find asteroid uncertainties in the data read from the Astrometrica.log by
-            # matching on the totalid and obsTime
-            asteroid = [ast for ast in asteroids if ast['totalid'] == data['totalid'] and ast['obsTime'] == data['obsTime']]
-            if len(asteroid) > 0:
-                asteroid = asteroid[0]
-                for field in ['rmsRA', 'rmsDec', 'rmsMag', 'photAp']:
-                    data[field] = asteroid.get(field, None)
-                try:
-                    logSNR = log10(float(asteroid['snr']))
-                    data['logSNR'] = "%5.3f" % logSNR
-                except ValueError:
-                    data['logSNR'] = '    '
-                try:
-                    photAp = float(asteroid.get('photAp', ''))
-                    data['photAp'] = "%6.2f" % photAp
-                except ValueError:
-                    data['photAp'] = '    '
-                if asteroid['fwhm'] != '0.0':
-                    data['seeing'] = "%5.3f" % (float(asteroid['fwhm']))
-                else:
-                    # Substitute average seeing
-                    data['seeing'] = "%5.3f" % (float(seeing))
-        # Re-round magnitude
+    if obs.astCat == ' ' and ast_catalog is not None:
+        obs.astCat = ast_catalog
+    obs.photCat = obs.astCat
+    obs.remarks = ''
+    if obs.permID is None:
+        obs.permID = ''
+    if obs.provID is None:
+        obs.provID = ''
+    if obs.trkSub is None:
+        obs.trkSub = ''
+    if rms_available and asteroids is not None:
+        # Find asteroid uncertainties in the data read from the Astrometrica.log by
+        # matching on the totalid and obsTime
+        if isinstance(asteroids, dict):
+            asteroid = asteroids.get((obs.totalid, obs.obsTime))
+        else:
+            asteroid = next((ast for ast in asteroids if ast['totalid'] == obs.totalid and ast['obsTime'] == obs.obsTime), None)
+        if asteroid is not None:
+            for field in ['rmsRA', 'rmsDec', 'rmsMag', 'photAp']:
+                obs[field] = asteroid.get(field, None)
+            try:
+                logSNR = log10(float(asteroid['snr']))
+                obs.logSNR = "%5.3f" % logSNR
+            except ValueError:
+                obs.logSNR = '    '
+            try:
+                photAp = float(asteroid.get('photAp', ''))
+                obs.photAp = "%6.2f" % photAp
+            except ValueError:
+                obs.photAp = '    '
+            if asteroid['fwhm'] != '0.0':
+                obs.seeing = "%5.3f" % (float(asteroid['fwhm']))
+            else:
+                # Substitute average seeing
+                obs.seeing = "%5.3f" % (float(seeing))
+    # Re-round magnitude
+    try:
+        mag = float(obs.mag)
+        obs.mag = "%.1f " % mag
+    except ValueError:
+        pass
+    return obs
+
+def iter_body_observations(body, ast_catalog=None, asteroids=None, rms_available=False, seeing=None, display=True, validation='strict'):
+    """
+    Parse and modify each of the observation lines in <body> in turn, yielding
+    the Observation records one at a time. Blank lines are skipped. The lines
+    are checked according to the <validation> level (see `DatalineParser`).
+    """
+
+    for line in body:
+        obs = parse_and_modify_observation(line, ast_catalog, asteroids, rms_available, seeing, display, validation)
+        if obs is not None:
+            yield obs
+
+# Number of observation lines sent to a worker process at a time
+_chunk_size = 2000
+
+# Per-process state for the decoding workers, set by _init_decode_worker()
+_worker_state = {}
+
+def _init_decode_worker(ast_catalog, asteroids, rms_available, seeing, validation='strict'):
+    """Initializer for the worker processes of `iter_body_observations_parallel()`"""
+
+    _worker_state['ast_catalog'] = ast_catalog
+    _worker_state['asteroids'] = asteroids
+    _worker_state['rms_available'] = rms_available
+    _worker_state['seeing'] = seeing
+    _worker_state['validation'] = validation
+
+def _decode_chunk(lines):
+    """
+    Parse and modify a chunk of observation lines in a worker process. Returns
+    a list of the `Observation` records (None for blank lines) up to the first
+    bad line and a list of (index, message) tuples for all bad lines in the
+    chunk.
+    """
+
+    observations = []
+    errors = []
+    for index, line in enumerate(lines):
         try:
-            mag = float(data['mag'])
-            data['mag'] = "%.1f " % mag
-        except ValueError:
-            pass
-    return data
+            obs = parse_and_modify_observation(line, _worker_state['ast_catalog'], _worker_state['asteroids'],
+                _worker_state['rms_available'], _worker_state['seeing'], display=False,
+                validation=_worker_state['validation'])
+        except RuntimeError as e:
+            errors.append((index, str(e)))
+            continue
+        if len(errors) == 0:
+            observations.append(obs)
+    return observations, errors
+
+def _iter_chunks(body, chunk_size):
+    """Yield successive lists of up to <chunk_size> lines from <body>"""
+
+    chunk = []
+    for line in body:
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+def iter_body_observations_parallel(body, ast_catalog=None, asteroids=None, rms_available=False, seeing=None, display=True, workers=2, chunk_size=_chunk_size, validation='strict'):
+    """
+    As `iter_body_observations()` but the lines are split into chunks of
+    <chunk_size> which are decoded by a pool of <workers> processes. The
+    Observations are yielded in the original order and at most 2*<workers>
+    chunks are in flight at once, so memory use stays bounded.
+
+    If any lines fail to parse, the Observations before the first bad line are
+    yielded, the remaining chunks are checked and all the bad lines are
+    reported, and a RuntimeError for the first bad line is raised.
+    """
 
-def convert_mpcreport_to_psv(mpcreport, outFile, rms_available=False, astrometrica_log=None, display=True, **options):
+    errors = []
+    pending = deque()
+    chunks = _iter_chunks(body, chunk_size)
+    line_num = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_decode_worker,
+            initargs=(ast_catalog, asteroids, rms_available, seeing, validation)) as executor:
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending.append((line_num, executor.submit(_decode_chunk, chunk)))
+                line_num += len(chunk)
+            if len(pending) == 0:
+                break
+            first_line, future = pending.popleft()
+            observations, chunk_errors = future.result()
+            if len(errors) > 0:
+                # Already failed; only collect the remaining errors
+                observations = []
+            for obs in observations:
+                if obs is None:
+                    if display: print('', '', '', '')
+                    continue
+                if display: print(obs.totalid, obs.date, obs.raSexagesimal, obs.decSexagesimal)
+                yield obs
+            for index, message in chunk_errors:
+                errors.append((first_line + index + 1, message))
+
+    if len(errors) > 0:
+        for line_num, message in errors:
+            print("Observation line %d: %s" % (line_num, message.rstrip()))
+        raise RuntimeError(errors[0][1])
+
+def iter_observations(mpcreport, ast_catalog=None, asteroids=None, rms_available=False, seeing=None, display=False, workers=1, validation='strict'):
+    """
+    Generator over the observations in an Astrometrica-produced MPCReport.txt
+    file, reading and parsing one line at a time so memory use does not grow
+    with the size of the report.
+
+    Parameters
+    ----------
+    mpcreport : str
+        Path/filename of the MPCReport.txt file
+    ast_catalog : str, optional
+        Astrometric catalog code; determined from the NET header line if not given
+    workers : int, optional
+        Number of worker processes to decode the observations with (1=serial)
+    validation : str, optional
+        How thoroughly the observation lines are checked; 'strict', 'normal'
+        or 'trusted' (see `DatalineParser`)
+
+    Yields
+    ------
+    obs : `Observation`
+        The parsed and modified observation record
+    """
+
+    with open(mpcreport, 'r') as mpc_fh:
+        header, body = read_mpcreport_stream(mpc_fh)
+        if body is None:
+            return
+        if ast_catalog is None:
+            ast_catalog = map_NET_to_catalog(header)
+        if workers > 1:
+            observations = iter_body_observations_parallel(body, ast_catalog, asteroids, rms_available, seeing, display, workers,
+                validation=validation)
+        else:
+            observations = iter_body_observations(body, ast_catalog, asteroids, rms_available, seeing, display, validation)
+        for obs in observations:
+            yield obs
+
+def convert_mpcreport_to_psv(mpcreport, outFile, rms_available=False, astrometrica_log=None, display=True, incremental=False, cache=None, log_index=False, low_memory=False, **options):
     """
     Convert an Astrometrica-produced MPCReport.txt file in MPC1992 80 column
     format to ADES PSV format.
@@ -679,6 +1669,37 @@ def convert_mpcreport_to_psv(mpcreport, outFile, rms_available=False, astrometri
         Path/filename of the output ADES PSV file
     rms_available : bool, optional
         Whether RMS values for RA, Dec etc are available
+    incremental : bool, optional
+        Only convert the observations appended since the last incremental
+        run and append them to <outFile> (see `convert_mpcreport_incremental()`)
+    cache : `cache.OutputCache`, optional
+        Cache of converted PSV files; if the inputs are unchanged since they
+        were last converted, the cached PSV file is restored instead
+    log_index : bool, optional
+        Only read the sessions of <astrometrica_log> with images from the
+        same dates as the observations, using a session index kept alongside
+        the log (see `index_astrometrica_log()`)
+    low_memory : bool, optional
+        Make a first pass over <mpcreport> for the keys of its observations
+        and only keep the measurements matching them when reading
+        <astrometrica_log> (see `read_astrometrica_log_for_keys()`), so the
+        memory used doesn't grow with the size of the log
+    log_cache : `cache.LogCache`, optional
+        Cache of parsed Astrometrica.log files, so a log shared by several
+        reports is only parsed once while it is unchanged, passed through
+        <options>
+    overlap : bool, optional
+        Read <astrometrica_log> in the background while the report is read
+        and decoded (see `write_psv()`), passed through <options>
+    workers : int, optional
+        Number of worker processes to decode the observations with (default 1
+        i.e. serial), passed through <options>
+    validation : str, optional
+        How thoroughly the observation lines are checked: 'strict' (the
+        default) checks every value converts back to the original line,
+        'normal' only range checks the RA and Dec and 'trusted' skips the
+        checks for known well-formed input (see `DatalineParser`), passed
+        through <options>
 
     Returns
     -------
@@ -690,14 +1711,422 @@ def convert_mpcreport_to_psv(mpcreport, outFile, rms_available=False, astrometri
     * https://minorplanetcenter.net/iau/info/ADES.html
     """
 
-    header, body = read_mpcreport_file(mpcreport)
-    if len(header) == 0 or len(body) == 0:
+    if log_index and rms_available and astrometrica_log is not None:
+        try:
+            options['log_dates'] = read_mpcreport_dates(mpcreport)
+        except IOError:
+            pass
+    if low_memory and rms_available and astrometrica_log is not None:
+        try:
+            options['log_keys'] = read_mpcreport_keys(mpcreport)
+        except IOError:
+            pass
+
+    if incremental:
+        return convert_mpcreport_incremental(mpcreport, outFile, rms_available, astrometrica_log, display, **options)
+
+    cache_key = None
+    if cache is not None:
+        cache_log = astrometrica_log if rms_available else None
+        cache_key = cache.key(mpcreport, cache_log, rms_available=rms_available and cache_log is not None,
+            look=bool(options.get('look', False)), log_index='log_dates' in options, low_memory='log_keys' in options,
+            validation=options.get('validation', 'strict'))
+        if cache_key is not None:
+            num_objects = cache.restore(cache_key, outFile)
+            if num_objects is not None:
+                print("Restored %s from cache" % outFile)
+                return num_objects
+
+    try:
+        mpc_fh = open(mpcreport, 'r')
+    except IOError:
+        print("File ", mpcreport, " does not exist")
         print("No valid data in file")
         return -1
-    print("Read %d header lines,%d observation lines from %s" % (len(header), len(body), mpcreport))
 
-    if rms_available and astrometrica_log is not None:
-        version, images, asteroids = read_astrometrica_logfile(astrometrica_log)
+    with mpc_fh:
+        header, body = read_mpcreport_stream(mpc_fh)
+        if len(header) == 0 or body is None:
+            print("No valid data in file")
+            return -1
+        print("Read %d header lines from %s" % (len(header), mpcreport))
+
+        with open(outFile, 'w') as out_fh:
+            num_objects = write_psv(header, body, out_fh, rms_available, astrometrica_log, display, **options)
+
+    if cache_key is not None and num_objects > 0:
+        cache.store(cache_key, outFile, num_objects)
+
+    return num_objects
+
+# Number of bytes at the end of the log which are hashed to detect it being rewritten
+_checkpoint_tail_bytes = 4096
+# Size of the blocks read when hashing
+_hash_block_bytes = 1024**2
+
+def _hash_range(fh, start, end):
+    """Return the sha256 hex digest of bytes <start> to <end> of the open binary file <fh>"""
+
+    digest = hashlib.sha256()
+    fh.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        block = fh.read(min(remaining, _hash_block_bytes))
+        if len(block) == 0:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return digest.hexdigest()
+
+def _iter_complete_lines(mpc_fh, position, encoding, progress):
+    """
+    Yield the observation lines from the open binary file <mpc_fh> (at byte
+    <position>), stopping at a final line which is still being written (no
+    newline and less than 80 columns). <progress> is updated with the byte
+    'offset' and number of 'lines' consumed.
+    """
+
+    for raw_line in mpc_fh:
+        if not raw_line.endswith(b'\n') and len(raw_line.rstrip()) < 80:
+            break
+        position += len(raw_line)
+        progress['offset'] = position
+        progress['lines'] += 1
+        line = raw_line.decode(encoding)
+        if line[0:3] not in _header_codes and '----- end -----' not in line:
+            yield line.rstrip()
+
+def _iter_tracking_seeing(observations, seeing_str, progress):
+    """Pass through <observations>, noting in <progress> if any have the average <seeing_str> substituted"""
+
+    for obs in observations:
+        if seeing_str is not None and obs.seeing == seeing_str:
+            progress['seeing'] = seeing_str
+        yield obs
+
+def _checkpoint_valid(checkpoint, state, mpc_fh, outFile, seeing_str, body_start):
+    """
+    Check whether the <checkpoint> from the last incremental run still
+    applies i.e. the conversion settings and the header lines used in the
+    output are the same, the report content up to the checkpoint is unchanged
+    and the PSV file is as it was left. As the other header lines (e.g. the
+    ACK timestamp) may change length, the checkpoint's byte offsets are moved
+    to the report's current <body_start>.
+    """
+
+    if checkpoint is None:
+        return False
+    if 'body_start' not in checkpoint or 'body_hash' not in checkpoint:
+        print("Checkpoint format changed, rebuilding %s" % outFile)
+        return False
+    shift = body_start - checkpoint['body_start']
+    for key in ('body_start', 'offset'):
+        checkpoint[key] += shift
+    for key, value in state.items():
+        if checkpoint.get(key) != value:
+            print("Checkpoint %s changed, rebuilding %s" % (key, outFile))
+            return False
+    try:
+        psv_size = os.path.getsize(outFile)
+    except OSError:
+        psv_size = None
+    if psv_size != checkpoint.get('psv_size'):
+        print("PSV file changed, rebuilding %s" % outFile)
+        return False
+    mpc_fh.seek(0, os.SEEK_END)
+    if mpc_fh.tell() < checkpoint['offset'] or \
+            _hash_range(mpc_fh, body_start, checkpoint['offset']) != checkpoint['body_hash']:
+        print("MPCReport file changed, rebuilding %s" % outFile)
+        return False
+    if checkpoint.get('seeing') is not None and checkpoint['seeing'] != seeing_str:
+        print("Average seeing changed, rebuilding %s" % outFile)
+        return False
+    return True
+
+def convert_mpcreport_incremental(mpcreport, outFile, rms_available=False, astrometrica_log=None, display=True, workers=1, log_dates=None, log_cache=None, log_keys=None, validation='strict', **options):
+    """
+    Incrementally convert an MPCReport.txt file which is being appended to.
+    A checkpoint (in <outFile>.ckpt) records the byte offset and number of
+    lines converted so far along with hashes of the header lines used in the
+    PSV file and of the whole body up to the offset. On the next run only the
+    lines after the offset are parsed and their records appended to <outFile>
+    (the earlier body is only re-hashed, which is much cheaper than parsing).
+    If the header, the content before the offset, the PSV file or the
+    conversion settings have changed, the PSV file is rebuilt from scratch.
+
+    Parameters and return value are as for `convert_mpcreport_to_psv()`; the
+    returned number of objects is the total in <outFile>.
+    """
+
+    checkpoint_file = outFile + '.ckpt'
+    encoding = locale.getpreferredencoding(False)
+
+    try:
+        mpc_fh = open(mpcreport, 'rb')
+    except IOError:
+        print("File ", mpcreport, " does not exist")
+        print("No valid data in file")
+        return -1
+
+    with mpc_fh:
+        header = []
+        header_hash = hashlib.sha256()
+        body_start = 0
+        for raw_line in mpc_fh:
+            line = raw_line.decode(encoding)
+            if line[0:3] in _header_codes:
+                header.append(line.rstrip())
+                if line[0:3] in _psv_header_codes:
+                    header_hash.update(raw_line)
+            elif '----- end -----' not in line:
+                break
+            body_start += len(raw_line)
+        if len(header) == 0:
+            print("No valid data in file")
+            return -1
+
+        rms_available, version, asteroids, seeing = _read_log_for_psv(rms_available, astrometrica_log, log_dates, log_cache, workers, log_keys)
+        seeing_str = None
+        if rms_available:
+            seeing_str = "%5.3f" % seeing
+
+        state = {'converter' : _converter_version,
+                 'header_hash' : header_hash.hexdigest(),
+                 'rms_available' : rms_available,
+                 'version' : version,
+                 'look' : bool(options.get('look', False)),
+                 'log_index' : log_dates is not None,
+                 'low_memory' : log_keys is not None,
+                 'validation' : validation
+                }
+        try:
+            with open(checkpoint_file, 'r') as ckpt_fh:
+                checkpoint = json.load(ckpt_fh)
+        except (IOError, ValueError):
+            checkpoint = None
+
+        resume = _checkpoint_valid(checkpoint, state, mpc_fh, outFile, seeing_str, body_start)
+        if resume:
+            progress = {'offset' : checkpoint['offset'], 'lines' : checkpoint['lines'], 'seeing' : checkpoint['seeing']}
+            num_objects = checkpoint['num_objects']
+            site_code = checkpoint['site_code']
+        else:
+            progress = {'offset' : body_start, 'lines' : 0, 'seeing' : None}
+            num_objects = 0
+
+        mpc_fh.seek(progress['offset'])
+        body = _iter_complete_lines(mpc_fh, progress['offset'], encoding, progress)
+        first_line = next(body, None)
+        if first_line is None:
+            if resume:
+                print("No new observations in %s" % mpcreport)
+                return num_objects
+            print("No valid data in file")
+            return -1
+        body = chain([first_line], body)
+        if resume:
+            print("Read %d header lines from %s, resuming after %d lines" % (len(header), mpcreport, checkpoint['lines']))
+        else:
+            print("Read %d header lines from %s" % (len(header), mpcreport))
+
+        with open(outFile, 'a' if resume else 'w') as out_fh:
+            if not resume:
+                psv_header, site_code = make_psv_header(header, rms_available, version, add_collaborators=options.get('look', False))
+                print(psv_header, file=out_fh)
+
+            ast_catalog = map_NET_to_catalog(header)
+            if workers is not None and workers > 1:
+                observations = iter_body_observations_parallel(body, ast_catalog, asteroids, rms_available, seeing, display, workers,
+                    validation=validation)
+            else:
+                observations = iter_body_observations(body, ast_catalog, asteroids, rms_available, seeing, display, validation)
+            observations = _iter_tracking_seeing(observations, seeing_str, progress)
+            num_objects += write_psv_records(observations, out_fh, site_code, rms_available)
+
+        checkpoint = dict(state)
+        checkpoint.update({'body_start' : body_start,
+                           'offset' : progress['offset'],
+                           'lines' : progress['lines'],
+                           'body_hash' : _hash_range(mpc_fh, body_start, progress['offset']),
+                           'num_objects' : num_objects,
+                           'site_code' : site_code,
+                           'seeing' : progress['seeing'],
+                           'psv_size' : os.path.getsize(outFile)
+                          })
+    with open(checkpoint_file, 'w') as ckpt_fh:
+        json.dump(checkpoint, ckpt_fh)
+
+    return num_objects
+
+def convert_stream(in_fh, out_fh, rms_available=False, astrometrica_log=None, display=False, **options):
+    """
+    Convert an MPC1992 80 column format report read from the open file <in_fh>
+    to ADES PSV format written to the open file <out_fh>. The observations are
+    read, parsed and written one line at a time so arbitrarily large (e.g.
+    concatenated) reports can be piped through in constant memory.
+
+    Parameters
+    ----------
+    in_fh : file
+        Open input file (or iterable of lines) e.g. `sys.stdin`
+    out_fh : file
+        Open output file e.g. `sys.stdout`
+    rms_available : bool, optional
+        Whether RMS values for RA, Dec etc are available
+    workers : int, optional
+        Number of worker processes to decode the observations with (default 1
+        i.e. serial), passed through <options>
+
+    Returns
+    -------
+    num_objects : int
+        The number of objects written out (or -1 if nothing could be read from the input)
+    """
+
+    header, body = read_mpcreport_stream(in_fh)
+    if len(header) == 0 or body is None:
+        print("No valid data in file")
+        return -1
+
+    return write_psv(header, body, out_fh, rms_available, astrometrica_log, display, **options)
+
+# obsData table formats for PSV files without and with RMS values
+_psv_tbl_fmt = '%7s|%-11s|%8s|%4s|%-4s|%4s|%-23s|%12s|%12s|%8s|%5s|%6s|%8s|%-5s|%-s'
+_psv_rms_tbl_fmt = '%7s|%-11s|%8s|%4s|%-4s|%4s|%-23s|%12s|%12s|%5s|%6s|%8s|%5s|%6s|%4s|%8s|%6s|%6s|%6s|%-5s|%-s'
+
+def write_psv(header, body, out_fh, rms_available=False, astrometrica_log=None, display=True, workers=1, log_dates=None, log_cache=None, overlap=False, log_keys=None, validation='strict', **options):
+    """
+    Write the ADES PSV header derived from the MPC1992 <header> lines followed
+    by the obsData records for each observation line in <body> (which may be a
+    generator) to the open file <out_fh>. If <workers> is more than 1, the
+    Astrometrica log is parsed and the observation lines are decoded in
+    parallel by that many processes (see `read_astrometrica_logfile()` and
+    `iter_body_observations_parallel()`); the output is identical. If
+    <log_dates> is given, only the sessions of <astrometrica_log> with images
+    from those dates are read. If a <log_cache> (`cache.LogCache`) is given,
+    the parsed log is taken from it when the log is unchanged. If <log_keys>
+    is given, only the measurements for those (totalid, obsTime) keys are
+    kept from the log (see `read_astrometrica_log_for_keys()`). The
+    observation lines are checked according to the <validation> level (see
+    `DatalineParser`).
+
+    If <overlap> is True, the log is read in the background (see
+    `_start_log_read()`) while the observation lines are decoded, and the two
+    are only joined when the uncertainties from the log are added to the
+    observations; the header (which needs the Astrometrica version) is written
+    once the log has been read. The output is identical.
+
+    Returns
+    -------
+    num_objects : int
+        The number of objects written out
+    """
+
+    ast_catalog = map_NET_to_catalog(header)
+    decoded = []
+    error = None
+    if overlap and rms_available and astrometrica_log is not None:
+        body = iter(body)
+        executor, log_future = _start_log_read(rms_available, astrometrica_log, log_dates, log_cache, workers, log_keys)
+        with executor:
+            decoded, error = _decode_until_done(body, log_future, display, validation)
+            rms_available, version, asteroids, seeing = log_future.result()
+    else:
+        rms_available, version, asteroids, seeing = _read_log_for_psv(rms_available, astrometrica_log, log_dates, log_cache, workers, log_keys)
+
+    psv_header, site_code = make_psv_header(header, rms_available, version, add_collaborators=options.get('look', False))
+    print(psv_header, file=out_fh)
+
+    # Parse and write out obsData records
+    if workers is not None and workers > 1:
+        observations = iter_body_observations_parallel(body, ast_catalog, asteroids, rms_available, seeing, display, workers,
+            validation=validation)
+    else:
+        observations = iter_body_observations(body, ast_catalog, asteroids, rms_available, seeing, display, validation)
+    if len(decoded) > 0 or error is not None:
+        observations = _iter_overlapped_observations(decoded, error, observations, ast_catalog, asteroids, rms_available, seeing)
+
+    return write_psv_records(observations, out_fh, site_code, rms_available)
+
+def _start_log_read(rms_available, astrometrica_log, log_dates=None, log_cache=None, workers=1, log_keys=None):
+    """
+    Start `_read_log_for_psv()` in the background, returning the executor and
+    the future for its results.
+
+    The log is parsed in a separate process so it runs alongside the decoding
+    of the observations, unless it is parsed by a pool of worker processes
+    already or read through a <log_cache> (whose in-memory entries need to be
+    kept in this process), in which case a thread is used.
+    """
+
+    if (workers is not None and workers > 1) or log_cache is not None:
+        executor = ThreadPoolExecutor(max_workers=1)
+    else:
+        executor = ProcessPoolExecutor(max_workers=1)
+    return executor, executor.submit(_read_log_for_psv, rms_available, astrometrica_log, log_dates, log_cache, workers, log_keys)
+
+def _decode_until_done(body, future, display=True, validation='strict'):
+    """
+    Decode the observation lines from the iterator <body> until <future> is
+    done, returning the decoded `Observation`s and the error (if any) that
+    stopped the decoding early.
+    """
+
+    parser = _get_dataline_parser(validation)
+    decoded = []
+    try:
+        for line in body:
+            obs = parser.parse_observation(line)
+            if obs is not None:
+                if display: print(obs.totalid, obs.date, obs.raSexagesimal, obs.decSexagesimal)
+                decoded.append(obs)
+            elif display:
+                print('', '', '', '')
+            if future.done():
+                break
+    except RuntimeError as e:
+        return decoded, e
+    return decoded, None
+
+def _iter_overlapped_observations(decoded, error, observations, ast_catalog, asteroids, rms_available, seeing):
+    """
+    Yield the <decoded> observations (modified as in `modify_observation()`)
+    and then, unless decoding them stopped with <error>, the rest of the
+    <observations>.
+    """
+
+    for obs in decoded:
+        yield modify_observation(obs, ast_catalog, asteroids, rms_available, seeing)
+    if error is not None:
+        raise error
+    for obs in observations:
+        yield obs
+
+def _read_log_for_psv(rms_available, astrometrica_log, log_dates=None, log_cache=None, workers=1, log_keys=None):
+    """
+    Read the Astrometrica log (if <rms_available>), returning the updated
+    <rms_available> flag, the Astrometrica version, an index of the asteroid
+    measurements (from `index_asteroids()`) and the average seeing to
+    substitute for missing FWHMs. If <log_dates> is given, only the sessions
+    of the log with images from those dates are read. If <log_cache> is
+    given, the log is read through it. The log is parsed by <workers>
+    processes. If <log_keys> is given, the log is streamed with
+    `read_astrometrica_log_for_keys()` instead (serially and not cached).
+    """
+
+    version = ''
+    if rms_available and astrometrica_log is not None and log_keys is not None:
+        version, asteroids, seeing = read_astrometrica_log_for_keys(astrometrica_log, log_keys, dates=log_dates)
+        if len(asteroids) == 0:
+            print("Read no asteroid data from %s" % astrometrica_log)
+            rms_available = False
+        asteroids = index_asteroids(asteroids)
+
+    elif rms_available and astrometrica_log is not None:
+        if log_cache is not None:
+            version, images, asteroids = log_cache.read(astrometrica_log, dates=log_dates, workers=workers)
+        else:
+            version, images, asteroids = read_astrometrica_logfile(astrometrica_log, dates=log_dates, workers=workers)
         seeing = -99
         if len(asteroids) == 0:
             print("Read no asteroid data from %s" % astrometrica_log)
@@ -706,15 +2135,29 @@ def convert_mpcreport_to_psv(mpcreport, outFile, rms_available=False, astrometri
             fwhm_vals = [float(ast['fwhm']) for ast in asteroids if ast['fwhm'] != '0.0']
             if len(fwhm_vals) > 0:
                 seeing = sum(fwhm_vals)/float(len(fwhm_vals))
+        asteroids = index_asteroids(asteroids)
 
     else:
         asteroids = None
         seeing = None
 
-    out_fh = open(outFile, 'w')
+    return rms_available, version, asteroids, seeing
+
+def make_psv_header(header, rms_available=False, version='', add_collaborators=False):
+    """
+    Make the ADES PSV header (obsContext and the obsData table header line)
+    from the MPC1992 <header> lines.
+
+    Returns
+    -------
+    psv_header : str
+        The PSV header lines
+    site_code : str
+        The MPC site code from the header ('   ' if not found)
+    """
 
     # Parse header, extract site code
-    psv_header = parse_header(header, add_collaborators=options.get('look', False))
+    psv_header = parse_header(header, add_collaborators=add_collaborators)
 
     site_code_regex = re.compile(r'mpcCode (\w{3})')
     m = site_code_regex.search(psv_header)
@@ -733,46 +2176,47 @@ def convert_mpcreport_to_psv(mpcreport, outFile, rms_available=False, astrometri
     psv_header += ("# comment" + "\n"
                    "! line Converted to PSV with " + _converter_version + "\n"
                   )
-    print(psv_header.rstrip(), file=out_fh)
-
-    # Define and write obsData header
-    tbl_fmt = '%7s|%-11s|%8s|%4s|%-4s|%4s|%-23s|%12s|%12s|%8s|%5s|%6s|%8s|%-5s|%-s'
-    tbl_hdr = tbl_fmt % ('permID', 'provID', 'trkSub', 'mode', 'stn', 'prog', 'obsTime', \
-        'ra', 'dec', 'astCat', 'mag', 'band', 'photCat', 'notes', 'remarks')
-    rms_tbl_fmt = '%7s|%-11s|%8s|%4s|%-4s|%4s|%-23s|%12s|%12s|%5s|%6s|%8s|%5s|%6s|%4s|%8s|%6s|%6s|%6s|%-5s|%-s'
-    rms_tbl_hdr = rms_tbl_fmt % ('permID', 'provID', 'trkSub', 'mode', 'stn', 'prog', 'obsTime', \
-        'ra', 'dec', 'rmsRA', 'rmsDec', 'astCat', 'mag', 'rmsMag', 'band', 'photCat', \
-        'photAp', 'logSNR', 'seeing', 'notes', 'remarks')
 
+    # Define obsData header
     if rms_available:
-        print(rms_tbl_hdr, file=out_fh)
+        tbl_hdr = _psv_rms_tbl_fmt % ('permID', 'provID', 'trkSub', 'mode', 'stn', 'prog', 'obsTime', \
+            'ra', 'dec', 'rmsRA', 'rmsDec', 'astCat', 'mag', 'rmsMag', 'band', 'photCat', \
+            'photAp', 'logSNR', 'seeing', 'notes', 'remarks')
     else:
-        print(tbl_hdr, file=out_fh)
+        tbl_hdr = _psv_tbl_fmt % ('permID', 'provID', 'trkSub', 'mode', 'stn', 'prog', 'obsTime', \
+            'ra', 'dec', 'astCat', 'mag', 'band', 'photCat', 'notes', 'remarks')
+
+    return psv_header.rstrip() + "\n" + tbl_hdr, site_code
+
+def write_psv_records(observations, out_fh, site_code, rms_available=False):
+    """
+    Write out the obsData records for the passed <observations> to the open
+    file <out_fh>, skipping those not from <site_code>.
+
+    Returns
+    -------
+    num_objects : int
+        The number of objects written out
+    """
 
-    ast_catalog = map_NET_to_catalog(header)
-    # Parse and write out obsData records
     num_objects = 0
     num_bad_objects = 0
-    for line in body:
-        data = parse_and_modify_data(line, ast_catalog, asteroids, rms_available, seeing, display)
-
-        if data != {}:
-            if data['stn'] == site_code:
-                if rms_available:
-                    tbl_data = rms_tbl_fmt % (data['permID'], data['provID'], data['trkSub'], data['mode'], data['stn'], \
-                        data['prog'], data['obsTime'], data['ra'], data['dec'], data['rmsRA'], data['rmsDec'],\
-                        data['astCat'], data['mag'], data['rmsMag'], data['band'], \
-                        data['photCat'], data['photAp'], data['logSNR'], data['seeing'], \
-                        data['notes'], data['remarks'])
-                else:
-                    tbl_data = tbl_fmt % (data['permID'], data['provID'], data['trkSub'], data['mode'], data['stn'], \
-                        data['prog'], data['obsTime'], data['ra'], data['dec'], data['astCat'],\
-                        data['mag'], data['band'], data['photCat'], data['notes'], data['remarks'])
-                print(tbl_data, file=out_fh)
-                num_objects += 1
+    for data in observations:
+        if data['stn'] == site_code:
+            if rms_available:
+                tbl_data = _psv_rms_tbl_fmt % (data['permID'], data['provID'], data['trkSub'], data['mode'], data['stn'], \
+                    data['prog'], data['obsTime'], data['ra'], data['dec'], data['rmsRA'], data['rmsDec'],\
+                    data['astCat'], data['mag'], data['rmsMag'], data['band'], \
+                    data['photCat'], data['photAp'], data['logSNR'], data['seeing'], \
+                    data['notes'], data['remarks'])
             else:
-                print("Measurement from different site code (%3s) found, skipping" % data['stn'])
-                num_bad_objects += 1
-    out_fh.close()
+                tbl_data = _psv_tbl_fmt % (data['permID'], data['provID'], data['trkSub'], data['mode'], data['stn'], \
+                    data['prog'], data['obsTime'], data['ra'], data['dec'], data['astCat'],\
+                    data['mag'], data['band'], data['photCat'], data['notes'], data['remarks'])
+            print(tbl_data, file=out_fh)
+            num_objects += 1
+        else:
+            print("Measurement from different site code (%3s) found, skipping" % data['stn'])
+            num_bad_objects += 1
 
     return num_objects
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+"""
+Watch directories for MPCReport files (and their Astrometrica.log) being
+written by Astrometrica and convert them to ADES PSV format as they change.
+
+Changes are detected by polling: each tick only the known directories and the
+known MPCReport/Astrometrica.log files are `stat`'ed. A directory is only
+re-listed when its own mtime changes (i.e. when entries are added, removed or
+renamed in it), so the cost of a tick does not grow with the number of
+unrelated files in the tree. A report is only converted once its size and
+mtime (and those of its log) have been unchanged for the settle period, so
+partially written files are not picked up.
+"""
+from __future__ import print_function
+
+import os
+import time
+import fnmatch
+
+from astrometrica2ades import utils
+
+
+def _signature(path):
+    """Return a (size, mtime) signature of <path>, or None if it doesn't exist"""
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+class ReportWatcher(object):
+    """
+    Poll a set of directory trees for new or modified MPCReport files and
+    convert them with `utils.convert_mpcreport_to_psv()`.
+
+    Parameters
+    ----------
+    paths : list of str
+        Directories to watch (recursively)
+    settle : float, optional
+        Time (in seconds) that a report and its log must be unchanged before
+        they are converted
+    interval : float, optional
+        Time (in seconds) between polls in `run()`
+    pattern : str, optional
+        Filename pattern of the MPCReport files to convert
+    **options
+        Passed through to `utils.convert_mpcreport_to_psv()`
+    """
+
+    def __init__(self, paths, settle=0.5, interval=0.25, pattern='MPCReport*.txt', **options):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.settle = settle
+        self.interval = interval
+        self.pattern = pattern
+        self.options = options
+        # Directory -> mtime when it was last listed
+        self._dirs = {}
+        # MPCReport -> signature of the report and log when last converted (or None)
+        self._converted = {}
+        # MPCReport -> (signature, time of the change that produced it)
+        self._pending = {}
+        self.conversions = 0
+        self.failures = 0
+
+    def _report_signature(self, mpcreport):
+        log = os.path.join(os.path.dirname(mpcreport), 'Astrometrica.log')
+        return (_signature(mpcreport), _signature(log))
+
+    def _list_dir(self, path):
+        """(Re-)list the directory <path>, adding new subdirectories and reports"""
+
+        try:
+            self._dirs[path] = os.stat(path).st_mtime_ns
+            entries = list(os.scandir(path))
+        except OSError:
+            self._forget_dir(path)
+            return
+        for entry in entries:
+            # Symlinked directories aren't followed, so looping links can't
+            # recurse forever and no tree is watched twice under two paths
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if entry.path not in self._dirs:
+                    self._list_dir(entry.path)
+            elif fnmatch.fnmatch(entry.name, self.pattern) and entry.path not in self._converted:
+                self._converted[entry.path] = self._initial_signature(entry.path)
+
+    def _initial_signature(self, mpcreport):
+        """
+        Treat a report found when watching starts (or a newly found one) as
+        already converted if its PSV file is newer than it and its log.
+        """
+
+        signature = self._report_signature(mpcreport)
+        psv = _signature(utils.psv_filename(mpcreport))
+        if psv is not None and all(sig is None or sig[1] <= psv[1] for sig in signature):
+            return signature
+        return None
+
+    def _forget_dir(self, path):
+        prefix = path + os.sep
+        for dirname in [d for d in self._dirs if d == path or d.startswith(prefix)]:
+            del self._dirs[dirname]
+        for mpcreport in [r for r in self._converted if r.startswith(prefix)]:
+            del self._converted[mpcreport]
+            self._pending.pop(mpcreport, None)
+
+    def scan(self):
+        """Do the initial listing of the watched directories"""
+
+        for path in self.paths:
+            self._list_dir(path)
+
+    def poll(self, now=None):
+        """
+        Check the watched directories and reports for changes.
+
+        Returns
+        -------
+        ready : list of str
+            The MPCReport files which have changed and been stable for the
+            settle period, and so should be converted
+        """
+
+        if now is None:
+            now = time.time()
+
+        for path in list(self._dirs):
+            if path not in self._dirs:
+                # Removed while forgetting a parent directory
+                continue
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                self._forget_dir(path)
+                continue
+            if mtime != self._dirs[path]:
+                self._list_dir(path)
+
+        ready = []
+        for mpcreport in list(self._converted):
+            signature = self._report_signature(mpcreport)
+            if signature[0] is None:
+                del self._converted[mpcreport]
+                self._pending.pop(mpcreport, None)
+                continue
+            if signature == self._converted[mpcreport]:
+                self._pending.pop(mpcreport, None)
+                continue
+            pending = self._pending.get(mpcreport)
+            if pending is None or pending[0] != signature:
+                # Time of the last change is the newest mtime (unless that's in the future)
+                changed = min(now, max(sig[1] for sig in signature if sig is not None) / 1e9)
+                pending = (signature, changed)
+                self._pending[mpcreport] = pending
+            if now - pending[1] >= self.settle:
+                ready.append(mpcreport)
+        return ready
+
+    def convert(self, mpcreport):
+        """
+        Convert <mpcreport> (using the Astrometrica.log in the same directory,
+        if any) to a PSV file alongside it, returning the number of objects
+        written (or -1 on failure).
+        """
+
+        signature = self._pending.pop(mpcreport, (self._report_signature(mpcreport), None))[0]
+        # Remember the signature even on failure, so it's only retried once it changes again
+        self._converted[mpcreport] = signature
+        outFile = utils.psv_filename(mpcreport)
+        astrometrica_log = None
+        if signature[1] is not None:
+            astrometrica_log = os.path.join(os.path.dirname(mpcreport), 'Astrometrica.log')
+        try:
+            num_objects = utils.convert_mpcreport_to_psv(mpcreport, outFile, astrometrica_log is not None,
+                astrometrica_log, display=False, **self.options)
+        except Exception as e:
+            print("Error processing %s: %s" % (mpcreport, str(e).strip()))
+            num_objects = -1
+        if num_objects > 0:
+            self.conversions += 1
+            print("Wrote %d objects to %s" % (num_objects, outFile))
+        else:
+            self.failures += 1
+        return num_objects
+
+    def tick(self, now=None):
+        """Poll once and convert any reports which are ready, returning their paths"""
+
+        ready = self.poll(now)
+        for mpcreport in ready:
+            self.convert(mpcreport)
+        return ready
+
+    def run(self, max_ticks=None):
+        """Scan and then poll every <interval> seconds (forever, or for <max_ticks> polls)"""
+
+        self.scan()
+        ticks = 0
+        while max_ticks is None or ticks < max_ticks:
+            start = time.time()
+            self.tick(start)
+            ticks += 1
+            time.sleep(max(0.0, self.interval - (time.time() - start)))
+
+def watch(paths, settle=0.5, interval=0.25, **options):
+    """
+    Watch <paths> (recursively) and convert MPCReport files as they change
+    until interrupted, with <options> passed through to `ReportWatcher`.
+    """
+
+    watcher = ReportWatcher(paths, settle, interval, **options)
+    print("Watching %s for MPCReport files" % ', '.join(watcher.paths))
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("Converted %d reports, %d failures" % (watcher.conversions, watcher.failures))
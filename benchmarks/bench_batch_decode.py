@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""
+Benchmark `batchUtil.parse_datalines_batch` against decoding the same body one
+line at a time with `utils.parse_dataline`.
+
+Usage: python benchmarks/bench_batch_decode.py [-n LINES]
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+from astrometrica2ades import utils
+from astrometrica2ades.batchUtil import parse_datalines_batch
+
+import synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--lines', type=int, default=1000000, help='Number of synthetic lines')
+    options = parser.parse_args()
+
+    lines = synthetic.datalines(options.lines)
+
+    start = time.perf_counter()
+    for line in lines:
+        utils.parse_dataline(line)
+    scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data, valid = parse_datalines_batch(lines)
+    batch = time.perf_counter() - start
+    assert valid.all()
+
+    n = float(len(lines))
+    print("%d lines" % len(lines))
+    print("parse_dataline loop:   %10.0f lines/s" % (n/scalar))
+    print("parse_datalines_batch: %10.0f lines/s  (x%.1f)" % (n/batch, scalar/batch))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Benchmark the day cache of `sexVals.sexDateToISO` on the dates of a report
+(all from the same night) against the previous implementation, which
+matched the whole date with one regex and rebuilt the day on every call.
+
+Usage: python benchmarks/bench_date_cache.py [-n LINES]
+"""
+from __future__ import print_function
+
+import argparse
+import re
+import time
+
+from astrometrica2ades import sexVals
+
+import synthetic
+
+_legacyCheckDate = re.compile(r'^((16|17|18|19|[2-9]\d)\d\d) (0[1-9]|10|11|12) ((0[1-9]|[12]\d|30|31)\.(\d+)) *$')
+
+
+def legacy_sexDateToISO(sexDate):
+    """sexDateToISO() as it was before the day cache (without the counts)"""
+    m = _legacyCheckDate.match(sexDate)
+    if not m:
+        sexVals.errorSexVal('date  must be "YYYY MM DD.d..." not ', sexDate)
+    yyyy = int(m.group(1))
+    mm = int(m.group(3))
+    dd = float(m.group(4))
+    prec = int(10.0**(6 - len(m.group(6))))
+    if mm == 2:
+        if dd >= 30.0:
+            sexVals.errorSexVal('invalid date for February, should not be ', sexDate)
+        elif dd >= 29.0 and (yyyy % 4 == 0 and (yyyy % 100 != 0 or yyyy % 400 == 0)) is False:
+            sexVals.errorSexVal('invalid date for February, should not be ', sexDate)
+    oldfracdd = m.group(4)[2:]
+    fracdd = float(oldfracdd) * 86400.0 + 0.001
+    hh = int(fracdd/3600.0)
+    fracdd = fracdd - hh*3600.0
+    mm = int(fracdd/60.0)
+    fracdd = fracdd - mm*60.0
+    if prec == 1:
+        ss = "{0:.2f}".format(fracdd+100.0)[1:]
+        if ss == "60.0":
+            ss = "59.9"
+    else:
+        ss = "{0:.1f}".format(fracdd+100.0)[1:]
+    isodate = m.group(1) + '-' + m.group(3) + '-' + m.group(4)[0:2] + 'T' + sexVals.twoDigit(hh) + ':' + sexVals.twoDigit(mm) + ':' + ss + 'Z'
+    return (isodate, prec, oldfracdd)
+
+
+def time_dates(func, dates):
+    start = time.perf_counter()
+    for date in dates:
+        func(date)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--lines', type=int, default=500000, help='Number of report lines')
+    options = parser.parse_args()
+
+    dates = [line[15:32] for line in synthetic.datalines(options.lines)]
+    for date in dates[:1000]:
+        assert legacy_sexDateToISO(date) == sexVals.sexDateToISO(date)
+
+    legacy = time_dates(legacy_sexDateToISO, dates)
+    times = {}
+    for size in [0, sexVals.dayCacheSize]:
+        sexVals.setDayCacheSize(size)
+        times[size] = time_dates(sexVals.sexDateToISO, dates)
+    info = sexVals.dayCacheInfo()
+
+    n = float(len(dates))
+    print("%d dates, %d distinct days" % (len(dates), len(set(date[:10] for date in dates))))
+    print("before            %10.0f dates/s" % (n/legacy))
+    print("after (uncached)  %10.0f dates/s  (x%.2f)" % (n/times[0], legacy/times[0]))
+    print("after (cached)    %10.0f dates/s  (x%.2f, %d hits, %d misses)" % \
+        (n/times[sexVals.dayCacheSize], legacy/times[sexVals.dayCacheSize], info['hits'], info['misses']))
+
+if __name__ == '__main__':
+    main()
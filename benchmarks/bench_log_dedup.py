@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Benchmark how parsing an Astrometrica.log scales with the number of distinct
+images and positions in it, with the hashed de-duplication of
+`utils._LogParser` against the previous list scans (which were quadratic).
+
+Usage: python benchmarks/bench_log_dedup.py [-n IMAGES]
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+class LegacyDedupParser(utils._LogParser):
+    """_LogParser with the images and asteroids de-duplicated by list scans as before"""
+
+    def __init__(self, dbg=False):
+        super(LegacyDedupParser, self).__init__(dbg)
+        self.image_list = []
+        self.asteroid_list = []
+
+    def _add_image(self, image, rms):
+        image_names = [i[0] for i in self.image_list]
+        try:
+            self.image_list[image_names.index(image)] = (image, rms)
+        except ValueError:
+            self.image_list.append((image, rms))
+
+    def _set_image_dmag(self, image, dmag):
+        image_names = [i[0] for i in self.image_list]
+        try:
+            self.image_list[image_names.index(image)][1]['dMag'] = dmag
+        except ValueError:
+            print("Image not found in list to update")
+
+    def _add_asteroid(self, asteroid):
+        if asteroid not in self.asteroid_list:
+            self.asteroid_list.append(asteroid)
+
+    def results(self):
+        self.asteroids = self.asteroid_list
+        version, images, asteroids = super(LegacyDedupParser, self).results()
+        return version, self.image_list, asteroids
+
+
+def time_parse(parser_class, lines):
+    start = time.perf_counter()
+    parser = parser_class()
+    for line in lines:
+        parser.feed(line)
+    results = parser.results()
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--images', type=int, default=8000, help='Number of distinct images in the largest log')
+    options = parser.parse_args()
+
+    previous = None
+    for num_images in [options.images // 8, options.images // 4, options.images // 2, options.images]:
+        log = synthetic.astrometrica_log_session(n_images=num_images, n_stars=0, n_positions=1)
+        lines = log.splitlines(True)
+        hashed, results = time_parse(utils._LogParser, lines)
+        legacy, legacy_results = time_parse(LegacyDedupParser, lines)
+        assert results == legacy_results, "results differ"
+        growth = '' if previous is None else "  (x%.1f for x2 images)" % (hashed/previous)
+        print("%6d images: hashed %7.3fs  list scans %7.3fs%s" % (num_images, hashed, legacy, growth))
+        previous = hashed
+
+if __name__ == '__main__':
+    main()
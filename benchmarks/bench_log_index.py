@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Benchmark reading only tonight's sessions from a large multi-night
+Astrometrica.log through the session index (`utils.index_astrometrica_log`)
+against parsing the whole log.
+
+Usage: python benchmarks/bench_log_index.py [-s SIZE_MB]
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+def write_log(path, size):
+    """Write sessions for successive nights until the log reaches <size> bytes, returning the last night"""
+    night = datetime.date(2018, 1, 1)
+    written = 0
+    with open(path, 'w', encoding='cp1252') as fh:
+        while written < size:
+            night += datetime.timedelta(days=1)
+            session = synthetic.astrometrica_log_session(night.toordinal(), day=night.strftime('%Y %m %d'))
+            fh.write(session)
+            written += len(session)
+    return night.strftime('%Y-%m-%d')
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-s', '--size', type=int, default=500, help='Size of the synthetic log in MB')
+    parser.add_argument('--skip-full', action='store_true', help="Don't time parsing the whole log")
+    options = parser.parse_args()
+
+    fd, log = tempfile.mkstemp(suffix='.log')
+    os.close(fd)
+    print("Writing synthetic log...")
+    tonight = write_log(log, options.size * 1024**2)
+    size = os.path.getsize(log)
+
+    build_time, sessions = timed(utils.index_astrometrica_log, log)
+    reuse_time, sessions = timed(utils.index_astrometrica_log, log)
+    read_time, result = timed(utils.read_astrometrica_logfile, log, dates=[tonight])
+
+    print("%.0f MB log with %d sessions" % (size/1e6, len(sessions)))
+    print("build index:          %8.3fs" % build_time)
+    print("load index:           %8.3fs" % reuse_time)
+    print("read %s only: %8.3fs  (%d asteroids)" % (tonight, read_time, len(result[2])))
+    if not options.skip_full:
+        full_time, full_result = timed(utils.read_astrometrica_logfile, log)
+        print("read whole log:       %8.3fs  (%d asteroids)" % (full_time, len(full_result[2])))
+
+    os.remove(log)
+    os.remove(log + '.idx')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Compare the peak memory of reading a large multi-night Astrometrica.log in
+full (`read_astrometrica_logfile`) with streaming it and only keeping the
+measurements needed for one night's report (`read_astrometrica_log_for_keys`).
+
+Peak allocations are measured with tracemalloc.
+
+Usage: python benchmarks/bench_log_memory.py [-s SIZE_MB]
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+def measure(func):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-s', '--size', type=int, default=200, help='Size of the synthetic log in MB')
+    options = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    log = os.path.join(tmpdir, 'Astrometrica.log')
+    mpcreport = os.path.join(tmpdir, 'MPCReport.txt')
+    print("Writing synthetic log...")
+    night = datetime.date(2018, 1, 1)
+    written = 0
+    with open(log, 'w', encoding='cp1252') as fh:
+        while written < options.size * 1024**2:
+            night += datetime.timedelta(days=1)
+            session = synthetic.astrometrica_log_session(night.toordinal(), n_positions=11, day=night.strftime('%Y %m %d'))
+            fh.write(session)
+            written += len(session)
+    # The report is the measurements from the last night
+    header = [line for line in synthetic.mpcreport(0).splitlines(True) if '----- end -----' not in line]
+    body = [line + '\n' for line in session.splitlines() if len(line) == 80 and line.endswith(' W85')]
+    with open(mpcreport, 'w') as fh:
+        fh.writelines(header + body + ['----- end -----\n'])
+
+    full_peak, full_time, full = measure(lambda: utils.read_astrometrica_logfile(log))
+    keys = utils.read_mpcreport_keys(mpcreport)
+    keys_peak, keys_time, matched = measure(lambda: utils.read_astrometrica_log_for_keys(log, keys))
+
+    print("Log of %.0f MB, report of %d observations" % (os.path.getsize(log)/1e6, len(body)))
+    print("read_astrometrica_logfile:      peak %8.2f MB  %6.2fs  (%d asteroids)" % (full_peak/1e6, full_time, len(full[2])))
+    print("read_astrometrica_log_for_keys: peak %8.2f MB  %6.2fs  (%d asteroids)" % (keys_peak/1e6, keys_time, len(matched[1])))
+
+    for path in [log, mpcreport]:
+        os.remove(path)
+    os.rmdir(tmpdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Compare the memory needed to hold decoded observations as per-line dicts
+(`parse_and_modify_data`) and as `__slots__` `Observation` records.
+
+A set of distinct lines is decoded once and then replicated up to the
+requested count, so both representations share the same value objects and
+only the per-record containers are measured (with tracemalloc).
+
+Usage: python benchmarks/bench_observation_memory.py [-n OBSERVATIONS]
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import tracemalloc
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+def measure(build, templates, n):
+    gc.collect()
+    tracemalloc.start()
+    records = [build(templates[i % len(templates)]) for i in range(n)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--observations', type=int, default=1000000, help='Number of observations to hold')
+    parser.add_argument('--distinct', type=int, default=1000, help='Number of distinct lines decoded')
+    options = parser.parse_args()
+
+    lines = synthetic.datalines(options.distinct)
+    templates = [utils.parse_and_modify_data(line, ast_catalog='Gaia2', display=False) for line in lines]
+
+    as_dicts = measure(dict, templates, options.observations)
+    as_records = measure(utils.Observation.from_dict, templates, options.observations)
+
+    n = options.observations
+    print("%d observations (%d fields each)" % (n, len(templates[0])))
+    print("dict:        %8.1f MB  (%5.0f bytes/obs)" % (as_dicts/1e6, as_dicts/float(n)))
+    print("Observation: %8.1f MB  (%5.0f bytes/obs)  (x%.1f smaller)" % (as_records/1e6, as_records/float(n), as_dicts/float(as_records)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Compare the wall-clock time of converting a report with a large
+Astrometrica.log sequentially (log read, then report decoded) and with the
+log read in the background while the report is decoded (`overlap=True`).
+
+Usage: python benchmarks/bench_overlap.py [-n OBSERVATIONS] [-s LOG_SIZE_MB]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import tempfile
+import time
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--observations', type=int, default=50000, help='Number of observation lines in the report')
+    parser.add_argument('-s', '--size', type=int, default=100, help='Size of the synthetic log in MB')
+    options = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    mpcreport = os.path.join(tmpdir, 'MPCReport.txt')
+    log = os.path.join(tmpdir, 'Astrometrica.log')
+    print("Writing synthetic log...")
+    # The report holds the measurements from the log, so they all get uncertainties
+    header = [line for line in synthetic.mpcreport(0).splitlines(True) if '----- end -----' not in line]
+    body = []
+    written = 0
+    with open(log, 'w', encoding='cp1252') as fh:
+        seed = 0
+        while written < options.size * 1024**2:
+            session = synthetic.astrometrica_log_session(seed, n_positions=11)
+            fh.write(session)
+            written += len(session)
+            if len(body) < options.observations:
+                body += [line + '\n' for line in session.splitlines() if len(line) == 80 and line.endswith(' W85')]
+            seed += 1
+    with open(mpcreport, 'w') as fh:
+        fh.writelines(header + body[:options.observations] + ['----- end -----\n'])
+    options.observations = min(options.observations, len(body))
+    print("Report of %d observations, log of %.0f MB, %d CPUs" % (options.observations, os.path.getsize(log)/1e6, os.cpu_count() or 1))
+
+    outputs = []
+    for name, overlap in [('sequential', False), ('overlapped', True)]:
+        out_file = os.path.join(tmpdir, name + '.psv')
+        start = time.perf_counter()
+        utils.convert_mpcreport_to_psv(mpcreport, out_file, True, log, display=False, overlap=overlap)
+        elapsed = time.perf_counter() - start
+        print("%-10s %7.2fs" % (name, elapsed))
+        with open(out_file, 'r') as fh:
+            outputs.append(fh.read())
+        os.remove(out_file)
+    assert outputs[0] == outputs[1], "outputs differ"
+
+    for path in [mpcreport, log]:
+        os.remove(path)
+    os.rmdir(tmpdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Benchmark the LRU caches of `packUtil.unpackPackedID` and
+`packUtil.packTupleID` on a report body with a handful of designations
+repeated over many lines, timing the ID round trip on its own and the whole
+of `utils.parse_dataline`, with the caches enabled and disabled.
+
+Usage: python benchmarks/bench_pack_cache.py [-n LINES]
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+from astrometrica2ades import utils, packUtil
+
+import synthetic
+
+
+def round_trip(lines):
+    for line in lines:
+        packUtil.packTupleID(packUtil.unpackPackedID(line[0:12]))
+
+
+def parse(lines):
+    for line in lines:
+        utils.parse_dataline(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--lines', type=int, default=200000, help='Number of report lines')
+    options = parser.parse_args()
+
+    lines = synthetic.datalines(options.lines)
+    print("%d lines, %d distinct designations" % (len(lines), len(set(line[0:12] for line in lines))))
+
+    for name, func in [('ID round trip', round_trip), ('parse_dataline', parse)]:
+        times = {}
+        for size in [0, packUtil.packCacheSize]:
+            packUtil.setPackCacheSize(size)
+            start = time.perf_counter()
+            func(lines)
+            times[size] = time.perf_counter() - start
+        info = packUtil.packCacheInfo()['unpackPackedID']
+        print("%-15s uncached %6.2fs  cached %6.2fs  (x%.1f, %d hits, %d misses)" % \
+            (name, times[0], times[packUtil.packCacheSize], times[0] / times[packUtil.packCacheSize], info['hits'], info['misses']))
+
+if __name__ == '__main__':
+    main()
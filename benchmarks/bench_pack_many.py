@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Benchmark the bulk `packUtil.unpackMany` and `packUtil.packMany` against
+loops over the scalar `unpackPackedID` and `packTupleID` on an MPC-scale
+list of packed designations (numbered and provisional minor planets, comets
+and trkSubs, each observed several times, plus a few invalid IDs).
+
+Usage: python benchmarks/bench_pack_many.py [-n IDS] [-d DISTINCT]
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+from astrometrica2ades import packUtil
+
+
+def designations(n, distinct, seed=21):
+    rng = random.Random(seed)
+    alnum = packUtil.packLetters
+    halfmonths = 'ABCDEFGHJKLMNOPQRSTUVWXY'
+    unique = []
+    for i in range(distinct):
+        kind = rng.randrange(10)
+        if kind < 4:
+            unique.append(rng.choice(alnum) + '%04d' % rng.randrange(10000) + ' ' * 7)
+        elif kind < 8:
+            unique.append('     ' + rng.choice('JK') + '%02d' % rng.randrange(100) + rng.choice(halfmonths) +
+                rng.choice(alnum) + str(rng.randrange(10)) + rng.choice('0ABCZ'))
+        elif kind == 8:
+            unique.append('%04dP' % rng.randrange(1, 500) + ' ' * 7)
+        elif rng.random() < 0.9:
+            unique.append('     ' + rng.choice('ABCDEFGHLMNOQRSUVWXYZ') +
+                ''.join(rng.choice(alnum) for c in range(6)))
+        else:
+            unique.append('     ?' + '%06d' % i)
+    return [rng.choice(unique) for i in range(n)]
+
+
+def scalar_unpack(packedIDs):
+    results = []
+    for packedID in packedIDs:
+        try:
+            results.append(packUtil.unpackPackedID(packedID))
+        except RuntimeError:
+            results.append(None)
+    return results
+
+
+def scalar_pack(triplets):
+    results = []
+    for triplet in triplets:
+        try:
+            results.append(packUtil.packTupleID(triplet))
+        except (RuntimeError, TypeError):
+            results.append(None)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--ids', type=int, default=500000, help='Number of packed IDs')
+    parser.add_argument('-d', '--distinct', type=int, default=50000, help='Number of distinct packed IDs')
+    options = parser.parse_args()
+
+    packedIDs = designations(options.ids, options.distinct)
+    triplets, errors = packUtil.unpackMany(packedIDs)
+    print("%d IDs, %d distinct, %d invalid" % (len(packedIDs), len(set(packedIDs)), sum(e is not None for e in errors)))
+
+    for name, inputs, scalar, bulk in [('unpack', packedIDs, scalar_unpack, packUtil.unpackMany),
+                                       ('pack', triplets, scalar_pack, packUtil.packMany)]:
+        times = {}
+        for size in [0, packUtil.packCacheSize]:
+            packUtil.setPackCacheSize(size)
+            start = time.perf_counter()
+            scalar(inputs)
+            times[size] = time.perf_counter() - start
+        start = time.perf_counter()
+        bulk(inputs)
+        bulk_time = time.perf_counter() - start
+        print("%-7s scalar uncached %6.2fs  scalar cached %6.2fs  bulk %6.2fs  (x%.1f, x%.1f)" % \
+            (name, times[0], times[packUtil.packCacheSize], bulk_time,
+             times[0] / bulk_time, times[packUtil.packCacheSize] / bulk_time))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Time `convert_mpcreport_to_psv` on a synthetic report with 1, 2, 4 and 8
+worker processes decoding the observation lines.
+
+Usage: python benchmarks/bench_parallel_convert.py [-n LINES] [-w WORKERS ...]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import tempfile
+import time
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--lines', type=int, default=200000, help='Number of observation lines in the report')
+    parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Worker counts to time')
+    options = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    mpcreport = os.path.join(tmpdir, 'MPCReport.txt')
+    with open(mpcreport, 'w') as fh:
+        fh.write(synthetic.mpcreport(options.lines))
+
+    baseline = None
+    for workers in options.workers:
+        out_file = os.path.join(tmpdir, 'MPCReport_%d.psv' % workers)
+        start = time.perf_counter()
+        num_objects = utils.convert_mpcreport_to_psv(mpcreport, out_file, display=False, workers=workers)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = elapsed
+            with open(out_file, 'r') as fh:
+                reference = fh.read()
+        else:
+            with open(out_file, 'r') as fh:
+                assert fh.read() == reference, "output with %d workers differs" % workers
+        print("%d workers: %7.2fs  %8.0f lines/s  (x%.2f)" % (workers, elapsed, num_objects/elapsed, baseline/elapsed))
+        os.remove(out_file)
+
+    os.remove(mpcreport)
+    os.rmdir(tmpdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Benchmark parsing a large synthetic Astrometrica.log serially against
+parsing it with a pool of worker processes (`read_astrometrica_logfile(log,
+workers=N)`), which splits it at timestamped lines and merges the results.
+
+Usage: python benchmarks/bench_parallel_log.py [-s SIZE_MB] [-j WORKERS ...] [--log PATH]
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+def write_log(path, size):
+    """Write distinct sessions for successive nights until the log reaches <size> bytes"""
+    night = datetime.date(2018, 1, 1)
+    written = 0
+    with open(path, 'w', encoding='cp1252') as fh:
+        while written < size:
+            night += datetime.timedelta(days=1)
+            session = synthetic.astrometrica_log_session(night.toordinal(), day=night.strftime('%Y %m %d'))
+            fh.write(session)
+            written += len(session)
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-s', '--size', type=int, default=500, help='Size of the synthetic log in MB')
+    parser.add_argument('-j', '--jobs', type=int, nargs='+', default=[2, 4, os.cpu_count() or 1], help='Numbers of worker processes to time')
+    parser.add_argument('--log', help='Existing log to read instead of generating one')
+    options = parser.parse_args()
+
+    log = options.log
+    if log is None:
+        fd, log = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+        print("Writing synthetic log...")
+        size = write_log(log, options.size * 1024**2)
+    else:
+        size = os.path.getsize(log)
+    print("%.0f MB log, %d CPUs" % (size/1e6, os.cpu_count() or 1))
+
+    serial = None
+    for workers in [1] + sorted(set(options.jobs)):
+        start = time.perf_counter()
+        result = utils.read_astrometrica_logfile(log, workers=workers)
+        elapsed = time.perf_counter() - start
+        if serial is None:
+            serial = (elapsed, result)
+        else:
+            assert result == serial[1], "results differ with %d workers" % workers
+        print("workers=%-3d %7.2fs  %7.1f MB/s  x%.2f  (%d images, %d asteroids)" % \
+            (workers, elapsed, size/1e6/elapsed, serial[0]/elapsed, len(result[1]), len(result[2])))
+
+    if options.log is None:
+        os.remove(log)
+
+if __name__ == '__main__':
+    main()
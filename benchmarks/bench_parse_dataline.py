@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Benchmark `utils.parse_dataline` against the previous implementation, which
+assembled and compiled the optical line regex on every call.
+
+Usage: python benchmarks/bench_parse_dataline.py [-n LINES]
+"""
+from __future__ import print_function
+
+import argparse
+import re
+import time
+
+from astrometrica2ades import utils, sexVals, packUtil
+
+import synthetic
+
+
+def legacy_parse_dataline(line):
+    """parse_dataline() as it was before the fixed-column parser"""
+    commonRegexHelp1 = ('([A-za-z0-9 ]{12})' + '([ *+])' + '(.)')
+    commonRegexHelp2 = (r'(\d{4})' + '([ a-e])' + '([0-9 .]{12})')
+    normalLineRegex = re.compile(('^'
+                                  + commonRegexHelp1
+                                  + '([A PeCTMcEOHNn])'
+                                  + commonRegexHelp2
+                                  + '([0-9 .]{12})'
+                                  + '([-+ ][0-9 .]{11})'
+                                  + '(.{9})'
+                                  + '(.{5})'
+                                  + '(.{1})'
+                                  + '(.{6})'
+                                  + '(.{3})'
+                                  + '$'))
+    ret = {}
+    if not line:
+        return ret
+    if len(line) > 80:
+        utils.error80(repr(len(line)) + ' columns', line)
+    ret['subFmt'] = 'M92'
+    m = normalLineRegex.match(line)
+    if m:
+        ret['totalid'] = m.group(1)
+        ret['disc'] = m.group(2)
+        ret['notes'] = m.group(3)
+        ret['code'] = m.group(4)
+        ret['date'] = m.group(5) + m.group(6) + m.group(7)
+        ret['raSexagesimal'] = m.group(8)
+        ret['decSexagesimal'] = m.group(9)
+        ret['bl1'] = m.group(10)
+        ret['mag'] = m.group(11)
+        ret['band'] = m.group(12)
+        ret['packedref'] = m.group(13)
+        ret['stn'] = m.group(14)
+        sexVals.checkDate(ret)
+        sexVals.checkRa(ret)
+        sexVals.checkDec(ret)
+    else:
+        utils.error80("no match for line", line)
+    sexVals.checkDate(ret)
+    if ret['code'] not in packUtil.validCodes:
+        utils.error80("invalid column 14 " + ret['code'] + " in line ", line)
+    else:
+        ret['mode'] = packUtil.codeDict[ret['code']]
+    ret['prog'] = '  '
+    if ret['notes'] not in packUtil.validNotes:
+        utils.error80("invalid note " + ret['notes'] + " in line ", line)
+    ret['astCat'] = ret['packedref'][0]
+    (permID, provID, trkSub) = packUtil.unpackPackedID(ret['totalid'])
+    ret['permID'] = permID
+    ret['provID'] = provID
+    ret['trkSub'] = trkSub
+    packtest = packUtil.packTupleID((permID, provID, trkSub))
+    return ret
+
+
+def time_parser(func, lines):
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    return time.perf_counter() - start
+
+
+def time_matcher(lines):
+    """Time just the layout check: per-call regex build vs. precompiled validators"""
+    def legacy_match(line):
+        return re.compile('^([A-za-z0-9 ]{12})([ *+])(.)([A PeCTMcEOHNn])(\\d{4})([ a-e])([0-9 .]{12})'
+                          '([0-9 .]{12})([-+ ][0-9 .]{11})(.{9})(.{5})(.{1})(.{6})(.{3})$').match(line)
+    matches = utils._dataline_parser.matches
+    return time_parser(legacy_match, lines), time_parser(matches, lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--lines', type=int, default=1000000, help='Number of synthetic lines')
+    options = parser.parse_args()
+
+    lines = synthetic.datalines(options.lines)
+    for line in lines[:1000]:
+        assert legacy_parse_dataline(line) == utils.parse_dataline(line)
+
+    legacy_match, new_match = time_matcher(lines)
+    legacy = time_parser(legacy_parse_dataline, lines)
+    new = time_parser(utils.parse_dataline, lines)
+
+    n = float(len(lines))
+    print("%d lines" % len(lines))
+    print("layout check   before: %10.0f lines/s  after: %10.0f lines/s  (x%.2f)" % (n/legacy_match, n/new_match, legacy_match/new_match))
+    print("parse_dataline before: %10.0f lines/s  after: %10.0f lines/s  (x%.2f)" % (n/legacy, n/new, legacy/new))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+Benchmark `utils.read_astrometrica_logfile` (single pass state machine)
+against the previous implementation (regexes tried on every line plus
+readline/tell/seek look-ahead) on a large synthetic Astrometrica.log.
+
+A set of distinct sessions is generated and repeated until the log reaches
+the requested size, so the results (after de-duplication) stay small and
+only the line handling is timed.
+
+Usage: python benchmarks/bench_read_log.py [-s SIZE_MB] [--log PATH]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+def legacy_read_astrometrica_logfile(log, dbg=False):
+    """read_astrometrica_logfile() as it was before the state machine parser"""
+    images = []
+    asteroids = []
+    version = ''
+
+    log_fh = open(log, 'r', encoding="cp1252")
+
+    images_regex = re.compile(r'^\d{2}:\d{2}:\d{2} - Astrometry of Image \d* \(' + r'(.*)\):')
+    photom_regex = re.compile(r'^\d{2}:\d{2}:\d{2} - Photometry of Image \d* \(' + r'(.*)\):')
+    version_regex = re.compile(r'^\s*(Astrometrica .*[^\r\n]+)')
+    astrom_rms_regex = re.compile(r'(\d+)[^=]+=\s*([.0-9]+)\"[^=]+=\s*([.0-9]+)\"')
+    photom_rms_regex = re.compile(r'(\d+)[^=]+=\s*([.0-9]+)[^=]+')
+    pos_regex = re.compile(r'^\d{2}:\d{2}:\d{2} - (Position|Moving)')
+    pos_rms_regex = re.compile(r'([.0-9]+)')
+    apradius_regex = re.compile(r'^\s*Aperture Radius\s*=\s*(\d)')
+    mov_end_regex = re.compile(r'^\d{2}:\d{2}:\d{2} - \w+\W+')
+
+    avg_pix_size = None
+    ap_radius_pix = None
+
+    while True:
+        line = log_fh.readline()
+        i = images_regex.match(line)
+        v = version_regex.match(line)
+        p = photom_regex.match(line)
+        pos = pos_regex.match(line)
+        ap = apradius_regex.search(line)
+        if v:
+            version = v.group(1)
+        elif ap:
+            ap_radius_pix = float(ap.group(1))
+        elif i:
+            line2 = log_fh.readline()
+            if not line2: break
+            m = astrom_rms_regex.search(line2)
+            image = i.group(1)
+            if m:
+                rms = {}
+                rms['nstars'] = m.group(1)
+                rms['dRA'] = m.group(2)
+                rms['dDec'] = m.group(3)
+                image_list = [i[0] for i in images]
+                try:
+                    image_index = image_list.index(image)
+                    images[image_index]= (image, rms)
+                except ValueError:
+                    images.append((image , rms))
+            line_count = 0
+            line2 = 'DivisionByCucumber'
+            while 'Pixel Size' not in line2 and line_count < 10:
+                line2 = log_fh.readline()
+                if not line2: break
+                line_count += 1
+            pix_size_regex = re.compile(r'([.0-9]+)\"')
+            pix_size = pix_size_regex.findall(line2)
+            if len(pix_size) == 2:
+                avg_pix_size = (float(pix_size[0]) + float(pix_size[1]))/2.0
+        elif p:
+            line2 = log_fh.readline()
+            if not line2: break
+            m = photom_rms_regex.search(line2)
+            image = p.group(1)
+            if m:
+                image_list = [i[0] for i in images]
+                try:
+                    image_index = image_list.index(image)
+                    images[image_index][1]['dMag'] = m.group(2)
+                except ValueError:
+                    print("Image not found in list to update")
+        elif pos:
+            i = 0
+            while i <= 10:
+                line2 = log_fh.readline()
+                if not line2: break
+                chunks = line2.rstrip().split()
+                asteroid = {}
+                if len(chunks) == 13:
+                    asteroid['fwhm'] = chunks[10]
+                    asteroid['snr'] = chunks[11]
+                elif len(chunks) == 16:
+                    asteroid['fwhm'] = chunks[13]
+                    asteroid['snr'] = chunks[14]
+                else:
+                    print("Unexpected number of fields in line:\n", line2)
+                line3 = log_fh.readline()
+                if not line3: break
+                chunks = pos_rms_regex.findall(line3)
+                if len(chunks) == 3:
+                    asteroid['rmsRA'] = chunks[0]
+                    asteroid['rmsDec'] = chunks[1]
+                    asteroid['rmsMag'] = chunks[2]
+                line4 = log_fh.readline()
+                if not line4: break
+                try:
+                    data = utils.parse_dataline(line4.rstrip())
+                    asteroid['totalid'] = data['totalid']
+                    asteroid['obsTime'] = data['obsTime']
+                    if asteroid not in asteroids:
+                        asteroids.append(asteroid)
+                except RuntimeError:
+                    print("Error parsing line: ", line4)
+                junk = log_fh.readline()
+                junk = log_fh.readline()
+                last_pos = log_fh.tell()
+                line = log_fh.readline()
+                if pos_regex.match(line) or mov_end_regex.match(line):
+                    log_fh.seek(last_pos)
+                    break
+
+                log_fh.seek(last_pos)
+                i += 1
+        if not line: break
+    log_fh.close()
+
+    if ap_radius_pix and avg_pix_size:
+        ap_radius_arcsec = ap_radius_pix * avg_pix_size
+        for ast in asteroids:
+            ast['photAp'] = ap_radius_arcsec
+
+    return version, images, asteroids
+
+
+def write_log(path, size, distinct):
+    sessions = [synthetic.astrometrica_log_session(seed) for seed in range(distinct)]
+    written = 0
+    with open(path, 'w', encoding='cp1252') as fh:
+        while written < size:
+            for session in sessions:
+                fh.write(session)
+                written += len(session)
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-s', '--size', type=int, default=1024, help='Size of the synthetic log in MB')
+    parser.add_argument('--distinct', type=int, default=20, help='Number of distinct sessions repeated through the log')
+    parser.add_argument('--log', help='Existing log to read instead of generating one')
+    parser.add_argument('--skip-legacy', action='store_true', help="Don't time the previous implementation")
+    options = parser.parse_args()
+
+    log = options.log
+    if log is None:
+        fd, log = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+        print("Writing synthetic log...")
+        size = write_log(log, options.size * 1024**2, options.distinct)
+    else:
+        size = os.path.getsize(log)
+
+    funcs = [('state machine', utils.read_astrometrica_logfile)]
+    if not options.skip_legacy:
+        funcs.append(('legacy', legacy_read_astrometrica_logfile))
+    results = []
+    for name, func in funcs:
+        start = time.perf_counter()
+        result = func(log)
+        elapsed = time.perf_counter() - start
+        results.append(result)
+        print("%-14s %7.2fs  %7.1f MB/s  (%d images, %d asteroids)" % (name, elapsed, size/1e6/elapsed, len(result[1]), len(result[2])))
+    if len(results) == 2:
+        assert results[0] == results[1], "results differ"
+
+    if options.log is None:
+        os.remove(log)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Benchmark joining the log uncertainties to the report observations in
+`utils.modify_observation` with the (totalid, obsTime) index from
+`utils.index_asteroids` against scanning the `asteroids` list.
+
+The list scan is quadratic, so it is only timed on a sample of the report
+lines and extrapolated to the full report.
+
+Usage: python benchmarks/bench_rms_join.py [-n LINES] [-p POSITIONS] [--sample LINES]
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+def make_asteroids(observations, n):
+    """One log position per observation (up to <n>), padded with unmatched positions"""
+    asteroids = []
+    for i in range(n):
+        if i < len(observations):
+            totalid, obsTime = observations[i].totalid, observations[i].obsTime
+        else:
+            totalid, obsTime = '     K99Z99Z', "2018-02-16T00:00:%05.2fZ" % (i % 6000 / 100.0)
+        asteroids.append({'totalid' : totalid, 'obsTime' : obsTime, 'rmsRA' : '0.15', 'rmsDec' : '0.10',
+                          'rmsMag' : '0.11', 'snr' : '4.3', 'fwhm' : '1.1', 'photAp' : 1.56})
+    return asteroids
+
+
+def time_join(observations, asteroids):
+    start = time.perf_counter()
+    for obs in observations:
+        utils.modify_observation(obs, 'Gaia2', asteroids, True, 1.5)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--lines', type=int, default=50000, help='Number of report lines')
+    parser.add_argument('-p', '--positions', type=int, default=50000, help='Number of positions in the log')
+    parser.add_argument('--sample', type=int, default=500, help='Number of report lines to time the list scan on')
+    options = parser.parse_args()
+
+    lines = synthetic.datalines(options.lines)
+    parse = utils.DatalineParser().parse_observation
+    observations = [parse(line) for line in lines]
+    # Reverse so the matching positions are spread through the list
+    asteroids = make_asteroids(observations, options.positions)[::-1]
+
+    start = time.perf_counter()
+    index = utils.index_asteroids(asteroids)
+    index_time = time.perf_counter() - start
+
+    indexed = time_join([parse(line) for line in lines], index)
+    sample = [parse(line) for line in lines[:options.sample]]
+    scanned = time_join(sample, asteroids) * len(lines) / float(len(sample))
+
+    print("%d report lines, %d log positions" % (len(lines), len(asteroids)))
+    print("list scan:  %9.2fs (extrapolated from %d lines)" % (scanned, len(sample)))
+    print("index:      %9.2fs (+%.3fs to build)  (x%.0f faster)" % (indexed, index_time, scanned / (indexed + index_time)))
+
+if __name__ == '__main__':
+    main()
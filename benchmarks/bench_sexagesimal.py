@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""
+Benchmark the regex-free fast path of `sexVals.sexRaToDecRa` and
+`sexVals.sexDeclToDecDecl` against the regular expression path (used when
+the fast path is disabled) on the RA and Dec fields of synthetic report lines.
+
+Usage: python benchmarks/bench_sexagesimal.py [-n LINES]
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+from astrometrica2ades import sexVals
+
+import synthetic
+
+
+def convert(ras, decs):
+    for ra in ras:
+        sexVals.sexRaToDecRa(ra)
+    for dec in decs:
+        sexVals.sexDeclToDecDecl(dec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--lines', type=int, default=200000, help='Number of report lines')
+    options = parser.parse_args()
+
+    lines = synthetic.datalines(options.lines)
+    ras = [line[32:44] for line in lines]
+    decs = [line[44:56] for line in lines]
+
+    fast = sexVals._fastSexagesimal
+    times = {}
+    for name in ['regex', 'fast']:
+        sexVals._fastSexagesimal = fast if name == 'fast' else (lambda line: None)
+        start = time.perf_counter()
+        convert(ras, decs)
+        times[name] = time.perf_counter() - start
+    sexVals._fastSexagesimal = fast
+    print("%d RA and Dec values: regex %6.2fs  fast %6.2fs  (x%.1f)" % \
+        (len(lines), times['regex'], times['fast'], times['regex'] / times['fast']))
+
+if __name__ == '__main__':
+    main()
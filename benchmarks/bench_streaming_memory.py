@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Compare the peak memory of reading a whole MPCReport into header/body lists
+(`read_mpcreport_file`) with a full streaming conversion (`convert_stream`).
+
+A synthetic report is written to a temporary file by repeating a block of
+distinct observation lines; peak allocations are measured with tracemalloc.
+
+Usage: python benchmarks/bench_streaming_memory.py [-n OBSERVATIONS]
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+def measure(func):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--observations', type=int, default=50000, help='Number of observation lines in the report')
+    parser.add_argument('--distinct', type=int, default=1000, help='Number of distinct lines repeated through the report')
+    options = parser.parse_args()
+
+    report = synthetic.mpcreport(options.distinct).splitlines(True)
+    header = [line for line in report if line[0:3] in utils._header_codes]
+    block = [line for line in report if line not in header and '----- end -----' not in line]
+
+    tmpdir = tempfile.mkdtemp()
+    mpcreport = os.path.join(tmpdir, 'MPCReport.txt')
+    out_file = os.path.join(tmpdir, 'MPCReport.psv')
+    with open(mpcreport, 'w') as fh:
+        fh.writelines(header)
+        for i in range(options.observations // len(block)):
+            fh.writelines(block)
+    size = os.path.getsize(mpcreport)
+
+    def streaming():
+        with open(mpcreport, 'r') as in_fh, open(out_file, 'w') as out_fh:
+            utils.convert_stream(in_fh, out_fh)
+
+    lists_peak, lists_time = measure(lambda: utils.read_mpcreport_file(mpcreport))
+    stream_peak, stream_time = measure(streaming)
+
+    print("Report of %.1f MB" % (size/1e6))
+    print("read_mpcreport_file (read only):  peak %8.2f MB  %6.2fs" % (lists_peak/1e6, lists_time))
+    print("convert_stream (full conversion): peak %8.2f MB  %6.2fs" % (stream_peak/1e6, stream_time))
+
+    os.remove(mpcreport)
+    os.remove(out_file)
+    os.rmdir(tmpdir)
+
+if __name__ == '__main__':
+    main()
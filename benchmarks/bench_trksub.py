@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Benchmark the table-driven trkSub classifier `packUtil.matchTrksub` against
+`packUtil.trksubRegex`, on a mix of valid trkSubs and provisional designation
+and survey-like strings which must be rejected.
+
+Usage: python benchmarks/bench_trksub.py [-n STRINGS]
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+from astrometrica2ades import packUtil
+
+
+def make_strings(n, seed=20):
+    rng = random.Random(seed)
+    alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+    prefixes = ['', '', '', 'K18', 'J99', 'PLS', 'T1S', 'T3S']
+    strings = []
+    for i in range(n):
+        prefix = rng.choice(prefixes)
+        strings.append(prefix + ''.join(rng.choice(alphabet) for c in range(rng.randrange(1, 8) - len(prefix) % 7)))
+    return strings
+
+
+def with_regex(strings):
+    matched = 0
+    for s in strings:
+        m = packUtil.trksubRegex.match(s)
+        if m:
+            matched += m.group(1) is not None
+    return matched
+
+
+def with_classifier(strings):
+    matched = 0
+    for s in strings:
+        matched += packUtil.matchTrksub(s) is not None
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--strings', type=int, default=500000, help='Number of candidate trkSubs')
+    options = parser.parse_args()
+
+    strings = make_strings(options.strings)
+    times = {}
+    for name, func in [('regex', with_regex), ('classifier', with_classifier)]:
+        start = time.perf_counter()
+        matched = func(strings)
+        times[name] = time.perf_counter() - start
+        print("%-10s %6.2fs  (%d of %d matched)" % (name, times[name], matched, len(strings)))
+    print("speedup x%.2f" % (times['regex'] / times['classifier']))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Benchmark decoding observation lines at each of the validation levels of
+`utils.DatalineParser` ('strict', 'normal' and 'trusted').
+
+Usage: python benchmarks/bench_validation.py [-n LINES]
+"""
+from __future__ import print_function
+
+import io
+import argparse
+import time
+
+from astrometrica2ades import utils
+
+import synthetic
+
+
+def time_parser(parser, lines):
+    start = time.perf_counter()
+    for line in lines:
+        parser.parse_observation(line)
+    return time.perf_counter() - start
+
+
+def time_convert(report, validation):
+    out_fh = io.StringIO()
+    start = time.perf_counter()
+    header, body = utils.read_mpcreport_stream(io.StringIO(report))
+    utils.write_psv(header, body, out_fh, display=False, validation=validation)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--lines', type=int, default=200000, help='Number of synthetic lines')
+    options = parser.parse_args()
+
+    lines = synthetic.datalines(options.lines)
+    report = synthetic.mpcreport(options.lines)
+    parsers = [utils.DatalineParser(level) for level in utils.validation_levels]
+    # All the levels decode the same values
+    for line in lines[:1000]:
+        expected = parsers[0].parse(line)
+        for level_parser in parsers[1:]:
+            assert level_parser.parse(line) == expected
+
+    n = float(len(lines))
+    print("%d lines" % len(lines))
+    strict = None
+    for level_parser in parsers:
+        elapsed = time_parser(level_parser, lines)
+        if strict is None:
+            strict = elapsed
+        print("parse_observation %-8s %10.0f lines/s  (x%.2f)" % (level_parser.validation, n/elapsed, strict/elapsed))
+    strict = None
+    for level in utils.validation_levels:
+        elapsed = time_convert(report, level)
+        if strict is None:
+            strict = elapsed
+        print("write_psv         %-8s %10.0f lines/s  (x%.2f)" % (level, n/elapsed, strict/elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Benchmark the array converters in `batchUtil` (`sex_date_to_iso`,
+`sex_ra_to_dec_ra`, `sex_decl_to_dec_decl` and their inverses) against loops
+over the scalar `sexVals` functions, on the fields of synthetic report lines.
+
+Usage: python benchmarks/bench_vector_convert.py [-n LINES]
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+from astrometrica2ades import sexVals, batchUtil
+
+import synthetic
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--lines', type=int, default=200000, help='Number of report lines')
+    options = parser.parse_args()
+
+    lines = synthetic.datalines(options.lines)
+    fields = [('date', [line[15:32] for line in lines], sexVals.sexDateToISO, sexVals.isoToSexDate,
+               batchUtil.sex_date_to_iso, batchUtil.iso_to_sex_date),
+              ('RA', [line[32:44] for line in lines], sexVals.sexRaToDecRa, sexVals.decRaToSexRa,
+               batchUtil.sex_ra_to_dec_ra, batchUtil.dec_ra_to_sex_ra),
+              ('Dec', [line[44:56] for line in lines], sexVals.sexDeclToDecDecl, sexVals.degDeclToSexDecl,
+               batchUtil.sex_decl_to_dec_decl, batchUtil.deg_decl_to_sex_decl)]
+
+    print("%d lines" % len(lines))
+    for name, values, forward, inverse, vforward, vinverse in fields:
+        scalar, scalar_time = timed(lambda: [forward(value)[0:2] for value in values])
+        _, scalar_inverse_time = timed(lambda: [inverse(value, prec) for value, prec in scalar])
+        (converted, prec, ok), vector_time = timed(vforward, values)
+        _, vector_inverse_time = timed(vinverse, converted, prec)
+        assert ok.all()
+        print("%-5s scalar %6.2fs + %6.2fs  arrays %6.2fs + %6.2fs  (x%.1f)" % \
+            (name, scalar_time, scalar_inverse_time, vector_time, vector_inverse_time,
+             (scalar_time + scalar_inverse_time) / (vector_time + vector_inverse_time)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Generators for synthetic Astrometrica/MPC1992 inputs used by the benchmarks.
+
+All generated data is deterministic for a given `seed` so that before/after
+timings are made on identical inputs.
+"""
+from __future__ import print_function
+
+import random
+
+# A mix of packed designation types seen in real Astrometrica reports:
+# provisional IDs, numbered asteroids (incl. letter-packed numbers) and trkSubs
+OBJECT_IDS = ['     K17BC1T', '     K18D01E', '     K17V12R', '     P10GvKl',
+              'K8785       ', 'W2017       ', 'l8269       ', 'm1820       ',
+              '00433       ', '     LCOTEST', '     ZTF0abc', 'a0001       ',
+              ]
+
+SITE_CODES = ['W85', 'W86', 'K91', 'V37', 'E10', 'F65', 'Q63', 'Z31']
+
+
+def make_dataline(obj_id, frac_day, ra_secs, dec_arcsecs, mag, site='W85', day='2018 02 16'):
+    """
+    Build one 80 column MPC1992 optical line from numeric values. <ra_secs>
+    is in seconds of time (0-86400), <dec_arcsecs> in arcsec (-324000-324000)
+    """
+    ra_cs = int(round(ra_secs * 100)) % 8640000
+    hh, rem = divmod(ra_cs, 360000)
+    mm, rem = divmod(rem, 6000)
+    ra = "%02d %02d %05.2f " % (hh, mm, rem / 100.0)
+    sign = '-' if dec_arcsecs < 0 else '+'
+    dec_ds = int(round(abs(dec_arcsecs) * 10))
+    dd, rem = divmod(dec_ds, 36000)
+    dm, rem = divmod(rem, 600)
+    dec = "%s%02d %02d %04.1f " % (sign, dd, dm, rem / 10.0)
+    date = "%s.%06d" % (day, frac_day)
+    line = "%12s KC%17s%12s%12s%9s%5s%1s%6s%3s" % (obj_id, date, ra, dec, '', "%4.1f " % mag, 'G', '', site)
+    return line
+
+
+def datalines(n, seed=42, ids=None, site='W85', day='2018 02 16'):
+    """
+    Return a list of <n> valid MPC1992 optical lines. Designations are
+    drawn from <ids> (default `OBJECT_IDS`) so a realistic handful of
+    objects repeats many times through the body.
+    """
+    rng = random.Random(seed)
+    if ids is None:
+        ids = OBJECT_IDS
+    lines = []
+    for i in range(n):
+        lines.append(make_dataline(ids[i % len(ids)],
+                                   rng.randrange(0, 999999),
+                                   rng.uniform(0, 86399),
+                                   rng.uniform(-300000, 300000),
+                                   rng.uniform(12.0, 22.0),
+                                   site, day))
+    return lines
+
+
+def mpcreport(n, seed=42, site='W85', ids=None):
+    """
+    Return the text of an MPCReport.txt with a standard header and <n>
+    observation lines
+    """
+    header = ["COD " + site,
+              "CON T. Lister, LCO, 6740 Cortona Drive Suite 102, Goleta, CA 93117 [tlister@lco.global]",
+              "OBS T. Lister",
+              "MEA T. Lister",
+              "TEL 1.0-m f/8 Ritchey-Chretien + CCD",
+              "ACK MPCReport file updated 2018.02.16 10:06:45",
+              "AC2 tlister@lco.global",
+              "NET Gaia DR1",
+             ]
+    body = datalines(n, seed, ids=ids, site=site)
+    return "\n".join(header + body + ["----- end -----"]) + "\n"
+
+
+def astrometrica_log_session(seed=42, n_images=3, n_stars=400, n_positions=3, ids=None, site='W85', day='2018 02 16'):
+    """
+    Return the text of one Astrometrica.log session (from '- Start' to
+    '- End') with <n_images> images, each with astrometry and photometry
+    results and a listing of <n_stars> reference stars, followed by a manual
+    Position block for each of the first <n_positions> objects in <ids> on
+    every image.
+    """
+    rng = random.Random(seed)
+    if ids is None:
+        ids = OBJECT_IDS
+    year, month, dom = day.split()
+    hour = 8 + seed % 10
+
+    def stamp(minute):
+        return "%02d:%02d:%02d" % (hour, minute % 60, rng.randrange(60))
+
+    images = ["lsc1m005-fl15-%s%s%s-%04d-e11.fits" % (year, month, dom, 100 + seed % 50 + i) for i in range(n_images)]
+    lines = ["%s - Start %s/%s/%s" % (stamp(0), year, month, dom),
+             "           Astrometrica 4.10.0.431"]
+    for i, image in enumerate(images):
+        lines.append("           Image %d: Z:\\data\\%s" % (i + 1, image))
+        lines.append("           Time Stamp: %s %s %s, %d:%02d:%04.1f UT" % (year, month, dom, 4 + i, rng.randrange(60), rng.uniform(0, 59.9)))
+    lines += ["           Settings for Object Detection:",
+              "             Aperture Radius = %d, Detection Limit = 4.0, Min.FWHM = 2.00, PSF-Fit RMS = 0.30, Search Radius = 1.75" % rng.randrange(3, 9),
+              "%s - Gaia DR1: 579 Records read (28.6' x 28.6')" % stamp(1)]
+    for i, image in enumerate(images):
+        lines += ["%s - Astrometry of Image %d (%s): " % (stamp(2), i + 1, image),
+                  "           %d of %d Reference Stars used: dRA = %.2f\", dDe = %.2f\"" % (n_stars - 2, n_stars, rng.uniform(0.05, 0.3), rng.uniform(0.05, 0.3)),
+                  "           Origin: x0 = 2048.0, y0 = 2048.0",
+                  "           Center Coordinates: RA = 11h 27m 18.55s, De = -04\xb0 18' 16.0\"",
+                  "           Focal Length = 7939.7mm, Rotation = -0.33\xb0",
+                  "           Pixel Size: 0.39\" x 0.39\", Field of View: 26.6' x 26.6' ",
+                  "%s - Photometry of Image %d (%s): " % (stamp(2), i + 1, image),
+                  "           %d of %d Reference Stars used: dmag = %.2fmag" % (n_stars - 7, n_stars, rng.uniform(0.05, 0.3)),
+                  "           Zero Point: 29.008mag",
+                  "     RA           dRA        Dec.        dDec     G      dG         x        y      Flux  FWHM   Peak    Fit",
+                  " ------------------------------------------------------------------------------------------------------------"]
+        for star in range(n_stars):
+            lines.append("  11 %02d %06.3f   %+.2f   -04 %02d %05.2f   %+.2f   %5.2f   %+.2f   %7.2f  %7.2f  %6d   %3.1f   %4.1f  %5.3f" %
+                         (rng.randrange(60), rng.uniform(0, 59.9), rng.uniform(-0.3, 0.3), rng.randrange(60), rng.uniform(0, 59.9),
+                          rng.uniform(-0.3, 0.3), rng.uniform(12, 21), rng.uniform(-0.3, 0.3), rng.uniform(0, 4096), rng.uniform(0, 4096),
+                          rng.randrange(1000, 200000), rng.uniform(0.8, 3.0), rng.uniform(3, 80), rng.uniform(0.01, 0.3)))
+    for obj_id in ids[:n_positions]:
+        for i, image in enumerate(images):
+            dataline = make_dataline(obj_id, rng.randrange(0, 999999), rng.uniform(0, 86399), rng.uniform(-300000, 300000),
+                                     rng.uniform(12.0, 22.0), site, day)
+            lines += ["%s - Position added manually from file %s + %d:" % (stamp(3), image, n_images),
+                      "  11 27 19.543           -04 18 19.89           21.64           2054.95  2082.43     651   %3.1f    %3.1f  -.---" %
+                      (rng.choice([0.0, rng.uniform(0.5, 3.0)]), rng.uniform(1, 60)),
+                      "                 \xb1%.2f                  \xb1%.2f           \xb1%.2f" % (rng.uniform(0.05, 0.3), rng.uniform(0.05, 0.3), rng.uniform(0.01, 0.2)),
+                      dataline,
+                      "       %s1 rwo line" % obj_id.strip(),
+                      "       %s2 rwo line" % obj_id.strip()]
+    lines.append("%s - End" % stamp(4))
+    return "\n".join(lines) + "\n"
@@ -16,7 +16,7 @@ setup(name='astrometrica2ades',
       package_data={'astrometrica2ades': [os.path.join('data', 'config.ini'),
                                           ]},
       setup_requires=['pytest-runner'],
-      install_requires=['lxml', 'sphinx', 'sphinx-automodapi', 'numpydoc'],
+      install_requires=['numpy', 'lxml', 'sphinx', 'sphinx-automodapi', 'numpydoc'],
       tests_require=['pytest'],
       entry_points={'console_scripts': ['astrometrica2ades=astrometrica2ades.main:convert',
                                         ]})